@@ -1,8 +1,14 @@
 import os
 from flask import Flask
-from .extensions import db, migrate, cors, api
+from .extensions import (
+    db, migrate, cors, api, atualizador, cep_cache, coalescedor, compressao, indice_cep, limitador,
+    metricas, perfilador, registro_consultas, replicas, resolvedor, viacep
+)
 from .routes import main, ns_cep, ns_usuarios
 from .config import config
+from .cli import cep_cli, usuarios_cli
+from .provedores import criar_provedores
+from .tarefas import gravar_consultas, renovar_cep
 
 def create_app(config_name=None):
     if config_name is None:
@@ -13,8 +19,20 @@ def create_app(config_name=None):
     
     # Inicializa extensões
     db.init_app(app)
+    replicas.init_app(app, db)
     migrate.init_app(app, db)
     cors.init_app(app)
+    metricas.init_app(app)
+    perfilador.init_app(app)
+    compressao.init_app(app)
+    cep_cache.init_app(app)
+    limitador.init_app(app)
+    viacep.init_app(app, orcamento=limitador.orcamento_viacep)
+    resolvedor.init_app(app, provedores=criar_provedores(app))
+    coalescedor.init_app(app, backend=cep_cache.compartilhado)
+    indice_cep.init_app(app)
+    atualizador.init_app(app, cache=cep_cache, funcao=renovar_cep)
+    registro_consultas.init_app(app, funcao=gravar_consultas)
     
     # Registra blueprints
     app.register_blueprint(main)
@@ -26,8 +44,9 @@ def create_app(config_name=None):
     api.add_namespace(ns_cep)
     api.add_namespace(ns_usuarios)
     
-    # Cria tabelas do banco de dados (em ambiente de desenvolvimento)
-    with app.app_context():
-        db.create_all()
+    # Registra comandos de linha de comando
+    app.cli.add_command(cep_cli)
+    app.cli.add_command(usuarios_cli)
     
-    return app
\ No newline at end of file
+    return app
+
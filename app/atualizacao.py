@@ -0,0 +1,119 @@
+import os
+import queue
+import threading
+import time
+
+
+class Ritmo:
+    """
+    Limita uma sequência de chamadas a uma taxa (chamadas por segundo),
+    espaçando-as igualmente
+    """
+
+    def __init__(self, taxa):
+        self.intervalo = 1 / taxa if taxa > 0 else 0
+        self._proxima = 0.0
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        with self._lock:
+            agora = time.monotonic()
+            inicio = max(self._proxima, agora)
+            self._proxima = inicio + self.intervalo
+        if inicio > agora:
+            time.sleep(inicio - agora)
+
+
+class FilaAtualizacao:
+    """
+    Fila de renovação em segundo plano: os CEPs agendados (sem repetição e
+    até o tamanho máximo da fila) são processados por uma thread do próprio
+    processo, fora do caminho das requisições e respeitando a taxa configurada
+    """
+
+    def __init__(self, app=None):
+        self.habilitado = False
+        self.tamanho_maximo = 1000
+        self.ritmo = Ritmo(5)
+        self._app = None
+        self._funcao = None
+        self._fila = queue.SimpleQueue()
+        self._pendentes = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.agendados = 0
+        self.descartados = 0
+        self.executados = 0
+        self.falhas = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, cache=None, funcao=None):
+        """
+        funcao(cep) é executada dentro de um contexto da aplicação para cada
+        CEP agendado. Com cache informado e CEP_CACHE_TTL_FRESCO configurado,
+        os endereços obsoletos encontrados no cache são agendados automaticamente.
+        """
+        self.habilitado = app.config['CEP_CACHE_TTL_FRESCO'] > 0 and funcao is not None
+        self.tamanho_maximo = app.config['CEP_ATUALIZACAO_FILA']
+        self.ritmo = Ritmo(app.config['CEP_ATUALIZACAO_TAXA'])
+        self._app = app
+        self._funcao = funcao
+        if cache is not None:
+            cache.ao_obsoleto = self.agendar if self.habilitado else None
+        app.extensions['atualizador'] = self
+
+    def agendar(self, cep):
+        """
+        Agenda a renovação do CEP. Retorna False se ele já estiver na fila
+        ou se a fila estiver cheia.
+        """
+        if not self.habilitado:
+            return False
+        with self._lock:
+            self._iniciar()
+            if cep in self._pendentes:
+                return False
+            if len(self._pendentes) >= self.tamanho_maximo:
+                self.descartados += 1
+                return False
+            self._pendentes.add(cep)
+            self.agendados += 1
+        self._fila.put(cep)
+        return True
+
+    def _iniciar(self):
+        # A thread não sobrevive a um fork: cada worker inicia a sua
+        if self._thread is None or self._pid != os.getpid():
+            if self._pid != os.getpid():
+                self._fila = queue.SimpleQueue()
+                self._pendentes.clear()
+            self._thread = threading.Thread(target=self._executar, name='atualizacao-cep', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _executar(self):
+        while True:
+            cep = self._fila.get()
+            self.ritmo.esperar()
+            try:
+                with self._app.app_context():
+                    self._funcao(cep)
+                self.executados += 1
+            except Exception:
+                self.falhas += 1
+                self._app.logger.exception(f'Erro ao renovar o CEP {cep}')
+            finally:
+                with self._lock:
+                    self._pendentes.discard(cep)
+
+    def stats(self):
+        return {
+            'habilitado': self.habilitado,
+            'pendentes': len(self._pendentes),
+            'agendados': self.agendados,
+            'descartados': self.descartados,
+            'executados': self.executados,
+            'falhas': self.falhas
+        }
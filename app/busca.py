@@ -0,0 +1,73 @@
+import re
+
+from .models import Endereco
+from .validacao import normalizar_texto
+
+PARAMETROS_BUSCA = {
+    'uf': 'Sigla da UF (ex.: SP)',
+    'localidade': 'Cidade (sem diferenciar acentos e maiúsculas)',
+    'bairro': 'Bairro (sem diferenciar acentos e maiúsculas)',
+    'ddd': 'DDD',
+    'ibge': 'Código IBGE do município',
+    'logradouro': 'Início do logradouro (sem diferenciar acentos e maiúsculas)',
+    'logradouro_modo': 'prefixo (padrão) ou contem, para buscar o trecho em qualquer posição'
+}
+
+UF = re.compile(r'^[A-Za-z]{2}$')
+DIGITOS = re.compile(r'^\d+$')
+
+# Tamanho mínimo do trecho no modo contem (o índice de trigramas precisa de 3 caracteres)
+TAMANHO_MINIMO_TRECHO = 3
+
+
+def consulta_busca(parametros):
+    """
+    Monta a consulta de endereços a partir dos parâmetros da busca. Todos os
+    filtros usam os índices da tabela de endereços. Dispara ValueError com a
+    mensagem de erro se algum parâmetro for inválido ou se nenhum for informado.
+    """
+    query = Endereco.query
+    filtrado = False
+
+    uf = parametros.get('uf')
+    if uf:
+        if not UF.match(uf):
+            raise ValueError('O parâmetro uf deve ser a sigla da UF')
+        query = query.filter(Endereco.uf == uf.upper())
+        filtrado = True
+
+    for nome, coluna in (('ddd', Endereco.ddd), ('ibge', Endereco.ibge)):
+        valor = parametros.get(nome)
+        if valor:
+            if not DIGITOS.match(valor):
+                raise ValueError(f'O parâmetro {nome} deve conter apenas dígitos')
+            query = query.filter(coluna == valor)
+            filtrado = True
+
+    for nome, coluna in (('localidade', Endereco.localidade_normalizada),
+                         ('bairro', Endereco.bairro_normalizado)):
+        valor = normalizar_texto(parametros.get(nome) or '')
+        if valor:
+            query = query.filter(coluna == valor)
+            filtrado = True
+
+    logradouro = normalizar_texto(parametros.get('logradouro') or '')
+    if logradouro:
+        modo = parametros.get('logradouro_modo', 'prefixo')
+        if modo == 'prefixo':
+            query = query.filter(Endereco.logradouro_normalizado.startswith(logradouro, autoescape=True))
+        elif modo == 'contem':
+            if len(logradouro) < TAMANHO_MINIMO_TRECHO:
+                raise ValueError(
+                    f'No modo contem o logradouro deve ter ao menos {TAMANHO_MINIMO_TRECHO} caracteres'
+                )
+            query = query.filter(Endereco.logradouro_normalizado.contains(logradouro, autoescape=True))
+        else:
+            raise ValueError('O parâmetro logradouro_modo deve ser prefixo ou contem')
+        filtrado = True
+
+    if not filtrado:
+        raise ValueError('Informe ao menos um filtro: ' + ', '.join(
+            nome for nome in PARAMETROS_BUSCA if nome != 'logradouro_modo'
+        ))
+    return query
@@ -0,0 +1,321 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from .cache_http import etag_conteudo
+from .metrics import CACHE_ERROS_COMPARTILHADO, CACHE_HIT_COMPARTILHADO, CACHE_HIT_LOCAL, CACHE_MISS
+
+# Sentinela para diferenciar "não está no cache" de "CEP inexistente em cache"
+AUSENTE = object()
+
+
+class LRUCache:
+    """
+    Cache em memória do processo com política LRU e expiração por TTL.
+    Opcionalmente cada item tem um prazo de renovação (ttl_fresco), após o
+    qual ele continua sendo servido, mas é indicado como obsoleto.
+    """
+
+    def __init__(self, tamanho_maximo=10000):
+        self.tamanho_maximo = tamanho_maximo
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, chave):
+        return self.consultar(chave)[0]
+
+    def consultar(self, chave):
+        """
+        Retorna (valor, obsoleto); obsoleto indica que o prazo de renovação do item passou
+        """
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return AUSENTE, False
+            valor, expira_em, renovar_em = item
+            agora = time.monotonic()
+            if expira_em < agora:
+                del self._dados[chave]
+                return AUSENTE, False
+            self._dados.move_to_end(chave)
+            return valor, renovar_em is not None and renovar_em < agora
+
+    def set(self, chave, valor, ttl, ttl_fresco=None):
+        with self._lock:
+            agora = time.monotonic()
+            renovar_em = agora + ttl_fresco if ttl_fresco else None
+            self._dados[chave] = (valor, agora + ttl, renovar_em)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.tamanho_maximo:
+                self._dados.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, chave):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+    def __len__(self):
+        return len(self._dados)
+
+
+class MemoryBackend:
+    """
+    Implementação em memória do subconjunto da interface do Redis usada pelo
+    cache compartilhado (útil em testes e desenvolvimento)
+    """
+
+    def __init__(self):
+        self._dados = {}
+        self._lock = threading.Lock()
+
+    def _expirado(self, chave):
+        item = self._dados.get(chave)
+        if item is not None and item[1] is not None and item[1] < time.monotonic():
+            del self._dados[chave]
+            return True
+        return item is None
+
+    def get(self, chave):
+        with self._lock:
+            if self._expirado(chave):
+                return None
+            return self._dados[chave][0]
+
+    def set(self, chave, valor, ex=None, px=None, nx=False):
+        with self._lock:
+            if nx and not self._expirado(chave):
+                return None
+            if px is not None:
+                expira_em = time.monotonic() + px / 1000
+            elif ex is not None:
+                expira_em = time.monotonic() + ex
+            else:
+                expira_em = None
+            self._dados[chave] = (valor, expira_em)
+            return True
+
+    def delete(self, *chaves):
+        with self._lock:
+            return sum(1 for chave in chaves if self._dados.pop(chave, None) is not None)
+
+    def flushdb(self):
+        with self._lock:
+            self._dados.clear()
+
+
+def criar_backend_compartilhado(url):
+    """
+    Cria o backend do cache compartilhado a partir de uma URL
+    (memory:// para o backend em memória ou redis://... para Redis)
+    """
+    if not url:
+        return None
+    if url.startswith('memory://'):
+        return MemoryBackend()
+
+    import redis
+    return redis.Redis.from_url(url)
+
+
+def erros_backend(backend):
+    """
+    Exceções que indicam indisponibilidade do backend compartilhado (queda,
+    timeout). O módulo do Redis só é importado quando o backend é o Redis.
+    """
+    if backend is None or isinstance(backend, MemoryBackend):
+        return (OSError,)
+
+    from redis.exceptions import RedisError
+    return (RedisError, OSError)
+
+
+class EntradaCep:
+    """
+    Endereço guardado no LRU local (somente leitura: CepCache.get entrega
+    cópias) com as suas representações: o ETag
+    (calculado uma única vez), o corpo JSON serializado e as versões
+    comprimidas dele por codificação (preenchidos na primeira resposta)
+    """
+
+    __slots__ = ('endereco', 'etag', 'corpo', 'comprimidos')
+
+    def __init__(self, endereco):
+        self.endereco = endereco
+        self.etag = etag_conteudo(endereco)
+        self.corpo = None
+        self.comprimidos = {}
+
+
+class CepCache:
+    """
+    Cache read-through em camadas para consultas de CEP: um LRU local ao
+    processo e, opcionalmente, um backend compartilhado compatível com Redis.
+    Respostas negativas (CEP inexistente) são armazenadas com TTL menor.
+    Com ttl_fresco configurado, endereços mais antigos que ele continuam
+    sendo servidos (stale-while-revalidate) e ao_obsoleto(cep) é chamado
+    para que sejam renovados em segundo plano. O LRU local guarda cada
+    endereço em uma EntradaCep, com o ETag e o corpo serializado e
+    comprimido da resposta, calculados uma única vez. Falhas do backend
+    compartilhado são registradas e tratadas como miss (leitura) ou ignoradas
+    (escrita): o LRU local e o banco continuam atendendo.
+    """
+
+    def __init__(self, app=None):
+        self.local = LRUCache()
+        self.compartilhado = None
+        self.erros_compartilhado = (OSError,)
+        self.ttl = 86400
+        self.ttl_negativo = 300
+        self.ttl_fresco = 0
+        self.ao_obsoleto = None
+        self.prefixo = 'cep:'
+        self.habilitado = True
+        self.hits_local = 0
+        self.hits_compartilhado = 0
+        self.hits_negativos = 0
+        self.hits_obsoletos = 0
+        self.misses = 0
+        self.falhas_compartilhado = 0
+        self._app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.habilitado = app.config['CEP_CACHE_HABILITADO']
+        self.local = LRUCache(app.config['CEP_CACHE_TAMANHO'])
+        self.ttl = app.config['CEP_CACHE_TTL']
+        self.ttl_negativo = app.config['CEP_CACHE_TTL_NEGATIVO']
+        self.ttl_fresco = app.config['CEP_CACHE_TTL_FRESCO']
+        self.prefixo = app.config['CEP_CACHE_PREFIXO']
+        self.compartilhado = criar_backend_compartilhado(
+            app.config['CEP_CACHE_COMPARTILHADO_URL']
+        )
+        self.erros_compartilhado = erros_backend(self.compartilhado)
+        self._app = app
+        app.extensions['cep_cache'] = self
+
+    def get(self, cep, contabilizar=True):
+        """
+        Retorna o endereço em cache, None para um CEP inexistente em cache
+        ou AUSENTE quando o CEP não está em nenhuma das camadas. O endereço
+        é uma cópia: alterá-lo não afeta o que está guardado.
+        Com contabilizar=False a consulta não entra nas estatísticas.
+        """
+        if not self.habilitado:
+            return AUSENTE
+
+        item, obsoleto = self.local.consultar(cep)
+        if item is not AUSENTE:
+            valor = item.endereco if item is not None else None
+            if contabilizar:
+                self.hits_local += 1
+                CACHE_HIT_LOCAL.inc()
+                if valor is None:
+                    self.hits_negativos += 1
+                if obsoleto and self.ao_obsoleto is not None:
+                    # Serve o valor atual e agenda a renovação
+                    self.hits_obsoletos += 1
+                    self.ao_obsoleto(cep)
+            return dict(valor) if valor is not None else None
+
+        if self.compartilhado is not None:
+            try:
+                bruto = self.compartilhado.get(self.prefixo + cep)
+            except self.erros_compartilhado as e:
+                self._registrar_falha('get', cep, e)
+                bruto = None
+            if bruto is not None:
+                try:
+                    valor = json.loads(bruto)
+                except ValueError as e:
+                    # Entrada corrompida ou truncada: é removida e vale como miss
+                    self._registrar_falha('get', cep, e)
+                    self.delete(cep)
+                    bruto = None
+            if bruto is not None:
+                if contabilizar:
+                    self.hits_compartilhado += 1
+                    CACHE_HIT_COMPARTILHADO.inc()
+                    if valor is None:
+                        self.hits_negativos += 1
+                if valor is None:
+                    self.local.set(cep, None, self.ttl_negativo)
+                    return None
+                self.local.set(cep, EntradaCep(valor), self.ttl, self.ttl_fresco)
+                return dict(valor)
+
+        if contabilizar:
+            self.misses += 1
+            CACHE_MISS.inc()
+        return AUSENTE
+
+    def set(self, cep, endereco):
+        """
+        Armazena uma cópia do endereço em todas as camadas (None registra um
+        CEP inexistente)
+        """
+        if not self.habilitado:
+            return
+        if endereco is not None:
+            ttl, ttl_fresco = self.ttl, self.ttl_fresco
+            self.local.set(cep, EntradaCep(dict(endereco)), ttl, ttl_fresco)
+        else:
+            ttl, ttl_fresco = self.ttl_negativo, None
+            self.local.set(cep, None, ttl, ttl_fresco)
+        if self.compartilhado is not None:
+            try:
+                self.compartilhado.set(self.prefixo + cep, json.dumps(endereco), ex=ttl)
+            except self.erros_compartilhado as e:
+                self._registrar_falha('set', cep, e)
+
+    def entrada(self, cep, endereco):
+        """
+        Retorna a EntradaCep do endereço no LRU local, com o ETag e as
+        representações já calculadas, ou uma entrada avulsa (não guardada)
+        se o CEP não estiver em cache (ex.: cache desabilitado)
+        """
+        item = self.local.get(cep)
+        if item is not AUSENTE and item is not None:
+            return item
+        return EntradaCep(endereco)
+
+    def delete(self, cep):
+        self.local.delete(cep)
+        if self.compartilhado is not None:
+            try:
+                self.compartilhado.delete(self.prefixo + cep)
+            except self.erros_compartilhado as e:
+                self._registrar_falha('delete', cep, e)
+
+    def _registrar_falha(self, operacao, cep, erro):
+        self.falhas_compartilhado += 1
+        CACHE_ERROS_COMPARTILHADO.labels(operacao).inc()
+        if self._app is not None:
+            self._app.logger.warning(f'Cache compartilhado indisponível ({operacao} {cep}): {erro}')
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        hits = self.hits_local + self.hits_compartilhado
+        total = hits + self.misses
+        return {
+            'habilitado': self.habilitado,
+            'tamanho': len(self.local),
+            'tamanho_maximo': self.local.tamanho_maximo,
+            'compartilhado': self.compartilhado is not None,
+            'falhas_compartilhado': self.falhas_compartilhado,
+            'hits_local': self.hits_local,
+            'hits_compartilhado': self.hits_compartilhado,
+            'hits_negativos': self.hits_negativos,
+            'hits_obsoletos': self.hits_obsoletos,
+            'misses': self.misses,
+            'evictions': self.local.evictions,
+            'hit_ratio': round(hits / total, 4) if total else 0.0
+        }
@@ -0,0 +1,67 @@
+import hashlib
+import json
+from datetime import timezone
+
+from flask import Response, request
+from werkzeug.http import http_date, quote_etag
+
+
+def etag_conteudo(dados):
+    """
+    Calcula o ETag a partir do conteúdo (dicionário ou lista serializável)
+    """
+    corpo = json.dumps(dados, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(corpo.encode(), digest_size=16).hexdigest()
+
+
+def etag_versao(*partes):
+    """
+    Calcula o ETag a partir de identificadores de versão do registro (ex.: id e updated_at)
+    """
+    return hashlib.blake2b('|'.join(map(str, partes)).encode(), digest_size=16).hexdigest()
+
+
+def cache_control(max_age, publico=True):
+    """
+    Monta o cabeçalho Cache-Control. Com max_age 0 o cliente pode guardar a
+    resposta, mas deve revalidá-la (com o ETag) a cada uso.
+    """
+    if max_age <= 0:
+        return 'no-cache' if publico else 'private, no-cache'
+    return f"{'public' if publico else 'private'}, max-age={max_age}"
+
+
+def _utc(data):
+    if data.tzinfo is None:
+        # As datas do banco são gravadas em UTC (datetime.utcnow)
+        return data.replace(tzinfo=timezone.utc)
+    return data
+
+
+def validar_condicional(etag, fraco=False, ultima_modificacao=None, controle=None, variar=None):
+    """
+    Gera os cabeçalhos de cache da resposta e verifica If-None-Match e
+    If-Modified-Since. Retorna (resposta 304 ou None, cabeçalhos); com a
+    resposta 304 o corpo não precisa ser montado nem serializado. variar
+    é o cabeçalho da requisição que altera o corpo (Vary, ex.: X-Fields).
+    """
+    headers = {'ETag': quote_etag(etag, fraco)}
+    if controle:
+        headers['Cache-Control'] = controle
+    if variar:
+        headers['Vary'] = variar
+    if ultima_modificacao is not None:
+        ultima_modificacao = _utc(ultima_modificacao).replace(microsecond=0)
+        headers['Last-Modified'] = http_date(ultima_modificacao)
+
+    if request.if_none_match:
+        # Em GET/HEAD a comparação é fraca (RFC 9110, 13.1.2)
+        nao_modificado = request.if_none_match.contains_weak(etag)
+    elif ultima_modificacao is not None and request.if_modified_since is not None:
+        nao_modificado = ultima_modificacao <= request.if_modified_since
+    else:
+        nao_modificado = False
+
+    if nao_modificado:
+        return Response(status=304, headers=headers), headers
+    return None, headers
@@ -0,0 +1,281 @@
+import csv
+import json
+import time
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DataError
+
+from .atualizacao import Ritmo
+from .extensions import db
+from .importacao import ImportacaoUsuarios, ler_ndjson
+from .indice_cep import construir_indice
+from .limitador import LimiteExcedido
+from .models import Endereco
+from .tarefas import aquecer_cache, ceps_desatualizados, revalidar_cep
+from .utils import UF_MAPEAMENTO, dados_endereco, formatar_cep
+
+cep_cli = AppGroup('cep', help='Comandos de manutenção da base de CEPs.')
+usuarios_cli = AppGroup('usuarios', help='Comandos de manutenção de usuários.')
+
+
+# Tamanho máximo de cada coluna de texto da tabela de endereços
+TAMANHOS_ENDERECO = {
+    coluna.name: coluna.type.length
+    for coluna in Endereco.__table__.c
+    if getattr(coluna.type, 'length', None) and not coluna.computed
+}
+
+
+def _ler_registros(arquivo, formato):
+    """
+    Lê os registros do arquivo um a um, sem carregá-lo inteiro em memória.
+    Linhas JSONL inválidas viram um dicionário com a chave _erro (ver ler_ndjson).
+    """
+    with open(arquivo, encoding='utf-8', newline='') as f:
+        if formato == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            yield from ler_ndjson(f)
+
+
+def _campos_invalidos(dados):
+    """
+    Retorna a mensagem de erro dos campos que o banco recusaria (tipo que
+    não é texto ou maior que a coluna) ou None. Números viram texto.
+    """
+    for campo, tamanho in TAMANHOS_ENDERECO.items():
+        valor = dados.get(campo)
+        if valor is None:
+            continue
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            valor = dados[campo] = str(valor)
+        elif not isinstance(valor, str):
+            return f'Campo {campo} deve ser texto'
+        if len(valor) > tamanho:
+            return f'Campo {campo} excede {tamanho} caracteres'
+    return None
+
+
+def _comando_insercao(registros, sobrescrever):
+    stmt = insert(Endereco).values(registros)
+    if sobrescrever:
+        colunas = [coluna for coluna in registros[0] if coluna not in ('cep', 'created_at')]
+        return stmt.on_conflict_do_update(
+            index_elements=[Endereco.cep],
+            set_={coluna: stmt.excluded[coluna] for coluna in colunas}
+        )
+    return stmt.on_conflict_do_nothing(index_elements=[Endereco.cep])
+
+
+def _inserir_lote(registros, sobrescrever):
+    """
+    Insere o lote em um único INSERT multi-linha. Se o banco recusar algum
+    valor, insere linha a linha (um savepoint por linha) para isolar o erro,
+    sem perder o restante do lote. Retorna os CEPs recusados.
+    """
+    try:
+        db.session.execute(_comando_insercao(registros, sobrescrever))
+        db.session.commit()
+        return []
+    except DataError:
+        db.session.rollback()
+
+    recusados = []
+    for registro in registros:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(_comando_insercao([registro], sobrescrever))
+        except DataError as e:
+            recusados.append(registro['cep'])
+            click.echo(f"CEP {registro['cep']} recusado pelo banco: {e.orig}", err=True)
+    db.session.commit()
+    return recusados
+
+
+@cep_cli.command('importar')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--formato', type=click.Choice(['csv', 'jsonl']),
+              help='Formato do arquivo (padrão: pela extensão).')
+@click.option('--lote', default=5000, show_default=True,
+              help='Registros por INSERT multi-linha.')
+@click.option('--sobrescrever/--manter', default=False, show_default=True,
+              help='Atualiza os CEPs que já existem na tabela de endereços.')
+def importar(arquivo, formato, lote, sobrescrever):
+    """Importa uma base de CEPs (CSV ou JSONL) para a tabela de endereços."""
+    if formato is None:
+        formato = 'jsonl' if arquivo.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+    inicio = time.perf_counter()
+    importados = 0
+    ignorados = 0
+    registros = {}
+    agora = datetime.utcnow()
+
+    def inserir():
+        nonlocal importados, ignorados
+        recusados = len(_inserir_lote(list(registros.values()), sobrescrever))
+        importados += len(registros) - recusados
+        ignorados += recusados
+        registros.clear()
+
+    for numero, registro in enumerate(_ler_registros(arquivo, formato), 1):
+        erro = registro.get('_erro')
+        cep_formatado = None if erro else formatar_cep(str(registro.get('cep') or ''))
+        if not erro and not cep_formatado:
+            erro = 'CEP inválido'
+
+        if not erro:
+            uf = registro.get('uf')
+            if isinstance(uf, str) and uf in UF_MAPEAMENTO:
+                registro.setdefault('estado', UF_MAPEAMENTO[uf]['estado'])
+                registro.setdefault('regiao', UF_MAPEAMENTO[uf]['regiao'])
+            registro['cep'] = cep_formatado
+            dados = dados_endereco(registro)
+            erro = _campos_invalidos(dados)
+
+        if erro:
+            ignorados += 1
+            click.echo(f'Registro {numero} ignorado: {erro}', err=True)
+            continue
+
+        dados['created_at'] = dados['updated_at'] = agora
+        # CEPs repetidos no mesmo lote quebrariam o ON CONFLICT
+        registros[cep_formatado] = dados
+
+        if len(registros) >= lote:
+            inserir()
+            decorrido = time.perf_counter() - inicio
+            click.echo(f'{importados} registros ({importados / decorrido:.0f} registros/s)')
+
+    if registros:
+        inserir()
+
+    decorrido = time.perf_counter() - inicio
+    click.echo(
+        f'Importação concluída: {importados} registros, {ignorados} ignorados, '
+        f'{decorrido:.1f}s ({importados / decorrido if decorrido else 0:.0f} registros/s)'
+    )
+
+
+def _enderecos_para_indice():
+    for endereco in Endereco.query.order_by(Endereco.cep).yield_per(5000):
+        dados = endereco.to_dict()
+        if dados['uf'] in UF_MAPEAMENTO:
+            dados['estado'] = dados['estado'] or UF_MAPEAMENTO[dados['uf']]['estado']
+            dados['regiao'] = dados['regiao'] or UF_MAPEAMENTO[dados['uf']]['regiao']
+        yield dados
+
+
+@cep_cli.command('construir-indice')
+@click.option('--saida', help='Arquivo de saída (padrão: CEP_INDICE_ARQUIVO).')
+def construir_indice_cmd(saida):
+    """Gera o índice de CEPs mapeado em memória a partir da tabela de endereços."""
+    saida = saida or current_app.config['CEP_INDICE_ARQUIVO']
+    if not saida:
+        raise click.UsageError('Informe --saida ou configure CEP_INDICE_ARQUIVO')
+
+    inicio = time.perf_counter()
+    quantidade = construir_indice(_enderecos_para_indice(), saida)
+    click.echo(f'Índice gerado em {saida}: {quantidade} CEPs em {time.perf_counter() - inicio:.1f}s')
+
+
+def _revalidar(idade_maxima, lote, ritmo):
+    ceps = ceps_desatualizados(idade_maxima, lote)
+    revalidados = 0
+    for cep_formatado in ceps:
+        ritmo.esperar()
+        try:
+            if revalidar_cep(cep_formatado):
+                revalidados += 1
+        except LimiteExcedido as e:
+            # Orçamento do ViaCEP esgotado pelo tráfego da API: aguarda e segue
+            time.sleep(e.retry_after)
+    return len(ceps), revalidados
+
+
+@cep_cli.command('aquecer')
+@click.option('--top', type=int, help='Quantidade de CEPs (padrão: CEP_AQUECIMENTO_TOP).')
+def aquecer(top):
+    """Carrega no cache os CEPs mais consultados (ex.: após um deploy)."""
+    inicio = time.perf_counter()
+    encontrados = aquecer_cache(top or current_app.config['CEP_AQUECIMENTO_TOP'])
+    click.echo(f'Cache aquecido: {encontrados} CEPs em {time.perf_counter() - inicio:.1f}s')
+
+
+@cep_cli.command('revalidar')
+@click.option('--idade-maxima', type=int,
+              help='Revalida endereços salvos há mais de N segundos (padrão: CEP_ATUALIZACAO_IDADE_MAXIMA).')
+@click.option('--lote', type=int, help='Máximo de CEPs revalidados (padrão: CEP_ATUALIZACAO_LOTE).')
+@click.option('--taxa', type=float, help='Consultas por segundo aos provedores (padrão: CEP_ATUALIZACAO_TAXA).')
+def revalidar(idade_maxima, lote, taxa):
+    """Revalida nos provedores de CEP os endereços salvos mais antigos."""
+    config = current_app.config
+    total, revalidados = _revalidar(
+        idade_maxima or config['CEP_ATUALIZACAO_IDADE_MAXIMA'],
+        lote or config['CEP_ATUALIZACAO_LOTE'],
+        Ritmo(taxa or config['CEP_ATUALIZACAO_TAXA'])
+    )
+    click.echo(f'{revalidados} de {total} CEPs revalidados')
+
+
+@cep_cli.command('atualizador')
+@click.option('--intervalo', type=int,
+              help='Segundos entre as rodadas de revalidação (padrão: CEP_ATUALIZACAO_INTERVALO).')
+@click.option('--aquecer/--sem-aquecer', default=True, show_default=True,
+              help='Aquece o cache com os CEPs mais consultados ao iniciar.')
+def atualizador_cmd(intervalo, aquecer):
+    """Processo de atualização em segundo plano: aquece o cache e revalida os CEPs periodicamente."""
+    config = current_app.config
+    intervalo = intervalo or config['CEP_ATUALIZACAO_INTERVALO']
+    ritmo = Ritmo(config['CEP_ATUALIZACAO_TAXA'])
+
+    if aquecer:
+        click.echo(f"Cache aquecido: {aquecer_cache(config['CEP_AQUECIMENTO_TOP'])} CEPs")
+
+    while True:
+        inicio = time.monotonic()
+        total, revalidados = _revalidar(
+            config['CEP_ATUALIZACAO_IDADE_MAXIMA'], config['CEP_ATUALIZACAO_LOTE'], ritmo
+        )
+        click.echo(f'{datetime.utcnow():%Y-%m-%d %H:%M:%S} {revalidados} de {total} CEPs revalidados')
+        # Com um lote cheio ainda há CEPs atrasados: a próxima rodada começa em
+        # seguida, a menos que os provedores não estejam respondendo
+        if total < config['CEP_ATUALIZACAO_LOTE'] or not revalidados:
+            time.sleep(max(0, intervalo - (time.monotonic() - inicio)))
+
+
+@usuarios_cli.command('importar')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--formato', type=click.Choice(['csv', 'jsonl']),
+              help='Formato do arquivo (padrão: pela extensão).')
+@click.option('--bloco', type=int, help='Usuários por bloco (padrão: USUARIOS_IMPORTACAO_BLOCO).')
+@click.option('--relatorio', type=click.Path(dir_okay=False),
+              help='Grava o resultado de cada linha em NDJSON.')
+def importar_usuarios(arquivo, formato, bloco, relatorio):
+    """Cadastra usuários em lote a partir de um arquivo CSV ou JSONL."""
+    if formato is None:
+        formato = 'jsonl' if arquivo.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+    importacao = ImportacaoUsuarios(bloco or current_app.config['USUARIOS_IMPORTACAO_BLOCO'])
+    with open(arquivo, encoding='utf-8', newline='') as f:
+        registros = csv.DictReader(f) if formato == 'csv' else ler_ndjson(f)
+        saida = open(relatorio, 'w', encoding='utf-8') if relatorio else None
+        try:
+            for resultado in importacao.executar(registros):
+                if saida:
+                    saida.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+                elif resultado['status'] == 'erro':
+                    click.echo(f"Linha {resultado['linha']}: {resultado['message']}")
+        finally:
+            if saida:
+                saida.close()
+
+    resumo = importacao.resumo()
+    click.echo(
+        f"Importação concluída: {resumo['criados']} criados, {resumo['erros']} com erro, "
+        f"{resumo['segundos']:.1f}s ({resumo['linhas_por_s'] or 0:.0f} linhas/s)"
+    )
@@ -0,0 +1,166 @@
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli é opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard é opcional
+    zstandard = None
+
+# Tipos de conteúdo que valem a pena comprimir
+TIPOS_COMPRIMIVEIS = {'application/json', 'application/x-ndjson', 'text/html', 'text/plain', 'text/csv'}
+
+
+class _Gzip:
+    def __init__(self, nivel):
+        self.nivel = nivel
+
+    def comprimir(self, dados):
+        compressor = zlib.compressobj(self.nivel, zlib.DEFLATED, 31)
+        return compressor.compress(dados) + compressor.flush()
+
+    def comprimir_stream(self, partes):
+        compressor = zlib.compressobj(self.nivel, zlib.DEFLATED, 31)
+        for parte in partes:
+            saida = compressor.compress(parte)
+            if saida:
+                yield saida
+        yield compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, nivel):
+        self.nivel = nivel
+
+    def comprimir(self, dados):
+        return brotli.compress(dados, quality=self.nivel)
+
+    def comprimir_stream(self, partes):
+        compressor = brotli.Compressor(quality=self.nivel)
+        for parte in partes:
+            saida = compressor.process(parte)
+            if saida:
+                yield saida
+        yield compressor.finish()
+
+
+class _Zstd:
+    def __init__(self, nivel):
+        self.nivel = nivel
+
+    def comprimir(self, dados):
+        # ZstdCompressor não pode ser usado por várias threads ao mesmo tempo
+        return zstandard.ZstdCompressor(level=self.nivel).compress(dados)
+
+    def comprimir_stream(self, partes):
+        compressor = zstandard.ZstdCompressor(level=self.nivel).compressobj()
+        for parte in partes:
+            saida = compressor.compress(parte)
+            if saida:
+                yield saida
+        yield compressor.flush()
+
+
+def _codificar(partes):
+    for parte in partes:
+        yield parte.encode() if isinstance(parte, str) else parte
+
+
+class Compressao:
+    """
+    Comprime as respostas conforme o Accept-Encoding (zstd, br ou gzip)
+    a partir de um tamanho mínimo. Respostas em streaming são comprimidas
+    à medida que são geradas. Respostas com o atributo comprimidos (um
+    dicionário por codificação, ex.: o da EntradaCep de GET /cep/<cep>)
+    reaproveitam os bytes já comprimidos e guardam neles os que comprimirem.
+    """
+
+    def __init__(self, app=None):
+        self.habilitado = False
+        self.tamanho_minimo = 1024
+        self.algoritmos = {}
+        self.preferencia = []
+        self.comprimidas = 0
+        self.hits_cache = 0
+        self.bytes_originais = 0
+        self.bytes_comprimidos = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.habilitado = app.config['COMPRESSAO_HABILITADA']
+        self.tamanho_minimo = app.config['COMPRESSAO_TAMANHO_MINIMO']
+
+        disponiveis = {'gzip': lambda: _Gzip(app.config['COMPRESSAO_NIVEL_GZIP'])}
+        if brotli is not None:
+            disponiveis['br'] = lambda: _Brotli(app.config['COMPRESSAO_NIVEL_BR'])
+        if zstandard is not None:
+            disponiveis['zstd'] = lambda: _Zstd(app.config['COMPRESSAO_NIVEL_ZSTD'])
+        self.preferencia = [
+            nome.strip() for nome in app.config['COMPRESSAO_ALGORITMOS'].split(',')
+            if nome.strip() in disponiveis
+        ]
+        self.algoritmos = {nome: disponiveis[nome]() for nome in self.preferencia}
+
+        app.extensions['compressao'] = self
+        if self.habilitado and self.preferencia:
+            app.after_request(self._comprimir)
+
+    def _comprimir(self, response):
+        if (response.mimetype not in TIPOS_COMPRIMIVEIS
+                or 'Content-Encoding' in response.headers
+                or response.direct_passthrough):
+            return response
+        response.vary.add('Accept-Encoding')
+
+        if (response.status_code < 200 or response.status_code in (204, 304)
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        codificacao = request.accept_encodings.best_match(self.preferencia)
+        if codificacao is None:
+            return response
+        algoritmo = self.algoritmos[codificacao]
+
+        if response.is_streamed:
+            response.response = algoritmo.comprimir_stream(_codificar(response.response))
+            response.headers.pop('Content-Length', None)
+        else:
+            dados = response.get_data()
+            if len(dados) < self.tamanho_minimo:
+                return response
+            comprimidos = getattr(response, 'comprimidos', None)
+            comprimido = comprimidos.get(codificacao) if comprimidos is not None else None
+            if comprimido is None:
+                comprimido = algoritmo.comprimir(dados)
+                if comprimidos is not None:
+                    comprimidos[codificacao] = comprimido
+            else:
+                self.hits_cache += 1
+            response.set_data(comprimido)
+            self.bytes_originais += len(dados)
+            self.bytes_comprimidos += len(comprimido)
+
+        if response.headers.get('ETag'):
+            # A representação comprimida não é byte a byte igual à original:
+            # o ETag passa a ser fraco (If-None-Match continua valendo)
+            etag, _ = response.get_etag()
+            response.set_etag(etag, weak=True)
+        response.headers['Content-Encoding'] = codificacao
+        self.comprimidas += 1
+        return response
+
+    def stats(self):
+        return {
+            'habilitado': self.habilitado,
+            'algoritmos': self.preferencia,
+            'comprimidas': self.comprimidas,
+            'hits_cache': self.hits_cache,
+            'taxa_compressao': round(self.bytes_comprimidos / self.bytes_originais, 4)
+            if self.bytes_originais else None
+        }
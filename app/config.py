@@ -3,6 +3,32 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def opcoes_engine_producao():
+    """
+    Dimensiona o pool de conexões de cada worker a partir da configuração do
+    gunicorn (gunicorn.conf.py): uma conexão por thread de atendimento, sem
+    que a soma dos workers passe de DB_MAX_CONEXOES_TOTAL
+    """
+    if os.environ.get('GUNICORN_WORKER_CLASS') == 'gevent':
+        concorrencia = min(int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000)), 20)
+    else:
+        concorrencia = int(os.environ.get('GUNICORN_THREADS', 4))
+    workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+    por_worker = max(1, int(os.environ.get('DB_MAX_CONEXOES_TOTAL', 80)) // workers)
+
+    pool_size = int(os.environ.get('DB_POOL_SIZE', min(concorrencia, por_worker)))
+    max_overflow = int(os.environ.get(
+        'DB_MAX_OVERFLOW', max(0, min(max(2, pool_size // 2), por_worker - pool_size))
+    ))
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True
+    }
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev_key_viacep')
     SQLALCHEMY_DATABASE_URI = os.environ.get(
@@ -13,6 +39,163 @@ class Config:
     TESTING = False
     VIACEP_EXTERNAL_API = os.environ.get('VIACEP_EXTERNAL_API', 'https://viacep.com.br/ws')
 
+    # Métricas no formato do Prometheus em /metrics
+    METRICAS_HABILITADAS = os.environ.get('METRICAS_HABILITADAS', 'True').lower() == 'true'
+
+    # Perfilamento sob demanda: uma fração das requisições (0 a 1) ou as que
+    # trazem PERFIL_CABECALHO com o valor de PERFIL_TOKEN. PERFIL_MODO:
+    # amostragem (pilhas collapsed para flamegraph) ou cprofile (.prof do pstats)
+    PERFIL_HABILITADO = os.environ.get('PERFIL_HABILITADO', 'False').lower() == 'true'
+    PERFIL_AMOSTRAGEM = float(os.environ.get('PERFIL_AMOSTRAGEM', 0))
+    PERFIL_CABECALHO = os.environ.get('PERFIL_CABECALHO', 'X-Perfil')
+    PERFIL_TOKEN = os.environ.get('PERFIL_TOKEN')
+    PERFIL_MODO = os.environ.get('PERFIL_MODO', 'amostragem')
+    PERFIL_INTERVALO_MS = float(os.environ.get('PERFIL_INTERVALO_MS', 2))
+    PERFIL_DIRETORIO = os.environ.get('PERFIL_DIRETORIO', 'perfis')
+
+    # Log das requisições mais lentas que o limiar (0 desativa), com os
+    # tempos por etapa e os primeiros REQUISICOES_LENTAS_SQL_MAXIMO comandos SQL
+    REQUISICOES_LENTAS_LIMIAR_MS = int(os.environ.get('REQUISICOES_LENTAS_LIMIAR_MS', 0))
+    REQUISICOES_LENTAS_SQL_MAXIMO = int(os.environ.get('REQUISICOES_LENTAS_SQL_MAXIMO', 50))
+
+    # Serializador das respostas JSON: orjson (se instalado) ou json
+    JSON_SERIALIZADOR = os.environ.get('JSON_SERIALIZADOR', 'orjson')
+
+    # Compressão das respostas (Accept-Encoding), em ordem de preferência;
+    # br e zstd exigem os pacotes brotli e zstandard
+    COMPRESSAO_HABILITADA = os.environ.get('COMPRESSAO_HABILITADA', 'True').lower() == 'true'
+    COMPRESSAO_ALGORITMOS = os.environ.get('COMPRESSAO_ALGORITMOS', 'zstd,br,gzip')
+    COMPRESSAO_TAMANHO_MINIMO = int(os.environ.get('COMPRESSAO_TAMANHO_MINIMO', 256))
+    COMPRESSAO_NIVEL_GZIP = int(os.environ.get('COMPRESSAO_NIVEL_GZIP', 6))
+    COMPRESSAO_NIVEL_BR = int(os.environ.get('COMPRESSAO_NIVEL_BR', 5))
+    COMPRESSAO_NIVEL_ZSTD = int(os.environ.get('COMPRESSAO_NIVEL_ZSTD', 3))
+
+    # Paginação das listagens
+    LISTAGEM_LIMITE_PADRAO = int(os.environ.get('LISTAGEM_LIMITE_PADRAO', 100))
+    LISTAGEM_LIMITE_MAXIMO = int(os.environ.get('LISTAGEM_LIMITE_MAXIMO', 1000))
+    LISTAGEM_STREAM_BLOCO = int(os.environ.get('LISTAGEM_STREAM_BLOCO', 500))
+
+    # Cache HTTP (Cache-Control max-age em segundos; 0 exige revalidação com o ETag)
+    HTTP_CACHE_CEP_MAX_AGE = int(os.environ.get('HTTP_CACHE_CEP_MAX_AGE', 86400))
+    HTTP_CACHE_USUARIO_MAX_AGE = int(os.environ.get('HTTP_CACHE_USUARIO_MAX_AGE', 0))
+    HTTP_CACHE_LISTAGEM_MAX_AGE = int(os.environ.get('HTTP_CACHE_LISTAGEM_MAX_AGE', 0))
+
+    # Usuários por bloco na importação em lote
+    USUARIOS_IMPORTACAO_BLOCO = int(os.environ.get('USUARIOS_IMPORTACAO_BLOCO', 1000))
+
+    # Cliente HTTP do ViaCEP
+    VIACEP_TIMEOUT_CONEXAO = float(os.environ.get('VIACEP_TIMEOUT_CONEXAO', 3.05))
+    VIACEP_TIMEOUT_LEITURA = float(os.environ.get('VIACEP_TIMEOUT_LEITURA', 5))
+    VIACEP_TENTATIVAS = int(os.environ.get('VIACEP_TENTATIVAS', 2))
+    VIACEP_BACKOFF = float(os.environ.get('VIACEP_BACKOFF', 0.2))
+    VIACEP_BACKOFF_MAXIMO = float(os.environ.get('VIACEP_BACKOFF_MAXIMO', 2))
+    VIACEP_POOL_CONEXOES = int(os.environ.get('VIACEP_POOL_CONEXOES', 10))
+    VIACEP_CIRCUITO_LIMIAR_ERRO = float(os.environ.get('VIACEP_CIRCUITO_LIMIAR_ERRO', 0.5))
+    VIACEP_CIRCUITO_MINIMO_REQUISICOES = int(os.environ.get('VIACEP_CIRCUITO_MINIMO_REQUISICOES', 10))
+    VIACEP_CIRCUITO_JANELA = int(os.environ.get('VIACEP_CIRCUITO_JANELA', 60))
+    VIACEP_CIRCUITO_TEMPO_ABERTO = int(os.environ.get('VIACEP_CIRCUITO_TEMPO_ABERTO', 30))
+
+    # Orçamento global de chamadas ao ViaCEP (0 desativa). Chamadas além da
+    # taxa aguardam até VIACEP_ORCAMENTO_ESPERA_MAXIMA segundos antes de serem recusadas
+    VIACEP_ORCAMENTO_TAXA = float(os.environ.get('VIACEP_ORCAMENTO_TAXA', 20))
+    VIACEP_ORCAMENTO_RAJADA = int(os.environ.get('VIACEP_ORCAMENTO_RAJADA', 20))
+    VIACEP_ORCAMENTO_ESPERA_MAXIMA = float(os.environ.get('VIACEP_ORCAMENTO_ESPERA_MAXIMA', 1))
+    # Workers que dividem o orçamento quando os baldes não são compartilhados
+    # (sem RATE_LIMIT_ARMAZENAMENTO_URL) ou o Redis fica indisponível;
+    # exportado pelo gunicorn.conf.py
+    VIACEP_ORCAMENTO_WORKERS = int(os.environ.get('GUNICORN_WORKERS', 1))
+
+    # Limite de requisições por cliente (chave de API ou IP) nas rotas /cep e /usuarios
+    RATE_LIMIT_HABILITADO = os.environ.get('RATE_LIMIT_HABILITADO', 'True').lower() == 'true'
+    RATE_LIMIT_TAXA = float(os.environ.get('RATE_LIMIT_TAXA', 20))
+    RATE_LIMIT_RAJADA = int(os.environ.get('RATE_LIMIT_RAJADA', 40))
+    RATE_LIMIT_CABECALHO_CLIENTE = os.environ.get('RATE_LIMIT_CABECALHO_CLIENTE', 'X-API-Key')
+    # Chaves de API reconhecidas (separadas por vírgula); outras chaves são ignoradas e vale o IP
+    RATE_LIMIT_CHAVES_API = os.environ.get('RATE_LIMIT_CHAVES_API', '')
+    RATE_LIMIT_PREFIXO = os.environ.get('RATE_LIMIT_PREFIXO', 'limite:')
+    # Sem URL (ou memory://) os limites valem por processo; com redis://... valem para todos os workers
+    RATE_LIMIT_ARMAZENAMENTO_URL = os.environ.get('RATE_LIMIT_ARMAZENAMENTO_URL')
+
+    # Origem dos endereços: viacep (padrão), local_primeiro (banco antes do
+    # ViaCEP) ou local (somente a base importada)
+    CEP_RESOLVER_MODO = os.environ.get('CEP_RESOLVER_MODO', 'viacep')
+
+    # Provedores de CEP consultados pelo resolvedor, na ordem inicial de
+    # preferência: viacep, local (base importada), opencep, brasilapi
+    CEP_PROVEDORES = os.environ.get('CEP_PROVEDORES', 'viacep')
+    CEP_PROVEDOR_OPENCEP_URL = os.environ.get('CEP_PROVEDOR_OPENCEP_URL', 'https://opencep.com/v1')
+    CEP_PROVEDOR_BRASILAPI_URL = os.environ.get('CEP_PROVEDOR_BRASILAPI_URL', 'https://brasilapi.com.br/api/cep/v1')
+    CEP_PROVEDORES_TIMEOUT = float(os.environ.get('CEP_PROVEDORES_TIMEOUT', 3))
+    # Reordena os provedores pela latência e falhas medidas
+    CEP_PROVEDORES_ADAPTATIVO = os.environ.get('CEP_PROVEDORES_ADAPTATIVO', 'True').lower() == 'true'
+    CEP_PROVEDORES_JANELA = int(os.environ.get('CEP_PROVEDORES_JANELA', 200))
+    CEP_PROVEDORES_THREADS = int(os.environ.get('CEP_PROVEDORES_THREADS', 16))
+    # Hedge: sem resposta até o percentil da latência do provedor, dispara o
+    # próximo em paralelo (no máximo em CEP_HEDGE_FRACAO_MAXIMA das consultas)
+    CEP_HEDGE_HABILITADO = os.environ.get('CEP_HEDGE_HABILITADO', 'True').lower() == 'true'
+    CEP_HEDGE_PERCENTIL = int(os.environ.get('CEP_HEDGE_PERCENTIL', 95))
+    CEP_HEDGE_ATRASO_MINIMO_MS = int(os.environ.get('CEP_HEDGE_ATRASO_MINIMO_MS', 20))
+    CEP_HEDGE_ATRASO_PADRAO_MS = int(os.environ.get('CEP_HEDGE_ATRASO_PADRAO_MS', 300))
+    CEP_HEDGE_FRACAO_MAXIMA = float(os.environ.get('CEP_HEDGE_FRACAO_MAXIMA', 0.2))
+
+    # Índice de CEPs mapeado em memória (gerado por flask cep construir-indice)
+    CEP_INDICE_ARQUIVO = os.environ.get('CEP_INDICE_ARQUIVO')
+    CEP_INDICE_INTERVALO_VERIFICACAO = int(os.environ.get('CEP_INDICE_INTERVALO_VERIFICACAO', 30))
+
+    # Cache de consultas de CEP
+    CEP_CACHE_HABILITADO = os.environ.get('CEP_CACHE_HABILITADO', 'True').lower() == 'true'
+    CEP_CACHE_TAMANHO = int(os.environ.get('CEP_CACHE_TAMANHO', 10000))
+    CEP_CACHE_TTL = int(os.environ.get('CEP_CACHE_TTL', 86400))
+    CEP_CACHE_TTL_NEGATIVO = int(os.environ.get('CEP_CACHE_TTL_NEGATIVO', 300))
+    # Após esse tempo o endereço em cache é servido e renovado em segundo plano (0 desativa)
+    CEP_CACHE_TTL_FRESCO = int(os.environ.get('CEP_CACHE_TTL_FRESCO', 0))
+    CEP_CACHE_PREFIXO = os.environ.get('CEP_CACHE_PREFIXO', 'cep:')
+    # memory:// para cache compartilhado em memória ou redis://host:6379/0
+    CEP_CACHE_COMPARTILHADO_URL = os.environ.get('CEP_CACHE_COMPARTILHADO_URL')
+
+    # Consulta de CEPs em lote
+    CEP_LOTE_LIMITE = int(os.environ.get('CEP_LOTE_LIMITE', 100))
+    CEP_LOTE_PARALELISMO = int(os.environ.get('CEP_LOTE_PARALELISMO', 8))
+
+    # Agrupamento de consultas concorrentes ao mesmo CEP
+    CEP_COALESCER_ENTRE_WORKERS = os.environ.get('CEP_COALESCER_ENTRE_WORKERS', 'False').lower() == 'true'
+    CEP_COALESCER_TTL_LOCK = float(os.environ.get('CEP_COALESCER_TTL_LOCK', 10))
+    CEP_COALESCER_INTERVALO_ESPERA = float(os.environ.get('CEP_COALESCER_INTERVALO_ESPERA', 0.05))
+
+    # Atualização em segundo plano dos CEPs (renovações do cache e flask cep atualizador)
+    CEP_ATUALIZACAO_FILA = int(os.environ.get('CEP_ATUALIZACAO_FILA', 1000))
+    CEP_ATUALIZACAO_TAXA = float(os.environ.get('CEP_ATUALIZACAO_TAXA', 5))
+    CEP_ATUALIZACAO_IDADE_MAXIMA = int(os.environ.get('CEP_ATUALIZACAO_IDADE_MAXIMA', 30 * 86400))
+    CEP_ATUALIZACAO_LOTE = int(os.environ.get('CEP_ATUALIZACAO_LOTE', 500))
+    CEP_ATUALIZACAO_INTERVALO = int(os.environ.get('CEP_ATUALIZACAO_INTERVALO', 3600))
+    CEP_AQUECIMENTO_TOP = int(os.environ.get('CEP_AQUECIMENTO_TOP', 1000))
+
+    # Registro assíncrono (write-behind) das consultas de POST /cep/<cep>
+    CEP_REGISTRO_ASSINCRONO = os.environ.get('CEP_REGISTRO_ASSINCRONO', 'False').lower() == 'true'
+    CEP_REGISTRO_FILA = int(os.environ.get('CEP_REGISTRO_FILA', 10000))
+    CEP_REGISTRO_LOTE = int(os.environ.get('CEP_REGISTRO_LOTE', 500))
+    CEP_REGISTRO_INTERVALO_MS = int(os.environ.get('CEP_REGISTRO_INTERVALO_MS', 200))
+    CEP_REGISTRO_ESPERA_MAXIMA_MS = int(os.environ.get('CEP_REGISTRO_ESPERA_MAXIMA_MS', 50))
+    # Tentativas de gravar um lote (com backoff exponencial) antes de contá-lo como falha
+    CEP_REGISTRO_TENTATIVAS = int(os.environ.get('CEP_REGISTRO_TENTATIVAS', 3))
+    CEP_REGISTRO_BACKOFF_MS = int(os.environ.get('CEP_REGISTRO_BACKOFF_MS', 100))
+    # sincrono (grava na requisição), descartar ou rejeitar (503) com a fila cheia
+    CEP_REGISTRO_FILA_CHEIA = os.environ.get('CEP_REGISTRO_FILA_CHEIA', 'sincrono')
+
+    # Réplicas de leitura (URLs separadas por vírgula): os SELECTs das
+    # requisições GET vão para elas e as escritas ficam no primário
+    DATABASE_REPLICA_URLS = [
+        url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()
+    ]
+    SQLALCHEMY_BINDS = {f'replica_{i}': url for i, url in enumerate(DATABASE_REPLICA_URLS)}
+    # round_robin ou menos_conexoes
+    DB_REPLICA_SELECAO = os.environ.get('DB_REPLICA_SELECAO', 'round_robin')
+    DB_REPLICA_VERIFICACAO_INTERVALO = float(os.environ.get('DB_REPLICA_VERIFICACAO_INTERVALO', 5))
+    # Atraso de replicação (s) acima do qual a réplica sai de circulação (PostgreSQL)
+    DB_REPLICA_ATRASO_MAXIMO = float(os.environ.get('DB_REPLICA_ATRASO_MAXIMO', 10))
+    # Após uma escrita, o cliente lê do primário por esse tempo (s)
+    DB_REPLICA_JANELA_PRIMARIO = int(os.environ.get('DB_REPLICA_JANELA_PRIMARIO', 5))
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -23,10 +206,12 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get(
         'TEST_DATABASE_URL', 'postgresql://postgres:postgres@db:5432/api_viacep_test'
     )
+    CEP_CACHE_COMPARTILHADO_URL = 'memory://'
 
 
 class ProductionConfig(Config):
     DEBUG = False
+    SQLALCHEMY_ENGINE_OPTIONS = opcoes_engine_producao()
 
 
 config = {
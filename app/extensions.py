@@ -2,10 +2,34 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_restx import Api
+from .atualizacao import FilaAtualizacao
+from .cache import CepCache
+from .compressao import Compressao
+from .indice_cep import IndiceCep
+from .limitador import LimitadorTaxa
+from .metrics import Metricas
+from .perfilamento import Perfilador
+from .registro import RegistroConsultas
+from .replicas import RoteadorReplicas, SessaoRoteada
+from .resolvedor import ResolvedorCep
+from .singleflight import SingleFlight
+from .viacep import ViaCEPClient
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
 migrate = Migrate()
 cors = CORS()
+cep_cache = CepCache()
+viacep = ViaCEPClient()
+coalescedor = SingleFlight()
+indice_cep = IndiceCep()
+atualizador = FilaAtualizacao()
+registro_consultas = RegistroConsultas()
+replicas = RoteadorReplicas()
+resolvedor = ResolvedorCep()
+metricas = Metricas()
+perfilador = Perfilador()
+compressao = Compressao()
+limitador = LimitadorTaxa()
 api = Api(
     title="API ViaCEP",
     version="1.0",
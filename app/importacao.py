@@ -0,0 +1,234 @@
+import json
+import time
+
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+
+from .extensions import db
+from .limitador import LimiteExcedido
+from .models import Usuario
+from .utils import consultar_ceps
+from .validacao import formatar_ceps, validar_cpfs, validar_emails
+
+CAMPOS_OBRIGATORIOS = ('nome_completo', 'email', 'senha', 'cpf', 'cep')
+
+# Tamanho máximo dos campos informados pelo usuário, pelas colunas da tabela
+TAMANHOS_MAXIMOS = {
+    campo: Usuario.__table__.c[campo].type.length
+    for campo in ('nome_completo', 'email', 'senha', 'cpf', 'complemento')
+}
+
+
+def ler_ndjson(linhas):
+    """
+    Converte linhas NDJSON (str ou bytes) em dicionários, ignorando linhas vazias.
+    Linhas inválidas viram um dicionário com a chave _erro.
+    """
+    for linha in linhas:
+        if isinstance(linha, bytes):
+            linha = linha.decode('utf-8')
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except ValueError:
+            registro = {'_erro': 'JSON inválido'}
+        yield registro if isinstance(registro, dict) else {'_erro': 'Registro deve ser um objeto JSON'}
+
+
+def _em_blocos(registros, tamanho):
+    bloco = []
+    for registro in registros:
+        bloco.append(registro)
+        if len(bloco) >= tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+def _campos_ausentes(registro):
+    """
+    Retorna a mensagem de erro de estrutura do registro (campos ausentes, de
+    tipo errado ou maiores que as colunas da tabela) ou None
+    """
+    if '_erro' in registro:
+        return registro['_erro']
+    for campo in CAMPOS_OBRIGATORIOS:
+        if not registro.get(campo) or not isinstance(registro[campo], str):
+            return f'Campo obrigatório ausente: {campo}'
+    complemento = registro.get('complemento')
+    if complemento is not None and not isinstance(complemento, str):
+        return 'Campo inválido: complemento deve ser texto'
+    for campo, tamanho in TAMANHOS_MAXIMOS.items():
+        if len(registro.get(campo) or '') > tamanho:
+            return f'Campo {campo} excede {tamanho} caracteres'
+    return None
+
+
+class ImportacaoUsuarios:
+    """
+    Importa usuários em lotes: valida cada bloco, resolve os CEPs distintos
+    uma única vez, detecta emails/CPFs repetidos no arquivo e no banco com
+    consultas por conjunto e insere os válidos com um INSERT por bloco
+    """
+
+    def __init__(self, tamanho_bloco=1000):
+        self.tamanho_bloco = tamanho_bloco
+        self.emails_vistos = set()
+        self.cpfs_vistos = set()
+        self.criados = 0
+        self.erros = 0
+        self.inicio = None
+
+    def executar(self, registros):
+        """
+        Processa os registros e gera o resultado de cada linha, na ordem de entrada
+        """
+        self.inicio = time.perf_counter()
+        numero = 0
+        for bloco in _em_blocos(registros, self.tamanho_bloco):
+            resultados = self._processar_bloco(bloco, numero)
+            numero += len(bloco)
+            yield from resultados
+
+    def _processar_bloco(self, bloco, primeira_linha):
+        resultados = [
+            {'linha': primeira_linha + i + 1, 'status': 'erro', 'id': None, 'message': _campos_ausentes(registro)}
+            for i, registro in enumerate(bloco)
+        ]
+        validos = [i for i, resultado in enumerate(resultados) if resultado['message'] is None]
+
+        # Validações do bloco inteiro de uma vez
+        emails_validos = validar_emails([bloco[i]['email'] for i in validos])
+        cpfs_validos = validar_cpfs([bloco[i]['cpf'] for i in validos])
+        ceps = dict(zip(validos, formatar_ceps([bloco[i]['cep'] for i in validos])))
+        for i, email_valido, cpf_valido in zip(list(validos), emails_validos, cpfs_validos):
+            if not email_valido:
+                resultados[i]['message'] = 'Email inválido'
+            elif not cpf_valido:
+                resultados[i]['message'] = 'CPF inválido'
+            elif not ceps[i]:
+                resultados[i]['message'] = 'CEP inválido'
+            else:
+                continue
+            validos.remove(i)
+
+        # Repetidos de usuários já criados em blocos anteriores do arquivo
+        for i in list(validos):
+            if bloco[i]['email'] in self.emails_vistos or bloco[i]['cpf'] in self.cpfs_vistos:
+                resultados[i]['message'] = 'Email ou CPF repetido no arquivo'
+                validos.remove(i)
+
+        # Já cadastrados no banco
+        if validos:
+            emails = {bloco[i]['email'] for i in validos}
+            cpfs = {bloco[i]['cpf'] for i in validos}
+            existentes = {
+                valor for (valor,) in db.session.query(Usuario.email).filter(Usuario.email.in_(emails))
+            } | {
+                valor for (valor,) in db.session.query(Usuario.cpf).filter(Usuario.cpf.in_(cpfs))
+            }
+            for i in list(validos):
+                if bloco[i]['email'] in existentes or bloco[i]['cpf'] in existentes:
+                    resultados[i]['message'] = 'Email ou CPF já cadastrado'
+                    validos.remove(i)
+
+        # CEPs distintos do bloco, resolvidos uma única vez
+        if validos:
+            enderecos = consultar_ceps({ceps[i] for i in validos})
+            for i in list(validos):
+                endereco = enderecos.get(ceps[i])
+                if isinstance(endereco, LimiteExcedido):
+                    # A linha é rejeitada e a importação continua, para que
+                    # apenas as linhas recusadas sejam reenviadas
+                    resultados[i]['message'] = f'{endereco}, tente novamente'
+                    validos.remove(i)
+                elif not endereco:
+                    resultados[i]['message'] = 'CEP inválido ou não encontrado'
+                    validos.remove(i)
+
+        # Repetidos dentro do bloco: só depois das demais validações, para que
+        # uma linha recusada não impeça a próxima com o mesmo email/CPF
+        emails_bloco, cpfs_bloco = set(), set()
+        for i in list(validos):
+            email, cpf = bloco[i]['email'], bloco[i]['cpf']
+            if email in emails_bloco or cpf in cpfs_bloco:
+                resultados[i]['message'] = 'Email ou CPF repetido no arquivo'
+                validos.remove(i)
+            else:
+                emails_bloco.add(email)
+                cpfs_bloco.add(cpf)
+
+        if validos:
+            linhas = []
+            for i in validos:
+                registro = bloco[i]
+                endereco = enderecos[ceps[i]]
+                linhas.append({
+                    'nome_completo': registro['nome_completo'],
+                    'email': registro['email'],
+                    'senha': registro['senha'],  # Em produção, deve-se usar hash
+                    'cpf': registro['cpf'],
+                    'cep': ceps[i],
+                    'logradouro': endereco['logradouro'],
+                    'complemento': registro.get('complemento') or '',
+                    'bairro': endereco['bairro'],
+                    'localidade': endereco['localidade'],
+                    'estado': endereco['estado']
+                })
+            for i, (id_usuario, erro) in zip(validos, self._inserir(linhas)):
+                resultados[i]['id'] = id_usuario
+                resultados[i]['message'] = erro
+                if erro is None:
+                    # Só os usuários criados contam como repetidos nos blocos seguintes
+                    self.emails_vistos.add(bloco[i]['email'])
+                    self.cpfs_vistos.add(bloco[i]['cpf'])
+
+        for resultado in resultados:
+            if resultado['message'] is None:
+                resultado['status'] = 'criado'
+                self.criados += 1
+            else:
+                self.erros += 1
+        return resultados
+
+    def _inserir(self, linhas):
+        """
+        Insere o bloco em um único INSERT. Se outro processo cadastrou um dos
+        emails/CPFs nesse meio tempo ou o banco recusar algum valor, insere
+        linha a linha (um savepoint por linha) para isolar o erro.
+        Retorna (id, erro) para cada linha.
+        """
+        stmt = insert(Usuario).returning(Usuario.id, sort_by_parameter_order=True)
+        try:
+            ids = db.session.scalars(stmt, linhas).all()
+            db.session.commit()
+            return [(id_usuario, None) for id_usuario in ids]
+        except (IntegrityError, DataError):
+            db.session.rollback()
+
+        resultados = []
+        for linha in linhas:
+            try:
+                with db.session.begin_nested():
+                    resultados.append((db.session.scalar(stmt, linha), None))
+            except IntegrityError:
+                resultados.append((None, 'Email ou CPF já cadastrado'))
+            except SQLAlchemyError as e:
+                current_app.logger.warning(f'Usuário recusado pelo banco na importação: {e.__class__.__name__}')
+                resultados.append((None, 'Dados recusados pelo banco de dados'))
+        db.session.commit()
+        return resultados
+
+    def resumo(self):
+        decorrido = time.perf_counter() - self.inicio if self.inicio else 0
+        total = self.criados + self.erros
+        return {
+            'total': total,
+            'criados': self.criados,
+            'erros': self.erros,
+            'segundos': round(decorrido, 3),
+            'linhas_por_s': round(total / decorrido, 1) if decorrido else None
+        }
@@ -0,0 +1,172 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+# Cabeçalho: assinatura, ordem dos bytes, quantidade de CEPs
+MAGICO = b'CEPIDX01'
+CABECALHO = struct.Struct('<8s4sI')
+ORDEM_BYTES = sys.byteorder[:1].encode().ljust(4, b'\0')
+
+
+def construir_indice(enderecos, caminho):
+    """
+    Gera o arquivo de índice a partir de dicionários de endereço ordenados
+    por CEP. Layout: cabeçalho, CEPs (uint32), deslocamentos (uint32, n + 1)
+    e o pool de strings JSON. O arquivo é escrito em um temporário e trocado
+    atomicamente, para que workers com o índice antigo mapeado não sejam afetados.
+    Retorna a quantidade de CEPs indexados.
+    """
+    ceps = array('I')
+    deslocamentos = array('I', [0])
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    pool_temporario = temporario + '.pool'
+
+    try:
+        with open(pool_temporario, 'wb') as pool:
+            for endereco in enderecos:
+                cep = int(endereco['cep'])
+                if ceps and cep <= ceps[-1]:
+                    raise ValueError('Os endereços devem estar ordenados por CEP e sem repetição')
+                dados = json.dumps(endereco, ensure_ascii=False, separators=(',', ':')).encode()
+                pool.write(dados)
+                ceps.append(cep)
+                deslocamentos.append(deslocamentos[-1] + len(dados))
+
+        with open(temporario, 'wb') as saida, open(pool_temporario, 'rb') as pool:
+            saida.write(CABECALHO.pack(MAGICO, ORDEM_BYTES, len(ceps)))
+            ceps.tofile(saida)
+            deslocamentos.tofile(saida)
+            while True:
+                bloco = pool.read(1 << 20)
+                if not bloco:
+                    break
+                saida.write(bloco)
+        os.replace(temporario, caminho)
+    finally:
+        os.remove(pool_temporario)
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+    return len(ceps)
+
+
+class IndiceCep:
+    """
+    Índice de CEPs somente leitura mapeado em memória (mmap). As páginas do
+    arquivo ficam no page cache do sistema e são compartilhadas entre os
+    workers; cada processo mantém apenas as views sobre o mapeamento.
+    """
+
+    def __init__(self, app=None):
+        self.caminho = None
+        self.intervalo_verificacao = 30
+        # (mmap, CEPs, deslocamentos, início do pool), trocado de uma só vez
+        self._estado = None
+        self._mtime = None
+        self._verificado_em = None
+        self._lock = threading.Lock()
+        self._app = None
+        self.hits = 0
+        self.misses = 0
+        self.erros = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.caminho = app.config['CEP_INDICE_ARQUIVO']
+        self.intervalo_verificacao = app.config['CEP_INDICE_INTERVALO_VERIFICACAO']
+        self._app = app
+        app.extensions['indice_cep'] = self
+
+    def _abrir(self):
+        """
+        Mapeia o arquivo na primeira consulta e o remapeia quando ele é
+        substituído por um novo build. Um arquivo inválido é ignorado (o
+        índice anterior, se houver, continua em uso) até ser substituído.
+        """
+        agora = time.monotonic()
+        if self._verificado_em is not None and agora - self._verificado_em < self.intervalo_verificacao:
+            return self._estado is not None
+
+        with self._lock:
+            self._verificado_em = agora
+            try:
+                mtime = os.stat(self.caminho).st_mtime_ns
+            except OSError:
+                return self._estado is not None
+            if mtime == self._mtime:
+                return self._estado is not None
+
+            # O mtime é registrado mesmo com falha, para não tentar o mesmo arquivo a cada consulta
+            self._mtime = mtime
+            try:
+                estado = self._mapear()
+            except (ValueError, struct.error, OSError) as e:
+                self.erros += 1
+                if self._app is not None:
+                    self._app.logger.warning(f'Índice de CEP {self.caminho} ignorado: {e}')
+                return self._estado is not None
+
+            # O mapeamento antigo é liberado quando não houver mais referências a ele
+            self._estado = estado
+            return True
+
+    def _mapear(self):
+        with open(self.caminho, 'rb') as f:
+            mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magico, ordem, quantidade = CABECALHO.unpack_from(mapa, 0)
+            if magico != MAGICO or ordem != ORDEM_BYTES:
+                raise ValueError('assinatura ou ordem dos bytes inválida')
+
+            inicio = CABECALHO.size
+            fim_ceps = inicio + 4 * quantidade
+            fim_deslocamentos = fim_ceps + 4 * (quantidade + 1)
+            # O último deslocamento é o tamanho do pool de strings
+            if (len(mapa) < fim_deslocamentos
+                    or len(mapa) < fim_deslocamentos + struct.unpack_from('=I', mapa, fim_deslocamentos - 4)[0]):
+                raise ValueError('arquivo truncado')
+        except (ValueError, struct.error):
+            mapa.close()
+            raise
+
+        visao = memoryview(mapa)
+        return (
+            mapa,
+            visao[inicio:fim_ceps].cast('I'),
+            visao[fim_ceps:fim_deslocamentos].cast('I'),
+            fim_deslocamentos
+        )
+
+    def get(self, cep_formatado):
+        """
+        Retorna o endereço do CEP ou None se ele não estiver no índice
+        """
+        if not self.caminho or not self._abrir():
+            return None
+
+        mapa, ceps, deslocamentos, inicio_pool = self._estado
+        chave = int(cep_formatado)
+        i = bisect_left(ceps, chave)
+        if i == len(ceps) or ceps[i] != chave:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(mapa[inicio_pool + deslocamentos[i]:inicio_pool + deslocamentos[i + 1]])
+
+    def stats(self):
+        return {
+            'arquivo': self.caminho,
+            'carregado': self._estado is not None,
+            'ceps': len(self._estado[1]) if self._estado is not None else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'erros': self.erros
+        }
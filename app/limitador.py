@@ -0,0 +1,289 @@
+import functools
+import hashlib
+import math
+import threading
+import time
+
+from flask import request
+
+from .cache import erros_backend
+from .metrics import LIMITE_ERROS_COMPARTILHADO, LIMITE_REJEICOES
+
+# Token bucket atômico no Redis. Retorna a espera (s) para usar o token
+# reservado ou, negativa, o tempo até haver um token quando a espera
+# necessária passa de espera_maxima (nada é reservado nesse caso).
+SCRIPT_TOKEN_BUCKET = """
+local capacidade = tonumber(ARGV[1])
+local taxa = tonumber(ARGV[2])
+local espera_maxima = tonumber(ARGV[3])
+local relogio = redis.call('TIME')
+local agora = tonumber(relogio[1]) + tonumber(relogio[2]) / 1000000
+local estado = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(estado[1]) or capacidade
+local ts = tonumber(estado[2]) or agora
+tokens = math.min(capacidade, tokens + math.max(0, agora - ts) * taxa)
+local espera = 0
+if tokens < 1 then
+    espera = (1 - tokens) / taxa
+    if espera > espera_maxima then
+        return tostring(-espera)
+    end
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens - 1, 'ts', agora)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacidade + espera_maxima * taxa) / taxa * 1000) + 1000)
+return tostring(espera)
+"""
+
+
+class LimiteExcedido(Exception):
+    """
+    Disparada quando um limite de taxa é atingido; retry_after indica em
+    quantos segundos uma nova tentativa pode ser feita
+    """
+
+    def __init__(self, mensagem, retry_after):
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+
+
+# Baldes em memória a partir dos quais a limpeza dos já cheios fica mais frequente
+MAXIMO_BALDES_LOCAIS = 100000
+
+
+class BaldesLocais:
+    """
+    Token buckets em memória do processo, um por chave
+    """
+
+    def __init__(self, maximo=MAXIMO_BALDES_LOCAIS, relogio=time.monotonic):
+        self.maximo = maximo
+        self.relogio = relogio
+        self._baldes = {}
+        self._lock = threading.Lock()
+        self._operacoes = 0
+
+    def reservar(self, chave, capacidade, taxa, espera_maxima=0, parte_local=None):
+        """
+        Reserva um token do balde da chave. Retorna a espera (s) até o token
+        poder ser usado ou, negativa, o tempo até haver um token quando a
+        espera passaria de espera_maxima. parte_local só é usada pelos baldes
+        compartilhados: aqui os baldes já são do processo.
+        """
+        with self._lock:
+            agora = self.relogio()
+            tokens, ts = self._baldes.get(chave, (capacidade, agora))
+            tokens = min(capacidade, tokens + (agora - ts) * taxa)
+            espera = 0.0
+            if tokens < 1:
+                espera = (1 - tokens) / taxa
+                if espera > espera_maxima:
+                    return -espera
+            self._baldes[chave] = (tokens - 1, agora)
+
+            self._operacoes += 1
+            intervalo_limpeza = 256 if len(self._baldes) > self.maximo else 4096
+            if self._operacoes % intervalo_limpeza == 0:
+                self._descartar_cheios(agora, capacidade / taxa)
+            return espera
+
+    def _descartar_cheios(self, agora, tempo_para_encher):
+        # Baldes que já teriam se enchido equivalem a baldes novos
+        for chave in [c for c, (_, ts) in self._baldes.items() if agora - ts > tempo_para_encher]:
+            del self._baldes[chave]
+
+
+class BaldesCompartilhados:
+    """
+    Token buckets no Redis, compartilhados por todos os workers. Se o Redis
+    falhar, a reserva é feita em baldes do próprio processo (local): o
+    limite continua valendo, por worker, em vez de a requisição falhar.
+    Limites globais (como o orçamento do ViaCEP) informam em parte_local a
+    (capacidade, taxa) de cada worker, para que a soma dos workers não passe
+    do limite durante a falha.
+    """
+
+    def __init__(self, redis, app=None):
+        self._script = redis.register_script(SCRIPT_TOKEN_BUCKET)
+        self.erros = erros_backend(redis)
+        self.local = BaldesLocais()
+        self.falhas = 0
+        self._app = app
+
+    def reservar(self, chave, capacidade, taxa, espera_maxima=0, parte_local=None):
+        try:
+            return float(self._script(keys=[chave], args=[capacidade, taxa, espera_maxima]))
+        except self.erros as e:
+            self._registrar_falha(chave, e)
+            if parte_local is not None:
+                capacidade, taxa = parte_local
+            return self.local.reservar(chave, capacidade, taxa, espera_maxima)
+
+    def _registrar_falha(self, chave, erro):
+        self.falhas += 1
+        LIMITE_ERROS_COMPARTILHADO.inc()
+        if self._app is not None:
+            self._app.logger.warning(f'Armazenamento dos limites indisponível ({chave}): {erro}')
+
+
+def criar_baldes(url, app=None):
+    """
+    Cria o armazenamento dos baldes: em memória do processo sem URL (ou com
+    memory://) ou no Redis com redis://...
+    """
+    if not url or url.startswith('memory://'):
+        return BaldesLocais()
+
+    import redis
+    return BaldesCompartilhados(redis.Redis.from_url(url), app)
+
+
+class Orcamento:
+    """
+    Limite global de chamadas por segundo a um serviço externo. Chamadas além
+    do limite aguardam a sua vez por até espera_maxima segundos; acima disso
+    são recusadas com LimiteExcedido. workers é o número de processos que
+    dividem o orçamento se os baldes compartilhados ficarem indisponíveis.
+    """
+
+    def __init__(self, baldes, chave, taxa, capacidade, espera_maxima, dormir=time.sleep, workers=1):
+        self.baldes = baldes
+        self.chave = chave
+        self.taxa = taxa
+        self.capacidade = capacidade
+        taxa_local, capacidade_local = dividir_orcamento(taxa, capacidade, workers)
+        self.parte_local = (capacidade_local, taxa_local)
+        self.espera_maxima = espera_maxima
+        self.dormir = dormir
+        self.esperas = 0
+        self.rejeicoes = 0
+
+    def adquirir(self):
+        espera = self.baldes.reservar(self.chave, self.capacidade, self.taxa, self.espera_maxima, self.parte_local)
+        if espera < 0:
+            self.rejeicoes += 1
+            LIMITE_REJEICOES.labels('orcamento_viacep').inc()
+            raise LimiteExcedido('Limite de consultas ao ViaCEP excedido', -espera)
+        if espera > 0:
+            self.esperas += 1
+            self.dormir(espera)
+
+    def stats(self):
+        return {
+            'taxa': self.taxa,
+            'capacidade': self.capacidade,
+            'esperas': self.esperas,
+            'rejeicoes': self.rejeicoes
+        }
+
+
+def dividir_orcamento(taxa, rajada, workers):
+    """
+    Parte de cada worker no orçamento global (taxa e rajada) quando os
+    baldes ficam na memória de cada processo: juntos, os workers não passam
+    da taxa configurada
+    """
+    workers = max(1, workers)
+    return taxa / workers, max(1, rajada // workers)
+
+
+class LimitadorTaxa:
+    """
+    Limita a taxa de requisições por cliente (token bucket por chave de API
+    reconhecida ou IP) e o total de chamadas ao ViaCEP (orçamento global)
+    """
+
+    def __init__(self, app=None):
+        self.habilitado = False
+        self.taxa = 20
+        self.capacidade = 40
+        self.cabecalho_cliente = 'X-API-Key'
+        self.chaves_api = frozenset()
+        self.prefixo = 'limite:'
+        self.baldes = BaldesLocais()
+        self.orcamento_viacep = None
+        self.rejeicoes = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.habilitado = app.config['RATE_LIMIT_HABILITADO']
+        self.taxa = app.config['RATE_LIMIT_TAXA']
+        self.capacidade = app.config['RATE_LIMIT_RAJADA']
+        self.cabecalho_cliente = app.config['RATE_LIMIT_CABECALHO_CLIENTE']
+        self.chaves_api = frozenset(
+            chave.strip() for chave in app.config['RATE_LIMIT_CHAVES_API'].split(',') if chave.strip()
+        )
+        self.prefixo = app.config['RATE_LIMIT_PREFIXO']
+        self.baldes = criar_baldes(app.config['RATE_LIMIT_ARMAZENAMENTO_URL'], app)
+
+        # Com baldes compartilhados, o orçamento inteiro vale para todos os
+        # workers juntos e cada um só fica com a sua parte se o Redis falhar
+        workers = app.config['VIACEP_ORCAMENTO_WORKERS']
+        compartilhado = isinstance(self.baldes, BaldesCompartilhados)
+        taxa_viacep, rajada_viacep = dividir_orcamento(
+            app.config['VIACEP_ORCAMENTO_TAXA'],
+            app.config['VIACEP_ORCAMENTO_RAJADA'],
+            1 if compartilhado else workers
+        )
+        self.orcamento_viacep = Orcamento(
+            self.baldes,
+            self.prefixo + 'orcamento:viacep',
+            taxa_viacep,
+            rajada_viacep,
+            app.config['VIACEP_ORCAMENTO_ESPERA_MAXIMA'],
+            workers=workers if compartilhado else 1
+        ) if taxa_viacep > 0 else None
+        app.extensions['limitador'] = self
+
+    def cliente(self):
+        """
+        Identifica o cliente pela chave de API, se for uma das chaves
+        reconhecidas, ou pelo IP. Chaves desconhecidas não contam: um cliente
+        que troca de chave a cada requisição continua no balde do seu IP.
+        """
+        chave = request.headers.get(self.cabecalho_cliente)
+        if chave and chave in self.chaves_api:
+            # O hash evita guardar a chave em claro no armazenamento dos baldes
+            return 'chave:' + hashlib.sha256(chave.encode()).hexdigest()[:16]
+        return 'ip:' + (request.remote_addr or 'desconhecido')
+
+    def verificar(self):
+        """
+        Consome um token do cliente da requisição atual ou dispara LimiteExcedido
+        """
+        espera = self.baldes.reservar(
+            self.prefixo + 'cliente:' + self.cliente(), self.capacidade, self.taxa
+        )
+        if espera < 0:
+            self.rejeicoes += 1
+            LIMITE_REJEICOES.labels('cliente').inc()
+            raise LimiteExcedido('Limite de requisições excedido', -espera)
+
+    def limitar(self, funcao):
+        """
+        Decorador das views limitadas (usado nos namespaces da API)
+        """
+        @functools.wraps(funcao)
+        def decorada(*args, **kwargs):
+            if self.habilitado:
+                self.verificar()
+            return funcao(*args, **kwargs)
+        return decorada
+
+    def stats(self):
+        return {
+            'habilitado': self.habilitado,
+            'taxa': self.taxa,
+            'rajada': self.capacidade,
+            'compartilhado': isinstance(self.baldes, BaldesCompartilhados),
+            'falhas_compartilhado': getattr(self.baldes, 'falhas', 0),
+            'rejeicoes': self.rejeicoes,
+            'orcamento_viacep': self.orcamento_viacep.stats() if self.orcamento_viacep else None
+        }
+
+
+def retry_after(erro):
+    """
+    Valor do cabeçalho Retry-After (segundos inteiros) para um LimiteExcedido
+    """
+    return str(max(1, math.ceil(erro.retry_after)))
@@ -0,0 +1,166 @@
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from prometheus_client import REGISTRY
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+REQUISICOES_LATENCIA = Histogram(
+    'http_request_duration_seconds', 'Latência das requisições HTTP',
+    ['metodo', 'rota', 'status']
+)
+ETAPA_LATENCIA = Histogram(
+    'app_stage_duration_seconds', 'Latência das etapas internas das requisições',
+    ['etapa']
+)
+VIACEP_LATENCIA = Histogram(
+    'viacep_request_duration_seconds', 'Latência das chamadas ao ViaCEP',
+    ['status']
+)
+DB_CONSULTAS = Histogram(
+    'db_queries_per_request', 'Consultas SQL executadas por requisição',
+    ['rota'], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+DB_LATENCIA = Histogram(
+    'db_time_per_request_seconds', 'Tempo gasto em consultas SQL por requisição',
+    ['rota']
+)
+DB_POOL_CONEXOES = Gauge(
+    'db_pool_connections', 'Conexões do pool de cada engine (primário e réplicas)',
+    ['engine', 'estado'], multiprocess_mode='livesum'
+)
+DB_ROTEAMENTO = Counter(
+    'db_read_routing_total', 'Leituras das requisições GET por engine escolhida',
+    ['engine']
+)
+PROVEDOR_LATENCIA = Histogram(
+    'cep_provider_duration_seconds', 'Latência das consultas aos provedores de CEP',
+    ['provedor', 'resultado']
+)
+PROVEDOR_HEDGES = Counter(
+    'cep_provider_hedges_total', 'Consultas disparadas em paralelo (hedge) por provedor',
+    ['provedor']
+)
+LIMITE_REJEICOES = Counter(
+    'rate_limit_rejections_total', 'Requisições recusadas por limite de taxa',
+    ['limite']
+)
+LIMITE_ERROS_COMPARTILHADO = Counter(
+    'rate_limit_shared_errors_total',
+    'Falhas do armazenamento compartilhado dos limites de taxa (reservas feitas no processo)'
+)
+CACHE_CONSULTAS = Counter(
+    'cep_cache_lookups_total', 'Consultas ao cache de CEP por resultado',
+    ['resultado']
+)
+
+CACHE_ERROS_COMPARTILHADO = Counter(
+    'cep_cache_shared_errors_total', 'Falhas do backend compartilhado (cache de CEP e lock do single-flight)',
+    ['operacao']
+)
+
+# Contadores já associados aos rótulos, para o caminho crítico do cache
+CACHE_HIT_LOCAL = CACHE_CONSULTAS.labels('hit_local')
+CACHE_HIT_COMPARTILHADO = CACHE_CONSULTAS.labels('hit_compartilhado')
+CACHE_MISS = CACHE_CONSULTAS.labels('miss')
+
+ETAPA_VIACEP = ETAPA_LATENCIA.labels('viacep')
+ETAPA_SERIALIZACAO = ETAPA_LATENCIA.labels('serializacao')
+
+_eventos_sql_registrados = False
+
+
+def observar_etapa(histograma, nome, duracao):
+    """
+    Registra a duração de uma etapa no histograma e, quando o log de
+    requisições lentas está ativo, nos tempos por etapa da requisição
+    """
+    histograma.observe(duracao)
+    etapas = g.get('etapas') if has_request_context() else None
+    if etapas is not None:
+        etapas[nome] = etapas.get(nome, 0.0) + duracao
+
+
+@contextmanager
+def medir_etapa(histograma, nome):
+    """
+    Mede a duração de um trecho de código e a registra como a etapa nome
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar_etapa(histograma, nome, time.perf_counter() - inicio)
+
+
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        context._inicio_metricas = time.perf_counter()
+
+
+def _depois_sql(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, '_inicio_metricas', None)
+    if inicio is not None:
+        g.db_consultas = g.get('db_consultas', 0) + 1
+        g.db_tempo = g.get('db_tempo', 0.0) + time.perf_counter() - inicio
+
+
+def _registro():
+    # Com gunicorn multi-processo, os valores de todos os workers são agregados
+    # a partir dos arquivos em PROMETHEUS_MULTIPROC_DIR
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        return registro
+    return REGISTRY
+
+
+class Metricas:
+    """
+    Registra as métricas de latência por rota, tempo de banco por requisição
+    e expõe tudo no formato do Prometheus em /metrics
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        global _eventos_sql_registrados
+
+        app.extensions['metricas'] = self
+        if not app.config['METRICAS_HABILITADAS']:
+            return
+
+        if not _eventos_sql_registrados:
+            event.listen(Engine, 'before_cursor_execute', _antes_sql)
+            event.listen(Engine, 'after_cursor_execute', _depois_sql)
+            _eventos_sql_registrados = True
+
+        app.before_request(self._antes_requisicao)
+        app.after_request(self._depois_requisicao)
+        app.add_url_rule('/metrics', 'metrics', self._expor)
+
+    def _antes_requisicao(self):
+        g.inicio_requisicao = time.perf_counter()
+
+    def _depois_requisicao(self, response):
+        inicio = g.get('inicio_requisicao')
+        if inicio is None:
+            return response
+
+        rota = request.url_rule.rule if request.url_rule is not None else 'desconhecida'
+        REQUISICOES_LATENCIA.labels(request.method, rota, response.status_code).observe(
+            time.perf_counter() - inicio
+        )
+        DB_CONSULTAS.labels(rota).observe(g.get('db_consultas', 0))
+        DB_LATENCIA.labels(rota).observe(g.get('db_tempo', 0.0))
+        return response
+
+    def _expor(self):
+        return Response(generate_latest(_registro()), mimetype=CONTENT_TYPE_LATEST)
@@ -1,12 +1,20 @@
 from datetime import datetime
 from .extensions import db
+from .validacao import ACENTOS, SEM_ACENTOS
+
+
+def _normalizada(coluna):
+    """
+    Coluna gerada pelo banco com o texto sem acentos e em minúsculas (ver normalizar_texto)
+    """
+    return db.Computed(f"lower(translate({coluna}, '{ACENTOS}', '{SEM_ACENTOS}'))", persisted=True)
 
 
 class CepConsulta(db.Model):
     __tablename__ = 'cep_consultas'
 
     id = db.Column(db.Integer, primary_key=True)
-    cep = db.Column(db.String(9), nullable=False)
+    cep = db.Column(db.String(9), nullable=False, index=True)
     logradouro = db.Column(db.String(100), nullable=True)
     complemento = db.Column(db.String(100), nullable=True)
     bairro = db.Column(db.String(50), nullable=True)
@@ -19,6 +27,7 @@ class CepConsulta(db.Model):
     ddd = db.Column(db.String(2), nullable=True)
     siafi = db.Column(db.String(10), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
         return f"<CepConsulta {self.cep}>"
@@ -40,6 +49,62 @@ class CepConsulta(db.Model):
         }
 
 
+class Endereco(db.Model):
+    """
+    Endereço canônico de um CEP (um registro por CEP, atualizado por upsert)
+    """
+    __tablename__ = 'enderecos'
+    __table_args__ = (
+        db.Index('ix_enderecos_uf_localidade', 'uf', 'localidade_normalizada'),
+        db.Index('ix_enderecos_localidade_bairro', 'localidade_normalizada', 'bairro_normalizado'),
+        db.Index('ix_enderecos_ddd', 'ddd'),
+        db.Index('ix_enderecos_ibge', 'ibge'),
+        # LIKE 'prefixo%' independente da collation do banco
+        db.Index('ix_enderecos_logradouro_prefixo', 'logradouro_normalizado',
+                 postgresql_ops={'logradouro_normalizado': 'varchar_pattern_ops'}),
+        # LIKE '%trecho%' (extensão pg_trgm)
+        db.Index('ix_enderecos_logradouro_trgm', 'logradouro_normalizado', postgresql_using='gin',
+                 postgresql_ops={'logradouro_normalizado': 'gin_trgm_ops'}),
+    )
+
+    cep = db.Column(db.String(9), primary_key=True)
+    logradouro = db.Column(db.String(100), nullable=True)
+    complemento = db.Column(db.String(100), nullable=True)
+    bairro = db.Column(db.String(50), nullable=True)
+    localidade = db.Column(db.String(50), nullable=True)
+    uf = db.Column(db.String(2), nullable=True)
+    estado = db.Column(db.String(50), nullable=True)
+    regiao = db.Column(db.String(50), nullable=True)
+    ibge = db.Column(db.String(10), nullable=True)
+    gia = db.Column(db.String(10), nullable=True)
+    ddd = db.Column(db.String(2), nullable=True)
+    siafi = db.Column(db.String(10), nullable=True)
+    logradouro_normalizado = db.Column(db.String(100), _normalizada('logradouro'))
+    localidade_normalizada = db.Column(db.String(50), _normalizada('localidade'))
+    bairro_normalizado = db.Column(db.String(50), _normalizada('bairro'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Endereco {self.cep}>"
+
+    def to_dict(self):
+        return {
+            "cep": self.cep,
+            "logradouro": self.logradouro,
+            "complemento": self.complemento,
+            "bairro": self.bairro,
+            "localidade": self.localidade,
+            "uf": self.uf,
+            "estado": self.estado,
+            "regiao": self.regiao,
+            "ibge": self.ibge,
+            "gia": self.gia,
+            "ddd": self.ddd,
+            "siafi": self.siafi
+        }
+
+
 class Usuario(db.Model):
     __tablename__ = 'usuarios'
 
@@ -0,0 +1,96 @@
+from urllib.parse import urlencode
+
+from flask import Response, current_app, request, stream_with_context
+
+from .cache_http import cache_control, etag_versao, validar_condicional
+from .metrics import ETAPA_SERIALIZACAO, medir_etapa
+from .serializacao import mascara_requisicao, serializar
+
+
+def parametros_paginacao():
+    """
+    Lê os parâmetros limit, cursor e stream da query string.
+    Dispara ValueError com a mensagem de erro se algum for inválido.
+    """
+    limite_maximo = current_app.config['LISTAGEM_LIMITE_MAXIMO']
+    try:
+        limite = int(request.args.get('limit', current_app.config['LISTAGEM_LIMITE_PADRAO']))
+        cursor = int(request.args.get('cursor', 0))
+    except ValueError:
+        raise ValueError('Parâmetros limit e cursor devem ser números inteiros')
+
+    if limite < 1 or limite > limite_maximo:
+        raise ValueError(f'O parâmetro limit deve estar entre 1 e {limite_maximo}')
+    if cursor < 0:
+        raise ValueError('O parâmetro cursor não pode ser negativo')
+
+    stream = request.args.get('stream', 'false').lower() in ('true', '1')
+    return limite, cursor, stream
+
+
+def listar_paginado(query, coluna_id, coluna_versao, codificador, publico=True, formatar_cursor=None):
+    """
+    Lista os registros da query com paginação por cursor (keyset) sobre
+    coluna_id. Apenas as colunas do model são lidas do banco e as linhas são
+    serializadas diretamente.
+    O próximo cursor é informado nos cabeçalhos X-Next-Cursor e Link. Com
+    stream=true, todos os registros após o cursor são enviados em NDJSON,
+    lidos do banco em blocos com um cursor no servidor.
+    Cada página recebe um ETag fraco, calculado a partir dos ids da página e
+    do maior valor de coluna_versao (ex.: updated_at), lidos na mesma
+    consulta; se o cliente já tiver a página (If-None-Match), a resposta é
+    304 sem serializar as linhas. formatar_cursor converte o cursor numérico
+    para o tipo de coluna_id (ex.: CEPs em texto). A máscara do cabeçalho
+    X-Fields é aplicada às páginas e ao stream.
+    """
+    try:
+        limite, cursor, stream = parametros_paginacao()
+    except ValueError as e:
+        return {'message': str(e)}, 400
+
+    # O cursor e a versão continuam sendo lidos mesmo que a máscara não os inclua
+    mascara = mascara_requisicao()
+    codificador = codificador.mascarar(mascara, extras=[coluna_id, coluna_versao])
+    valor_cursor = formatar_cursor(cursor) if formatar_cursor else cursor
+    query = codificador.selecionar(query).filter(coluna_id > valor_cursor).order_by(coluna_id)
+
+    if stream:
+        return _listar_stream(query, codificador)
+
+    linhas = query.limit(limite + 1).all()
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo = linhas[-1]._mapping[coluna_id]
+
+    mapeamentos = [linha._mapping for linha in linhas]
+    versao = max((m[coluna_versao] for m in mapeamentos if m[coluna_versao] is not None), default='')
+    nao_modificado, headers = validar_condicional(
+        etag_versao(','.join(str(m[coluna_id]) for m in mapeamentos), versao, proximo, mascara or ''),
+        fraco=True,
+        controle=cache_control(current_app.config['HTTP_CACHE_LISTAGEM_MAX_AGE'], publico),
+        variar=current_app.config['RESTX_MASK_HEADER']
+    )
+    if nao_modificado is not None:
+        return nao_modificado
+
+    with medir_etapa(ETAPA_SERIALIZACAO, 'serializacao'):
+        corpo = serializar([codificador(linha) for linha in linhas]) + b'\n'
+
+    if proximo is not None:
+        args = request.args.to_dict()
+        args.update({'cursor': proximo, 'limit': limite})
+        headers['X-Next-Cursor'] = str(proximo)
+        headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+
+    return Response(corpo, mimetype='application/json', headers=headers)
+
+
+def _listar_stream(query, codificador):
+    tamanho_bloco = current_app.config['LISTAGEM_STREAM_BLOCO']
+
+    def gerar():
+        for linha in query.yield_per(tamanho_bloco):
+            yield serializar(codificador(linha)) + b'\n'
+
+    return Response(stream_with_context(gerar()), mimetype='application/x-ndjson')
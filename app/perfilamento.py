@@ -0,0 +1,271 @@
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MODOS = ('amostragem', 'cprofile')
+
+# Tamanho máximo de cada comando SQL guardado no log de requisições lentas
+TAMANHO_MAXIMO_SQL = 500
+
+_eventos_sql_registrados = False
+
+
+class _Amostrador:
+    """
+    Amostra a pilha da thread da requisição a intervalos fixos e conta as
+    pilhas no formato collapsed (flamegraph.pl, speedscope, inferno)
+    """
+
+    extensao = 'folded'
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self._alvo = threading.get_ident()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name='perfil-amostragem', daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self._alvo)
+            pilha = []
+            while quadro is not None:
+                codigo = quadro.f_code
+                pilha.append(f'{codigo.co_name}({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})')
+                quadro = quadro.f_back
+            if pilha:
+                self.pilhas[';'.join(reversed(pilha))] += 1
+
+    def salvar(self, caminho):
+        with open(caminho, 'w') as f:
+            for pilha, amostras in self.pilhas.items():
+                f.write(f'{pilha} {amostras}\n')
+
+
+class _CProfile:
+    """
+    cProfile determinístico da requisição, gravado no formato do pstats
+    (snakeviz, flameprof)
+    """
+
+    extensao = 'prof'
+
+    def __init__(self, intervalo):
+        self.perfil = cProfile.Profile()
+
+    def iniciar(self):
+        self.perfil.enable()
+
+    def parar(self):
+        self.perfil.disable()
+
+    def salvar(self, caminho):
+        self.perfil.dump_stats(caminho)
+
+
+class _ComandosSql:
+    """
+    Comandos SQL da requisição: total, tempo somado e os primeiros maximo comandos
+    """
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self.total = 0
+        self.tempo = 0.0
+        self.comandos = []
+
+    def registrar(self, comando, tempo):
+        self.total += 1
+        self.tempo += tempo
+        if len(self.comandos) < self.maximo:
+            self.comandos.append({'comando': comando[:TAMANHO_MAXIMO_SQL], 'ms': round(tempo * 1000, 2)})
+
+
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and g.get('sql_lentas') is not None:
+        context._inicio_lentas = time.perf_counter()
+
+
+def _depois_sql(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, '_inicio_lentas', None)
+    if inicio is not None:
+        g.sql_lentas.registrar(statement, time.perf_counter() - inicio)
+
+
+class Perfilador:
+    """
+    Perfilamento sob demanda e log de requisições lentas. Uma fração das
+    requisições (PERFIL_AMOSTRAGEM) ou as que trazem o cabeçalho privilegiado
+    com PERFIL_TOKEN são perfiladas, uma por vez em cada processo, e o perfil
+    é gravado em PERFIL_DIRETORIO. Requisições acima de
+    REQUISICOES_LENTAS_LIMIAR_MS são registradas no log com os tempos por etapa
+    e os comandos SQL executados. Desabilitado, não registra nenhum hook.
+    """
+
+    def __init__(self, app=None):
+        self.habilitado = False
+        self.amostragem = 0.0
+        self.cabecalho = 'X-Perfil'
+        self.token = None
+        self.coletor = _Amostrador
+        self.intervalo = 0.002
+        self.diretorio = 'perfis'
+        self.limiar_lentas = 0
+        self.sql_maximo = 50
+        self._app = None
+        self._lock = threading.Lock()
+        self.perfis = 0
+        self.lentas = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        global _eventos_sql_registrados
+
+        modo = app.config['PERFIL_MODO']
+        if modo not in MODOS:
+            raise ValueError(f'PERFIL_MODO deve ser um de: {", ".join(MODOS)}')
+
+        self.habilitado = app.config['PERFIL_HABILITADO']
+        self.amostragem = app.config['PERFIL_AMOSTRAGEM']
+        self.cabecalho = app.config['PERFIL_CABECALHO']
+        self.token = app.config['PERFIL_TOKEN']
+        self.coletor = _CProfile if modo == 'cprofile' else _Amostrador
+        self.intervalo = app.config['PERFIL_INTERVALO_MS'] / 1000
+        self.diretorio = app.config['PERFIL_DIRETORIO']
+        self.limiar_lentas = app.config['REQUISICOES_LENTAS_LIMIAR_MS'] / 1000
+        self.sql_maximo = app.config['REQUISICOES_LENTAS_SQL_MAXIMO']
+        self._app = app
+        app.extensions['perfilador'] = self
+
+        if not self.habilitado and not self.limiar_lentas:
+            return
+
+        if self.habilitado:
+            os.makedirs(self.diretorio, exist_ok=True)
+        if self.limiar_lentas and not _eventos_sql_registrados:
+            event.listen(Engine, 'before_cursor_execute', _antes_sql)
+            event.listen(Engine, 'after_cursor_execute', _depois_sql)
+            _eventos_sql_registrados = True
+
+        app.before_request(self._antes_requisicao)
+        app.after_request(self._depois_requisicao)
+        app.teardown_request(self._encerrar)
+
+    def _solicitado(self):
+        # Cabeçalho privilegiado: vale apenas com o token configurado
+        valor = request.headers.get(self.cabecalho)
+        return bool(valor and self.token and hmac.compare_digest(valor, self.token))
+
+    def _antes_requisicao(self):
+        g.inicio_perfil = time.perf_counter()
+        if self.limiar_lentas:
+            g.etapas = {}
+            g.sql_lentas = _ComandosSql(self.sql_maximo)
+
+        if not self.habilitado:
+            return
+        solicitado = self._solicitado()
+        if not solicitado and (not self.amostragem or random.random() >= self.amostragem):
+            return
+        # Uma requisição perfilada por vez: limita o custo e evita perfis
+        # concorrentes (o cProfile é global a partir do Python 3.12)
+        if not self._lock.acquire(blocking=False):
+            return
+        coletor = self.coletor(self.intervalo)
+        try:
+            coletor.iniciar()
+        except ValueError:
+            # Outro profiler já ativo no processo (ex.: depurador)
+            self._lock.release()
+            return
+        g.perfil = coletor
+        g.perfil_solicitado = solicitado
+
+    def _depois_requisicao(self, response):
+        coletor = g.pop('perfil', None)
+        if coletor is not None:
+            arquivo = self._salvar_perfil(coletor)
+            if arquivo and g.get('perfil_solicitado'):
+                response.headers['X-Perfil-Arquivo'] = arquivo
+
+        inicio = g.get('inicio_perfil')
+        if self.limiar_lentas and inicio is not None:
+            duracao = time.perf_counter() - inicio
+            if duracao >= self.limiar_lentas:
+                self._registrar_lenta(response, duracao)
+        return response
+
+    def _encerrar(self, erro=None):
+        # Requisição interrompida antes do after_request: descarta o perfil
+        coletor = g.pop('perfil', None)
+        if coletor is not None:
+            coletor.parar()
+            self._lock.release()
+
+    def _salvar_perfil(self, coletor):
+        try:
+            coletor.parar()
+        finally:
+            self._lock.release()
+
+        rota = request.url_rule.rule if request.url_rule is not None else request.path
+        nome = re.sub(r'[^A-Za-z0-9]+', '_', rota).strip('_') or 'raiz'
+        arquivo = (
+            f'{datetime.utcnow():%Y%m%dT%H%M%S%f}-{request.method}-{nome}-{os.getpid()}.{coletor.extensao}'
+        )
+        try:
+            coletor.salvar(os.path.join(self.diretorio, arquivo))
+        except OSError:
+            self._app.logger.exception(f'Erro ao gravar o perfil {arquivo}')
+            return None
+        self.perfis += 1
+        return arquivo
+
+    def _registrar_lenta(self, response, duracao):
+        self.lentas += 1
+        sql = g.get('sql_lentas') or _ComandosSql(0)
+        registro = {
+            'metodo': request.method,
+            'rota': request.url_rule.rule if request.url_rule is not None else request.path,
+            # Sem a query string: POST/PUT /usuarios recebem a senha nela
+            'caminho': request.path,
+            'status': response.status_code,
+            'duracao_ms': round(duracao * 1000, 2),
+            'etapas_ms': {
+                **{nome: round(tempo * 1000, 2) for nome, tempo in g.get('etapas', {}).items()},
+                'banco': round(sql.tempo * 1000, 2)
+            },
+            'sql_total': sql.total,
+            'sql': sql.comandos
+        }
+        self._app.logger.warning(f'Requisição lenta: {json.dumps(registro, ensure_ascii=False)}')
+
+    def stats(self):
+        return {
+            'habilitado': self.habilitado,
+            'modo': 'cprofile' if self.coletor is _CProfile else 'amostragem',
+            'amostragem': self.amostragem,
+            'perfis': self.perfis,
+            'limiar_lentas_ms': self.limiar_lentas * 1000,
+            'lentas': self.lentas
+        }
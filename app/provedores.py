@@ -0,0 +1,169 @@
+import os
+import threading
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+
+from .utils import _buscar_local, _buscar_viacep, enriquecer_endereco
+from .viacep import CircuitBreaker
+
+# Campos do endereço no formato do ViaCEP (cep_model)
+CAMPOS_ENDERECO = ('cep', 'logradouro', 'complemento', 'bairro', 'localidade', 'uf',
+                   'ibge', 'gia', 'ddd', 'siafi')
+
+
+class ProvedorViaCEP:
+    """
+    ViaCEP, pelo cliente com novas tentativas, circuit breaker e orçamento
+    """
+
+    nome = 'viacep'
+    remoto = True
+
+    def buscar(self, cep_formatado):
+        return _buscar_viacep(cep_formatado)
+
+
+class ProvedorLocal:
+    """
+    Dados locais (índice mapeado em memória e tabela de endereços). Sem o
+    CEP, a resposta não é definitiva: a base local pode estar incompleta.
+    """
+
+    nome = 'local'
+    remoto = False
+
+    def buscar(self, cep_formatado):
+        endereco = _buscar_local(cep_formatado)
+        return endereco, endereco is not None
+
+
+class ProvedorHttp:
+    """
+    Provedor de CEP acessado por HTTP (GET {url}/{cep}), com sessão
+    keep-alive e circuit breaker próprios. O CEP inexistente é uma resposta
+    definitiva (404 ou {"erro": true}); demais erros não são.
+    """
+
+    remoto = True
+
+    def __init__(self, nome, url, timeout, pool_conexoes, breaker):
+        self.nome = nome
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.pool_conexoes = pool_conexoes
+        self.breaker = breaker
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        # Recriada após um fork, como a do cliente do ViaCEP
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_conexoes, max_retries=0)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    session.headers['Accept'] = 'application/json'
+                    self._session = session
+                    self._pid = os.getpid()
+        return self._session
+
+    def buscar(self, cep_formatado):
+        if not self.breaker.permitir():
+            return None, False
+        try:
+            response = self.session.get(self.url_cep(cep_formatado), timeout=self.timeout)
+            if response.status_code in (400, 404):
+                self.breaker.registrar_sucesso()
+                return None, True
+            response.raise_for_status()
+            dados = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.breaker.registrar_falha()
+            current_app.logger.error(f'Erro ao consultar o provedor {self.nome}: {str(e)}')
+            return None, False
+        self.breaker.registrar_sucesso()
+
+        if 'erro' in dados:
+            return None, True
+        return enriquecer_endereco(self.normalizar(dados)), True
+
+    def url_cep(self, cep_formatado):
+        return f'{self.url}/{cep_formatado}'
+
+    def normalizar(self, dados):
+        """
+        Converte a resposta do provedor para os campos do ViaCEP
+        """
+        return {campo: dados.get(campo) or '' for campo in CAMPOS_ENDERECO}
+
+
+class ProvedorOpenCEP(ProvedorHttp):
+    """
+    OpenCEP: mesmo formato de resposta do ViaCEP
+    """
+
+
+class ProvedorBrasilAPI(ProvedorHttp):
+    """
+    BrasilAPI (CEP v1): campos em inglês, sem IBGE, GIA, DDD e SIAFI
+    """
+
+    def normalizar(self, dados):
+        cep = str(dados.get('cep', '')).replace('-', '')
+        return {
+            **{campo: '' for campo in CAMPOS_ENDERECO},
+            'cep': f'{cep[:5]}-{cep[5:]}' if len(cep) == 8 else cep,
+            'logradouro': dados.get('street') or '',
+            'bairro': dados.get('neighborhood') or '',
+            'localidade': dados.get('city') or '',
+            'uf': dados.get('state') or ''
+        }
+
+
+PROVEDORES_HTTP = {
+    'opencep': (ProvedorOpenCEP, 'CEP_PROVEDOR_OPENCEP_URL'),
+    'brasilapi': (ProvedorBrasilAPI, 'CEP_PROVEDOR_BRASILAPI_URL')
+}
+
+
+def criar_provedores(app):
+    """
+    Cria os provedores listados em CEP_PROVEDORES, na ordem configurada
+    """
+    config = app.config
+    provedores = []
+    for nome in (nome.strip() for nome in config['CEP_PROVEDORES'].split(',')):
+        if not nome:
+            continue
+        if nome == 'viacep':
+            provedores.append(ProvedorViaCEP())
+        elif nome == 'local':
+            provedores.append(ProvedorLocal())
+        elif nome in PROVEDORES_HTTP:
+            classe, chave_url = PROVEDORES_HTTP[nome]
+            provedores.append(classe(
+                nome,
+                config[chave_url],
+                (config['VIACEP_TIMEOUT_CONEXAO'], config['CEP_PROVEDORES_TIMEOUT']),
+                config['VIACEP_POOL_CONEXOES'],
+                CircuitBreaker(
+                    limiar_erro=config['VIACEP_CIRCUITO_LIMIAR_ERRO'],
+                    minimo_requisicoes=config['VIACEP_CIRCUITO_MINIMO_REQUISICOES'],
+                    janela=config['VIACEP_CIRCUITO_JANELA'],
+                    tempo_aberto=config['VIACEP_CIRCUITO_TEMPO_ABERTO']
+                )
+            ))
+        else:
+            raise ValueError(
+                f'Provedor de CEP desconhecido em CEP_PROVEDORES: {nome} '
+                f'(use viacep, local, {", ".join(PROVEDORES_HTTP)})'
+            )
+    if not provedores:
+        raise ValueError('CEP_PROVEDORES deve ter ao menos um provedor')
+    return provedores
@@ -0,0 +1,186 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+# Políticas para quando a fila do registro assíncrono está cheia
+POLITICAS_FILA_CHEIA = ('sincrono', 'descartar', 'rejeitar')
+
+
+class FilaCheia(Exception):
+    """
+    Disparada com a política rejeitar quando a fila do registro está cheia;
+    retry_after indica em quantos segundos uma nova tentativa pode ser feita
+    """
+
+    def __init__(self, mensagem, retry_after):
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+
+
+class RegistroConsultas:
+    """
+    Registro assíncrono (write-behind) das consultas de POST /cep/<cep>: as
+    consultas entram em uma fila limitada em memória e uma thread do próprio
+    processo as grava em lotes (a cada tamanho_lote consultas ou intervalo
+    segundos), com uma transação por lote em vez de uma por requisição. Um
+    lote que falha é gravado de novo, com backoff, antes de ser descartado. A
+    fila é descarregada ao encerrar o processo.
+    """
+
+    def __init__(self, app=None, dormir=time.sleep):
+        self.habilitado = False
+        self.tamanho_lote = 500
+        self.intervalo = 0.2
+        self.espera_maxima = 0.05
+        self.politica = 'sincrono'
+        self.tentativas = 3
+        self.backoff = 0.1
+        self._dormir = dormir
+        self._app = None
+        self._funcao = None
+        self._fila = queue.Queue()
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.enfileiradas = 0
+        self.gravadas = 0
+        self.lotes = 0
+        self.falhas = 0
+        self.retentativas = 0
+        self.sincronas = 0
+        self.descartadas = 0
+        self.rejeitadas = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, funcao=None):
+        """
+        funcao(consultas) grava, dentro de um contexto da aplicação, uma lista
+        de pares (endereço, horário da consulta)
+        """
+        politica = app.config['CEP_REGISTRO_FILA_CHEIA']
+        if politica not in POLITICAS_FILA_CHEIA:
+            raise ValueError(f'CEP_REGISTRO_FILA_CHEIA deve ser um de: {", ".join(POLITICAS_FILA_CHEIA)}')
+
+        self.habilitado = app.config['CEP_REGISTRO_ASSINCRONO'] and funcao is not None
+        self.tamanho_lote = app.config['CEP_REGISTRO_LOTE']
+        self.intervalo = app.config['CEP_REGISTRO_INTERVALO_MS'] / 1000
+        self.espera_maxima = app.config['CEP_REGISTRO_ESPERA_MAXIMA_MS'] / 1000
+        self.politica = politica
+        self.tentativas = max(1, app.config['CEP_REGISTRO_TENTATIVAS'])
+        self.backoff = app.config['CEP_REGISTRO_BACKOFF_MS'] / 1000
+        self._fila = queue.Queue(app.config['CEP_REGISTRO_FILA'])
+        self._app = app
+        self._funcao = funcao
+        app.extensions['registro_consultas'] = self
+        if self.habilitado:
+            atexit.register(self.descarregar)
+
+    def registrar(self, endereco):
+        """
+        Enfileira a consulta do endereço. Com a fila cheia por mais de
+        espera_maxima, aplica a política configurada: sincrono retorna False
+        (quem chamou grava na própria requisição), descartar ignora a consulta
+        e rejeitar dispara FilaCheia. Retorna False se o registro estiver desabilitado.
+        """
+        if not self.habilitado:
+            return False
+        with self._lock:
+            self._iniciar()
+        try:
+            self._fila.put((endereco, datetime.utcnow()), timeout=self.espera_maxima)
+        except queue.Full:
+            if self.politica == 'sincrono':
+                self.sincronas += 1
+                return False
+            if self.politica == 'descartar':
+                self.descartadas += 1
+                return True
+            self.rejeitadas += 1
+            raise FilaCheia('Fila de registro de consultas cheia', self.intervalo)
+        self.enfileiradas += 1
+        return True
+
+    def _iniciar(self):
+        # A thread não sobrevive a um fork: cada worker inicia a sua
+        if self._thread is None or self._pid != os.getpid():
+            if self._pid != os.getpid():
+                self._fila = queue.Queue(self._fila.maxsize)
+                self._parar = threading.Event()
+            self._thread = threading.Thread(target=self._executar, name='registro-consultas', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _executar(self):
+        while not (self._parar.is_set() and self._fila.empty()):
+            lote = self._coletar()
+            if lote:
+                self._gravar(lote)
+
+    def _coletar(self):
+        # Aguarda a primeira consulta e junta as que chegarem até o fim do
+        # intervalo ou até completar o lote
+        try:
+            lote = [self._fila.get(timeout=self.intervalo)]
+        except queue.Empty:
+            return []
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.tamanho_lote:
+            restante = limite - time.monotonic()
+            try:
+                lote.append(self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _gravar(self, lote):
+        # Falhas transitórias do banco (failover, conexões esgotadas) não
+        # devem perder o lote: ele é gravado de novo com backoff exponencial
+        for tentativa in range(self.tentativas):
+            try:
+                with self._app.app_context():
+                    self._funcao(lote)
+            except Exception:
+                if tentativa + 1 < self.tentativas:
+                    self.retentativas += 1
+                    self._app.logger.warning(
+                        f'Erro ao gravar um lote de {len(lote)} consultas de CEP, nova tentativa', exc_info=True)
+                    self._dormir(self.backoff * 2 ** tentativa)
+                    continue
+                self.falhas += len(lote)
+                self._app.logger.exception(
+                    f'Erro ao gravar um lote de {len(lote)} consultas de CEP após {self.tentativas} tentativas')
+                return
+            self.gravadas += len(lote)
+            self.lotes += 1
+            return
+
+    def descarregar(self, timeout=10):
+        """
+        Grava as consultas pendentes e encerra a thread do registro (ao
+        encerrar o worker). Retorna o número de consultas que ficaram sem gravar.
+        """
+        if self._thread is None or self._pid != os.getpid():
+            return 0
+        self._parar.set()
+        self._thread.join(timeout)
+        return self._fila.qsize()
+
+    def stats(self):
+        return {
+            'habilitado': self.habilitado,
+            'politica_fila_cheia': self.politica,
+            'pendentes': self._fila.qsize(),
+            'enfileiradas': self.enfileiradas,
+            'gravadas': self.gravadas,
+            'lotes': self.lotes,
+            'falhas': self.falhas,
+            'retentativas': self.retentativas,
+            'sincronas': self.sincronas,
+            'descartadas': self.descartadas,
+            'rejeitadas': self.rejeitadas
+        }
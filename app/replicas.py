@@ -0,0 +1,249 @@
+import itertools
+import os
+import threading
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.sql import Select
+
+from .metrics import DB_POOL_CONEXOES, DB_ROTEAMENTO
+
+# Métodos atendidos pelas réplicas
+METODOS_LEITURA = ('GET', 'HEAD')
+
+# Cookie que mantém as leituras do cliente no primário logo após uma escrita
+COOKIE_PRIMARIO = 'ler_primario'
+
+SELECOES = ('round_robin', 'menos_conexoes')
+
+# Atraso da réplica em segundos (0 quando já aplicou tudo o que recebeu do primário)
+SQL_ATRASO_POSTGRES = text(
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+class SessaoRoteada(Session):
+    """
+    Sessão do Flask-SQLAlchemy que envia os SELECTs das requisições de
+    leitura para uma réplica. Escritas, SELECT ... FOR UPDATE e qualquer
+    consulta feita depois de uma escrita na mesma sessão usam o primário.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and isinstance(clause, Select)
+                and clause._for_update_arg is None and not self.info.get('escreveu')
+                and has_app_context()):
+            roteador = current_app.extensions.get('replicas')
+            if roteador is not None and roteador.ler_replica():
+                engine = roteador.escolher()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _marcar_escrita(sessao):
+    # A sessão vale para um contexto da aplicação (uma requisição): depois de
+    # uma escrita, as leituras seguintes dela ficam no primário
+    sessao.info['escreveu'] = True
+    if has_request_context():
+        g.escreveu_primario = True
+
+
+@event.listens_for(SessaoRoteada, 'after_flush')
+def _escrita_orm(sessao, contexto):
+    _marcar_escrita(sessao)
+
+
+@event.listens_for(SessaoRoteada, 'do_orm_execute')
+def _escrita_core(estado):
+    # INSERT/UPDATE/DELETE executados direto pela sessão (ex.: upsert dos
+    # endereços, importação de usuários) não passam pelo flush
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        _marcar_escrita(estado.session)
+
+
+class _Replica:
+    def __init__(self, nome, engine):
+        self.nome = nome
+        self.engine = engine
+        self.saudavel = True
+        self.atraso = None
+        self.falhas = 0
+        self.em_uso = 0
+        self.consultas = DB_ROTEAMENTO.labels(nome)
+        event.listen(engine, 'checkout', self._checkout)
+        event.listen(engine, 'checkin', self._checkin)
+
+    def _checkout(self, *args):
+        self.em_uso += 1
+
+    def _checkin(self, *args):
+        self.em_uso -= 1
+
+
+class RoteadorReplicas:
+    """
+    Distribui as leituras das requisições GET entre as réplicas configuradas
+    em DATABASE_REPLICA_URLS (round-robin ou a réplica com menos conexões em
+    uso), retirando de circulação as que falham na verificação periódica ou
+    estão atrasadas demais. Sem réplica disponível, tudo vai para o primário.
+    Após uma escrita, o cliente lê do primário por DB_REPLICA_JANELA_PRIMARIO
+    segundos (cookie), para ver os próprios dados mesmo com atraso de replicação.
+    """
+
+    def __init__(self, app=None, db=None):
+        self.replicas = []
+        self.selecao = 'round_robin'
+        self.janela_primario = 5
+        self.intervalo_verificacao = 5
+        self.atraso_maximo = 10
+        self._db = None
+        self._app = None
+        self._rodada = itertools.count()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.leituras_primario = DB_ROTEAMENTO.labels('primario')
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        selecao = app.config['DB_REPLICA_SELECAO']
+        if selecao not in SELECOES:
+            raise ValueError(f'DB_REPLICA_SELECAO deve ser um de: {", ".join(SELECOES)}')
+
+        self.selecao = selecao
+        self.janela_primario = app.config['DB_REPLICA_JANELA_PRIMARIO']
+        self.intervalo_verificacao = app.config['DB_REPLICA_VERIFICACAO_INTERVALO']
+        self.atraso_maximo = app.config['DB_REPLICA_ATRASO_MAXIMO']
+        self._db = db
+        self._app = app
+
+        with app.app_context():
+            engines = dict(db.engines)
+        self.replicas = [
+            _Replica(chave, engine) for chave, engine in engines.items()
+            if chave is not None and chave.startswith('replica_')
+        ]
+        _monitorar_pool('primario', engines[None])
+        for replica in self.replicas:
+            _monitorar_pool(replica.nome, replica.engine)
+            event.listen(replica.engine, 'handle_error', self._ao_erro(replica))
+
+        app.extensions['replicas'] = self
+        if self.replicas:
+            app.after_request(self._marcar_cliente)
+
+    def ler_replica(self):
+        """
+        Indica se as leituras da requisição atual podem ir para uma réplica
+        """
+        return (
+            bool(self.replicas) and has_request_context()
+            and request.method in METODOS_LEITURA
+            and COOKIE_PRIMARIO not in request.cookies
+        )
+
+    def escolher(self):
+        """
+        Escolhe uma réplica saudável (ou None, para usar o primário)
+        """
+        with self._lock:
+            self._iniciar()
+        saudaveis = [replica for replica in self.replicas if replica.saudavel]
+        if not saudaveis:
+            self.leituras_primario.inc()
+            return None
+        if self.selecao == 'menos_conexoes':
+            replica = min(saudaveis, key=lambda r: r.em_uso)
+        else:
+            replica = saudaveis[next(self._rodada) % len(saudaveis)]
+        replica.consultas.inc()
+        return replica.engine
+
+    def _marcar_cliente(self, response):
+        if g.get('escreveu_primario') and self.janela_primario > 0:
+            response.set_cookie(COOKIE_PRIMARIO, '1', max_age=self.janela_primario, httponly=True)
+        return response
+
+    def _ao_erro(self, replica):
+        def ao_erro(contexto):
+            # Conexão perdida ou recusada: a réplica sai de circulação até a
+            # próxima verificação
+            if contexto.is_disconnect or contexto.connection is None:
+                replica.saudavel = False
+                replica.falhas += 1
+        return ao_erro
+
+    def _iniciar(self):
+        # A thread não sobrevive a um fork: cada worker inicia a sua
+        if self._thread is None or self._pid != os.getpid():
+            self._thread = threading.Thread(target=self._verificar_periodicamente,
+                                            name='verificacao-replicas', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _verificar_periodicamente(self):
+        while True:
+            time.sleep(self.intervalo_verificacao)
+            for replica in self.replicas:
+                self.verificar(replica)
+
+    def verificar(self, replica):
+        """
+        Verifica se a réplica responde e, no PostgreSQL, se o atraso de
+        replicação está dentro de DB_REPLICA_ATRASO_MAXIMO segundos
+        """
+        try:
+            with replica.engine.connect() as conexao:
+                if replica.engine.dialect.name == 'postgresql':
+                    replica.atraso = float(conexao.execute(SQL_ATRASO_POSTGRES).scalar() or 0)
+                else:
+                    conexao.execute(text('SELECT 1'))
+                    replica.atraso = 0.0
+            replica.saudavel = replica.atraso <= self.atraso_maximo
+        except Exception:
+            replica.saudavel = False
+            replica.falhas += 1
+            self._app.logger.warning(f'Réplica {replica.nome} indisponível', exc_info=True)
+        return replica.saudavel
+
+    def stats(self):
+        engines = [('primario', self._db.engines[None])] if self._db is not None else []
+        engines += [(replica.nome, replica.engine) for replica in self.replicas]
+        return {
+            'selecao': self.selecao,
+            'replicas': [
+                {
+                    'nome': replica.nome,
+                    'saudavel': replica.saudavel,
+                    'atraso': replica.atraso,
+                    'falhas': replica.falhas,
+                    'em_uso': replica.em_uso
+                }
+                for replica in self.replicas
+            ],
+            'pools': {nome: _estado_pool(engine.pool) for nome, engine in engines}
+        }
+
+
+def _monitorar_pool(nome, engine):
+    em_uso = DB_POOL_CONEXOES.labels(nome, 'em_uso')
+    abertas = DB_POOL_CONEXOES.labels(nome, 'abertas')
+    event.listen(engine, 'checkout', lambda *args: em_uso.inc())
+    event.listen(engine, 'checkin', lambda *args: em_uso.dec())
+    event.listen(engine, 'connect', lambda *args: abertas.inc())
+    event.listen(engine, 'close', lambda *args: abertas.dec())
+
+
+def _estado_pool(pool):
+    # Nem todo pool (ex.: NullPool) tem tamanho e overflow
+    estado = {}
+    for nome in ('size', 'checkedin', 'checkedout', 'overflow'):
+        metodo = getattr(pool, nome, None)
+        if metodo is not None:
+            estado[nome] = metodo()
+    return estado
@@ -0,0 +1,233 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .limitador import LimiteExcedido
+from .metrics import PROVEDOR_HEDGES, PROVEDOR_LATENCIA
+
+# Peso das novas amostras nas médias móveis de latência e de falhas
+PESO_EWMA = 0.1
+
+# Amostras necessárias para usar o percentil medido como atraso do hedge
+AMOSTRAS_MINIMAS = 20
+
+
+class LatenciaProvedor:
+    """
+    Latências recentes de um provedor (janela deslizante para o percentil do
+    hedge e média móvel para a ordenação) e a taxa de falhas
+    """
+
+    def __init__(self, janela):
+        self.amostras = deque(maxlen=janela)
+        self.media = None
+        self.taxa_falha = 0.0
+        self.chamadas = 0
+        self.falhas = 0
+        self.vitorias = 0
+        self._lock = threading.Lock()
+
+    def registrar(self, duracao, sucesso):
+        with self._lock:
+            self.chamadas += 1
+            if sucesso:
+                self.amostras.append(duracao)
+                self.media = duracao if self.media is None else (
+                    self.media * (1 - PESO_EWMA) + duracao * PESO_EWMA
+                )
+            else:
+                self.falhas += 1
+            self.taxa_falha = self.taxa_falha * (1 - PESO_EWMA) + (0 if sucesso else PESO_EWMA)
+
+    def percentil(self, p):
+        """
+        Percentil p das latências da janela, ou None com poucas amostras
+        """
+        with self._lock:
+            if len(self.amostras) < AMOSTRAS_MINIMAS:
+                return None
+            ordenadas = sorted(self.amostras)
+        return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p / 100))]
+
+    def custo(self, padrao):
+        # Provedores que falham são penalizados; sem amostras, vale o atraso padrão
+        return (self.media if self.media is not None else padrao) * (1 + 4 * self.taxa_falha)
+
+
+class ResolvedorCep:
+    """
+    Consulta os provedores de CEP configurados em CEP_PROVEDORES. O primeiro
+    provedor da ordem (fixa ou adaptativa, pela latência e falhas medidas) é
+    consultado e, se não responder até o percentil CEP_HEDGE_PERCENTIL da sua
+    latência, o próximo é disparado em paralelo (hedge): vale a primeira
+    resposta válida. Falhas passam imediatamente ao provedor seguinte.
+    """
+
+    def __init__(self, app=None, provedores=None):
+        self.provedores = []
+        self.latencias = {}
+        self.hedge = True
+        self.percentil = 95
+        self.atraso_minimo = 0.02
+        self.atraso_padrao = 0.3
+        self.fracao_hedge = 0.2
+        self.adaptativo = True
+        self._app = None
+        self._executor = None
+        self._threads = 16
+        self._pid = None
+        self._lock = threading.Lock()
+        self.consultas = 0
+        self.hedges = 0
+        if app is not None:
+            self.init_app(app, provedores)
+
+    def init_app(self, app, provedores):
+        """
+        provedores é a lista de provedores, na ordem inicial de preferência;
+        cada um tem um nome, o atributo remoto e buscar(cep) retornando
+        (endereço ou None, resposta definitiva)
+        """
+        self.provedores = list(provedores)
+        self.latencias = {
+            provedor.nome: LatenciaProvedor(app.config['CEP_PROVEDORES_JANELA']) for provedor in self.provedores
+        }
+        self.hedge = app.config['CEP_HEDGE_HABILITADO']
+        self.percentil = app.config['CEP_HEDGE_PERCENTIL']
+        self.atraso_minimo = app.config['CEP_HEDGE_ATRASO_MINIMO_MS'] / 1000
+        self.atraso_padrao = app.config['CEP_HEDGE_ATRASO_PADRAO_MS'] / 1000
+        self.fracao_hedge = app.config['CEP_HEDGE_FRACAO_MAXIMA']
+        self.adaptativo = app.config['CEP_PROVEDORES_ADAPTATIVO']
+        self._threads = app.config['CEP_PROVEDORES_THREADS']
+        self._app = app
+        app.extensions['resolvedor'] = self
+
+    def ordem(self):
+        """
+        Provedores na ordem em que serão consultados
+        """
+        if not self.adaptativo:
+            return list(self.provedores)
+        return sorted(self.provedores, key=lambda p: self.latencias[p.nome].custo(self.atraso_padrao))
+
+    def atraso_hedge(self, provedor):
+        """
+        Tempo de espera pelo provedor antes de disparar o próximo
+        """
+        medido = self.latencias[provedor.nome].percentil(self.percentil)
+        return max(self.atraso_minimo, medido if medido is not None else self.atraso_padrao)
+
+    def resolver(self, cep_formatado, somente_remotos=False):
+        """
+        Retorna o endereço do CEP (ou None) e se a resposta pode ser armazenada
+        em cache, como _buscar_viacep. Sem resposta de nenhum provedor, dispara
+        o LimiteExcedido recebido, se houver. somente_remotos ignora os
+        provedores locais (ex.: para revalidar a própria base local).
+        """
+        self.consultas += 1
+        restantes = [p for p in self.ordem() if p.remoto or not somente_remotos]
+        if not restantes:
+            return None, False
+        if len(restantes) == 1:
+            return self._consultar(restantes[0], cep_formatado)
+
+        with self._lock:
+            self._iniciar()
+        pendentes = {}
+        limite_excedido = None
+        hedge_em = None
+
+        def disparar():
+            nonlocal hedge_em
+            provedor = restantes.pop(0)
+            pendentes[self._executor.submit(self._consultar_contexto, provedor, cep_formatado)] = provedor
+            hedge_em = time.monotonic() + self.atraso_hedge(provedor)
+
+        disparar()
+        while pendentes:
+            espera = None
+            if restantes and self._pode_fazer_hedge():
+                espera = max(0, hedge_em - time.monotonic())
+            concluidos, _ = wait(pendentes, timeout=espera, return_when=FIRST_COMPLETED)
+
+            if not concluidos:
+                # O provedor passou do percentil: dispara o próximo em paralelo
+                self.hedges += 1
+                PROVEDOR_HEDGES.labels(restantes[0].nome).inc()
+                disparar()
+                continue
+
+            for futuro in concluidos:
+                provedor = pendentes.pop(futuro)
+                try:
+                    endereco, definitivo = futuro.result()
+                except LimiteExcedido as e:
+                    limite_excedido = limite_excedido or e
+                    definitivo = False
+                if definitivo:
+                    # As consultas ainda pendentes terminam em segundo plano e
+                    # continuam alimentando as latências dos provedores
+                    self.latencias[provedor.nome].vitorias += 1
+                    return endereco, True
+
+            # Sem resposta válida: passa ao próximo provedor sem esperar
+            if restantes and not pendentes:
+                disparar()
+
+        if limite_excedido is not None:
+            raise limite_excedido
+        return None, False
+
+    def _pode_fazer_hedge(self):
+        return self.hedge and self.hedges < self.fracao_hedge * self.consultas
+
+    def _iniciar(self):
+        # O pool não sobrevive a um fork: cada worker cria o seu
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self._threads, thread_name_prefix='provedor-cep')
+            self._pid = os.getpid()
+
+    def _consultar_contexto(self, provedor, cep_formatado):
+        with self._app.app_context():
+            return self._consultar(provedor, cep_formatado)
+
+    def _consultar(self, provedor, cep_formatado):
+        inicio = time.perf_counter()
+        sucesso = False
+        try:
+            endereco, definitivo = provedor.buscar(cep_formatado)
+            # Um provedor local sem o CEP não falhou, apenas não tem a resposta
+            sucesso = definitivo or not provedor.remoto
+            return endereco, definitivo
+        except LimiteExcedido:
+            raise
+        except Exception:
+            self._app.logger.exception(f'Erro ao consultar o CEP {cep_formatado} no provedor {provedor.nome}')
+            return None, False
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.latencias[provedor.nome].registrar(duracao, sucesso)
+            PROVEDOR_LATENCIA.labels(provedor.nome, 'sucesso' if sucesso else 'falha').observe(duracao)
+
+    def stats(self):
+        def ms(valor):
+            return round(valor * 1000, 2) if valor is not None else None
+
+        return {
+            'hedge': self.hedge,
+            'consultas': self.consultas,
+            'hedges': self.hedges,
+            'ordem': [provedor.nome for provedor in self.ordem()],
+            'provedores': {
+                nome: {
+                    'chamadas': latencia.chamadas,
+                    'falhas': latencia.falhas,
+                    'vitorias': latencia.vitorias,
+                    'media_ms': ms(latencia.media),
+                    f'p{self.percentil}_ms': ms(latencia.percentil(self.percentil))
+                }
+                for nome, latencia in self.latencias.items()
+            }
+        }
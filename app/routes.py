@@ -1,16 +1,61 @@
-from flask import Blueprint, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from flask_restx import Resource, fields
 from sqlalchemy.exc import IntegrityError
-from .extensions import db, api
-from .models import CepConsulta, Usuario
-from .utils import consultar_viacep, formatar_cep, validar_cpf, validar_email
-
+from .busca import PARAMETROS_BUSCA, consulta_busca
+from .cache_http import cache_control, etag_versao, validar_condicional
+from .extensions import (
+    db, api, atualizador, cep_cache, coalescedor, compressao, indice_cep, limitador, registro_consultas,
+    perfilador, replicas, resolvedor, viacep
+)
+from .importacao import ImportacaoUsuarios, ler_ndjson
+from .limitador import LimiteExcedido, retry_after
+from .models import CepConsulta, Endereco, Usuario
+from .paginacao import listar_paginado
+from .registro import FilaCheia
+from .serializacao import Codificador, mascara_requisicao, resposta_json, serializar
+from .utils import (
+    consultar_ceps, consultar_viacep, dados_endereco, formatar_cep, salvar_endereco,
+    validar_cpf, validar_email
+)
 # Blueprint
 main = Blueprint('main', __name__)
 
+
+@main.route('/status')
+def status():
+    """Estatísticas de uso dos componentes internos da API"""
+    return jsonify({
+        'cache': cep_cache.stats(),
+        'viacep': viacep.stats(),
+        'resolvedor': resolvedor.stats(),
+        'coalescedor': coalescedor.stats(),
+        'indice': indice_cep.stats(),
+        'atualizador': atualizador.stats(),
+        'limitador': limitador.stats(),
+        'compressao': compressao.stats(),
+        'registro_consultas': registro_consultas.stats(),
+        'banco': replicas.stats(),
+        'perfilador': perfilador.stats()
+    })
+
+
 # Namespaces
-ns_cep = api.namespace('cep', description='Operações relacionadas a CEP')
-ns_usuarios = api.namespace('usuarios', description='Operações relacionadas a usuários')
+ns_cep = api.namespace('cep', description='Operações relacionadas a CEP',
+                       decorators=[limitador.limitar])
+ns_usuarios = api.namespace('usuarios', description='Operações relacionadas a usuários',
+                            decorators=[limitador.limitar])
+
+
+@api.errorhandler(LimiteExcedido)
+def limite_excedido(erro):
+    """Limite por cliente ou orçamento do ViaCEP esgotado"""
+    return {'message': str(erro)}, 429, {'Retry-After': retry_after(erro)}
+
+
+@api.errorhandler(FilaCheia)
+def fila_cheia(erro):
+    """Fila do registro assíncrono de consultas cheia (política rejeitar)"""
+    return {'message': str(erro)}, 503, {'Retry-After': retry_after(erro)}
 
 # Models
 cep_model = api.model('CEP', {
@@ -28,6 +73,16 @@ cep_model = api.model('CEP', {
     'siafi': fields.String(description='Código SIAFI')
 })
 
+cep_lote_model = api.model('CEPLote', {
+    'ceps': fields.List(fields.String, required=True, description='Lista de CEPs a consultar')
+})
+
+cep_lote_resultado_model = api.model('CEPLoteResultado', {
+    'cep': fields.String(description='CEP como informado na requisição'),
+    'endereco': fields.Nested(cep_model, allow_null=True, description='Dados do endereço, se encontrado'),
+    'erro': fields.String(description='Motivo da falha, se houver')
+})
+
 usuario_model = api.model('Usuario', {
     'id': fields.Integer(readonly=True, description='ID único do usuário'),
     'nome_completo': fields.String(required=True, description='Nome completo do usuário'),
@@ -41,6 +96,35 @@ usuario_model = api.model('Usuario', {
     'estado': fields.String(readonly=True, description='Estado')
 })
 
+# Serialização das respostas JSON (orjson quando disponível)
+api.representation('application/json')(resposta_json)
+
+# Codificadores das linhas lidas diretamente do banco, no formato dos models
+codificador_cep = Codificador(cep_model, CepConsulta, extras=[CepConsulta.id])
+codificador_endereco = Codificador(cep_model, Endereco)
+codificador_usuario = Codificador(usuario_model, Usuario, extras=[Usuario.updated_at])
+
+PARAMETROS_PAGINACAO = {
+    'limit': 'Quantidade máxima de registros por página',
+    'cursor': 'ID do último registro da página anterior (cabeçalho X-Next-Cursor)',
+    'stream': 'true para receber todos os registros após o cursor em NDJSON'
+}
+
+# Documenta o cabeçalho X-Fields nas rotas que aplicam a máscara sem o marshal_with
+PARAMETRO_MASCARA = {
+    'X-Fields': {'in': 'header', 'type': 'string', 'format': 'mask',
+                 'description': 'Máscara opcional dos campos retornados (ex.: {cep,uf})'}
+}
+
+# O relatório de POST /usuarios/bulk é NDJSON: uma linha por usuário e, no final,
+# {"resumo": {total, criados, erros, segundos, linhas_por_s}}
+usuario_importacao_model = api.model('UsuarioImportacaoLinha', {
+    'linha': fields.Integer(description='Número da linha/posição no corpo'),
+    'status': fields.String(description='criado ou erro'),
+    'id': fields.Integer(description='ID do usuário criado'),
+    'message': fields.String(description='Motivo da rejeição')
+})
+
 
 @ns_cep.route('/<string:cep>')
 @ns_cep.param('cep', 'CEP a ser consultado')
@@ -55,55 +139,57 @@ class CepResource(Resource):
         if not cep_formatado:
             return {'message': 'CEP inválido'}, 400
         
-        # Verifica se já existe no banco de dados
-        consulta_existente = CepConsulta.query.filter_by(cep=cep_formatado).first()
-        
-        if consulta_existente:
-            return consulta_existente.to_dict()
-        
-        # Se não existir, consulta a API externa
-        endereco = consultar_viacep(cep_formatado)
+        # Verifica o cache, o endereço salvo no banco e, por fim, a API externa
+        endereco = consultar_viacep(cep_formatado, consultar_local=True)
         
         if not endereco:
             return {'message': 'CEP não encontrado'}, 404
         
-        # Retorna os dados sem persistir no banco
-        return endereco
+        # Se o cliente já tem a versão atual, responde 304 sem corpo; o ETag
+        # é calculado quando o endereço entra no cache
+        entrada = cep_cache.entrada(cep_formatado, endereco)
+        nao_modificado, headers = validar_condicional(
+            entrada.etag,
+            controle=cache_control(current_app.config['HTTP_CACHE_CEP_MAX_AGE'])
+        )
+        if nao_modificado is not None:
+            return nao_modificado
+        
+        # Retorna os dados sem persistir no banco; o corpo serializado (e as
+        # versões comprimidas dele) ficam guardados com o endereço em cache
+        if entrada.corpo is None:
+            entrada.corpo = serializar(entrada.endereco) + b'\n'
+        resposta = Response(entrada.corpo, 200, headers, mimetype='application/json')
+        resposta.comprimidos = entrada.comprimidos
+        return resposta
     
     @ns_cep.doc('post_cep')
     @ns_cep.response(201, 'Consulta salva', cep_model)
+    @ns_cep.response(202, 'Consulta registrada para gravação assíncrona', cep_model)
     @ns_cep.response(404, 'CEP não encontrado')
     @ns_cep.response(400, 'CEP inválido')
+    @ns_cep.response(503, 'Fila do registro assíncrono cheia')
     def post(self, cep):
         """Consulta um CEP e persiste os dados no banco"""
         cep_formatado = formatar_cep(cep)
         if not cep_formatado:
             return {'message': 'CEP inválido'}, 400
         
-        # Consulta a API externa (sempre consultamos, mesmo se existir no banco)
-        endereco = consultar_viacep(cep_formatado)
+        # Usa o cache e os endereços salvos (mantidos atualizados em segundo
+        # plano) antes da API externa
+        endereco = consultar_viacep(cep_formatado, consultar_local=True)
         
         if not endereco:
             return {'message': 'CEP não encontrado'}, 404
         
-        # Salva no banco de dados (sempre cria um novo registro)
+        # Com o registro assíncrono, a consulta é gravada em lote pela thread do registro
+        if registro_consultas.registrar(endereco):
+            return endereco, 202
+        
+        # Atualiza o endereço canônico e registra a consulta
         try:
-            nova_consulta = CepConsulta(
-                cep=endereco.get('cep', '').replace('-', ''),
-                logradouro=endereco.get('logradouro', ''),
-                complemento=endereco.get('complemento', ''),
-                bairro=endereco.get('bairro', ''),
-                localidade=endereco.get('localidade', ''),
-                uf=endereco.get('uf', ''),
-                estado=endereco.get('estado', ''),
-                regiao=endereco.get('regiao', ''),
-                ibge=endereco.get('ibge', ''),
-                gia=endereco.get('gia', ''),
-                ddd=endereco.get('ddd', ''),
-                siafi=endereco.get('siafi', '')
-            )
-            
-            db.session.add(nova_consulta)
+            salvar_endereco(endereco)
+            db.session.add(CepConsulta(**dados_endereco(endereco)))
             db.session.commit()
             
             return endereco, 201
@@ -113,14 +199,73 @@ class CepResource(Resource):
             return {'message': f'Erro ao salvar consulta: {str(e)}'}, 500
 
 
+@ns_cep.route('/batch')
+class CepBatchResource(Resource):
+    @ns_cep.doc('batch_cep')
+    @ns_cep.expect(cep_lote_model)
+    @ns_cep.response(200, 'Sucesso', [cep_lote_resultado_model])
+    @ns_cep.response(400, 'Requisição inválida')
+    def post(self):
+        """Consulta um lote de CEPs e retorna o resultado de cada um"""
+        dados = request.get_json(silent=True) or {}
+        ceps = dados.get('ceps')
+        if not isinstance(ceps, list) or not all(isinstance(cep, str) for cep in ceps):
+            return {'message': 'Campo obrigatório ausente: ceps (lista de strings)'}, 400
+        
+        # Remove CEPs repetidos mantendo a ordem de envio
+        ceps = list(dict.fromkeys(ceps))
+        limite = current_app.config['CEP_LOTE_LIMITE']
+        if len(ceps) > limite:
+            return {'message': f'Máximo de {limite} CEPs por lote'}, 400
+        
+        formatados = {cep: formatar_cep(cep) for cep in ceps}
+        enderecos = consultar_ceps([cep for cep in formatados.values() if cep])
+        
+        resultados = []
+        limite_excedido = None
+        for cep, cep_formatado in formatados.items():
+            endereco = enderecos.get(cep_formatado)
+            if not cep_formatado:
+                resultados.append({'cep': cep, 'endereco': None, 'erro': 'CEP inválido'})
+            elif isinstance(endereco, LimiteExcedido):
+                # Apenas os CEPs recusados pelo orçamento do ViaCEP precisam ser reenviados
+                limite_excedido = endereco
+                resultados.append({'cep': cep, 'endereco': None, 'erro': f'{endereco}, tente novamente'})
+            elif not endereco:
+                resultados.append({'cep': cep, 'endereco': None, 'erro': 'CEP não encontrado'})
+            else:
+                resultados.append({'cep': cep, 'endereco': endereco, 'erro': None})
+        
+        if limite_excedido is not None:
+            return resultados, 200, {'Retry-After': retry_after(limite_excedido)}
+        return resultados
+
+
+@ns_cep.route('/busca')
+class CepBuscaResource(Resource):
+    @ns_cep.doc('busca_cep', params={**PARAMETROS_BUSCA, **PARAMETROS_PAGINACAO, **PARAMETRO_MASCARA})
+    @ns_cep.response(200, 'Sucesso', [cep_model])
+    @ns_cep.response(400, 'Parâmetros de busca inválidos')
+    def get(self):
+        """Busca os endereços conhecidos por UF, cidade, bairro, DDD, IBGE e logradouro (paginado por cursor)"""
+        try:
+            query = consulta_busca(request.args)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        
+        # O cursor é o último CEP recebido (ordenação por CEP)
+        return listar_paginado(query, Endereco.cep, Endereco.updated_at, codificador_endereco,
+                               formatar_cursor=lambda cursor: f'{cursor:08d}')
+
+
 @ns_cep.route('/')
 class CepList(Resource):
-    @ns_cep.doc('list_ceps')
-    @ns_cep.marshal_list_with(cep_model)
+    @ns_cep.doc('list_ceps', params={**PARAMETROS_PAGINACAO, **PARAMETRO_MASCARA})
+    @ns_cep.response(200, 'Sucesso', [cep_model])
+    @ns_cep.response(400, 'Parâmetros de paginação inválidos')
     def get(self):
-        """Lista todas as consultas de CEP realizadas"""
-        consultas = CepConsulta.query.all()
-        return [consulta.to_dict() for consulta in consultas]
+        """Lista as consultas de CEP realizadas (paginado por cursor)"""
+        return listar_paginado(CepConsulta.query, CepConsulta.id, CepConsulta.updated_at, codificador_cep)
 
 
 @ns_cep.route('/<int:id>')
@@ -166,12 +311,12 @@ class CepUpdateResource(Resource):
 
 @ns_usuarios.route('/')
 class UsuarioList(Resource):
-    @ns_usuarios.doc('list_usuarios')
-    @ns_usuarios.marshal_list_with(usuario_model)
+    @ns_usuarios.doc('list_usuarios', params={**PARAMETROS_PAGINACAO, **PARAMETRO_MASCARA})
+    @ns_usuarios.response(200, 'Sucesso', [usuario_model])
+    @ns_usuarios.response(400, 'Parâmetros de paginação inválidos')
     def get(self):
-        """Lista todos os usuários"""
-        usuarios = Usuario.query.all()
-        return [usuario.to_dict() for usuario in usuarios]
+        """Lista os usuários (paginado por cursor)"""
+        return listar_paginado(Usuario.query, Usuario.id, Usuario.updated_at, codificador_usuario, publico=False)
 
     @ns_usuarios.doc('create_usuario',
                   params={
@@ -251,16 +396,58 @@ class UsuarioList(Resource):
             return {'message': f'Erro ao criar usuário: {str(e)}'}, 400
 
 
+@ns_usuarios.route('/bulk')
+class UsuarioBulkResource(Resource):
+    @ns_usuarios.doc('bulk_usuarios')
+    @ns_usuarios.produces(['application/x-ndjson'])
+    @ns_usuarios.response(200, 'Resultado de cada linha em NDJSON, seguido do resumo', usuario_importacao_model)
+    @ns_usuarios.response(400, 'Corpo da requisição inválido')
+    def post(self):
+        """Cria usuários em lote a partir de uma lista JSON ou de linhas NDJSON"""
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            # Lido em streaming, sem carregar o corpo inteiro em memória
+            registros = ler_ndjson(request.stream)
+        else:
+            registros = request.get_json(silent=True)
+            if not isinstance(registros, list):
+                return {'message': 'O corpo deve ser uma lista JSON de usuários ou NDJSON'}, 400
+            registros = [r if isinstance(r, dict) else {'_erro': 'Registro deve ser um objeto JSON'}
+                         for r in registros]
+        
+        importacao = ImportacaoUsuarios(current_app.config['USUARIOS_IMPORTACAO_BLOCO'])
+
+        def gerar():
+            # O relatório é enviado bloco a bloco, sem acumular os resultados em memória
+            for resultado in importacao.executar(registros):
+                yield serializar(resultado) + b'\n'
+            yield serializar({'resumo': importacao.resumo()}) + b'\n'
+
+        return Response(stream_with_context(gerar()), mimetype='application/x-ndjson')
+
+
 @ns_usuarios.route('/<int:id>')
 @ns_usuarios.response(404, 'Usuário não encontrado')
 @ns_usuarios.param('id', 'ID do usuário')
 class UsuarioResource(Resource):
-    @ns_usuarios.doc('get_usuario')
-    @ns_usuarios.marshal_with(usuario_model)
+    @ns_usuarios.doc('get_usuario', params=PARAMETRO_MASCARA)
+    @ns_usuarios.response(200, 'Sucesso', usuario_model)
     def get(self, id):
         """Obtém os dados de um usuário específico"""
-        usuario = Usuario.query.get_or_404(id)
-        return usuario.to_dict()
+        mascara = mascara_requisicao()
+        codificador = codificador_usuario.mascarar(mascara)
+        linha = codificador.selecionar(Usuario.query).filter(Usuario.id == id).first_or_404()
+        atualizado_em = linha._mapping[Usuario.updated_at]
+        
+        # O ETag muda a cada atualização do registro (updated_at) e com a máscara
+        nao_modificado, headers = validar_condicional(
+            etag_versao(id, atualizado_em.isoformat() if atualizado_em else '', mascara or ''),
+            ultima_modificacao=atualizado_em,
+            controle=cache_control(current_app.config['HTTP_CACHE_USUARIO_MAX_AGE'], publico=False),
+            variar=current_app.config['RESTX_MASK_HEADER']
+        )
+        if nao_modificado is not None:
+            return nao_modificado
+        return codificador(linha), 200, headers
 
     @ns_usuarios.doc('update_usuario',
                   params={
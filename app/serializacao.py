@@ -0,0 +1,93 @@
+import copy
+import json
+
+from flask import current_app, make_response, request
+from flask_restx import fields
+from flask_restx.mask import apply as aplicar_mascara
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+# Campos dos models que o Codificador converte sem o marshal do flask-restx
+CAMPOS_SIMPLES = (fields.String, fields.Integer)
+
+
+def serializar(dados):
+    """
+    Serializa os dados em JSON (bytes) com o serializador configurado em
+    JSON_SERIALIZADOR: orjson (padrão, quando instalado) ou json da biblioteca padrão
+    """
+    if orjson is not None and current_app.config['JSON_SERIALIZADOR'] == 'orjson':
+        return orjson.dumps(dados)
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def mascara_requisicao():
+    """
+    Máscara de campos enviada pelo cliente no cabeçalho X-Fields
+    (RESTX_MASK_HEADER), ou None
+    """
+    return request.headers.get(current_app.config['RESTX_MASK_HEADER']) or None
+
+
+def resposta_json(dados, codigo, headers=None):
+    """
+    Representação application/json da API (substitui a do flask-restx)
+    """
+    resposta = make_response(serializar(dados) + b'\n', codigo)
+    resposta.headers.extend(headers or {})
+    resposta.mimetype = 'application/json'
+    return resposta
+
+
+class Codificador:
+    """
+    Converte as linhas de uma consulta com as colunas de um model do
+    flask-restx (selecionadas com with_entities, sem carregar objetos do ORM)
+    em dicionários com as mesmas chaves, na mesma ordem, do marshal do model.
+    Colunas extras (ex.: o id usado no cursor) vêm depois e ficam fora do dicionário.
+    mascarar aplica a máscara X-Fields como o marshal do flask-restx.
+    """
+
+    def __init__(self, modelo, entidade, extras=()):
+        for nome, campo in modelo.items():
+            if not isinstance(campo, CAMPOS_SIMPLES):
+                raise ValueError(f'Campo {nome} do model {modelo.name} não é suportado pelo Codificador')
+        self.modelo = modelo
+        self.entidade = entidade
+        self.extras = list(extras)
+        self.campos = tuple(modelo)
+        self.colunas = [getattr(entidade, nome) for nome in self.campos] + self.extras
+
+    def mascarar(self, mascara, extras=()):
+        """
+        Retorna um Codificador apenas com os campos da máscara (na ordem dela;
+        campos desconhecidos são ignorados), que lê do banco só as colunas
+        necessárias. extras são colunas que precisam continuar selecionadas
+        (ex.: a do cursor), com ou sem máscara. Máscaras inválidas disparam os erros do
+        flask-restx (ParseError/MaskError), respondidos com 400.
+        """
+        # Atributos do ORM não podem ser comparados com ==/in
+        faltantes = [coluna for coluna in extras
+                     if not any(coluna is selecionada for selecionada in self.colunas)]
+        if not mascara and not faltantes:
+            return self
+        codificador = copy.copy(self)
+        if mascara:
+            codificador.campos = tuple(aplicar_mascara(self.modelo, mascara, skip=True))
+            codificador.colunas = [getattr(self.entidade, nome) for nome in codificador.campos]
+        else:
+            codificador.colunas = list(self.colunas)
+        for coluna in self.extras + list(extras):
+            if not any(coluna is selecionada for selecionada in codificador.colunas):
+                codificador.colunas.append(coluna)
+        return codificador
+
+    def selecionar(self, query):
+        return query.with_entities(*self.colunas)
+
+    def __call__(self, linha):
+        # zip para no fim dos campos do model, ignorando as colunas extras
+        return dict(zip(self.campos, linha))
@@ -0,0 +1,134 @@
+import threading
+import time
+import uuid
+
+from .cache import AUSENTE, erros_backend
+from .metrics import CACHE_ERROS_COMPARTILHADO
+
+
+class _Chamada:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+        self.aguardando = 0
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes para a mesma chave: a primeira executa a
+    busca e as demais aguardam o seu resultado. Com um backend compartilhado
+    configurado, um lock no backend coordena também workers diferentes; se o
+    backend falhar, a busca segue coordenada apenas dentro do processo.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.erros_backend = (OSError,)
+        self.ttl_lock = 10
+        self.intervalo_espera = 0.05
+        self.prefixo = 'singleflight:'
+        self.compartilhadas = 0
+        self.falhas_backend = 0
+        self._app = None
+        self._chamadas = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, backend=None):
+        self.backend = backend if app.config['CEP_COALESCER_ENTRE_WORKERS'] else None
+        self.erros_backend = erros_backend(self.backend)
+        self._app = app
+        self.ttl_lock = app.config['CEP_COALESCER_TTL_LOCK']
+        self.intervalo_espera = app.config['CEP_COALESCER_INTERVALO_ESPERA']
+        app.extensions['singleflight'] = self
+
+    def do(self, chave, funcao, consultar_resultado=None):
+        """
+        Executa funcao() uma única vez por chave entre as chamadas concorrentes.
+        consultar_resultado() é usado pelos workers que não obtiveram o lock
+        compartilhado para verificar se o resultado já foi publicado
+        (deve retornar AUSENTE enquanto não houver resultado).
+        """
+        with self._lock:
+            chamada = self._chamadas.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = _Chamada()
+                self._chamadas[chave] = chamada
+            else:
+                chamada.aguardando += 1
+                self.compartilhadas += 1
+
+        if not lider:
+            chamada.evento.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado
+
+        try:
+            chamada.resultado = self._executar(chave, funcao, consultar_resultado)
+            return chamada.resultado
+        except Exception as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._chamadas[chave]
+            chamada.evento.set()
+
+    def _executar(self, chave, funcao, consultar_resultado):
+        if self.backend is None:
+            return funcao()
+
+        chave_lock = self.prefixo + chave
+        token = uuid.uuid4().hex
+        limite = time.monotonic() + self.ttl_lock
+        while True:
+            try:
+                if self.backend.set(chave_lock, token, px=int(self.ttl_lock * 1000), nx=True):
+                    break
+            except self.erros_backend as e:
+                self._registrar_falha('lock', chave, e)
+                return funcao()
+            # Outro worker está buscando: aguarda a publicação do resultado
+            if consultar_resultado is not None:
+                resultado = consultar_resultado()
+                if resultado is not AUSENTE:
+                    return resultado
+            if time.monotonic() >= limite:
+                return funcao()
+            time.sleep(self.intervalo_espera)
+
+        try:
+            # O lock pode ter sido liberado por um worker que acabou de publicar o resultado
+            if consultar_resultado is not None:
+                resultado = consultar_resultado()
+                if resultado is not AUSENTE:
+                    return resultado
+            return funcao()
+        finally:
+            try:
+                valor = self.backend.get(chave_lock)
+                if valor is not None and (valor.decode() if isinstance(valor, bytes) else valor) == token:
+                    self.backend.delete(chave_lock)
+            except self.erros_backend as e:
+                # O lock expira sozinho após ttl_lock
+                self._registrar_falha('unlock', chave, e)
+
+    def _registrar_falha(self, operacao, chave, erro):
+        self.falhas_backend += 1
+        CACHE_ERROS_COMPARTILHADO.labels(operacao).inc()
+        if self._app is not None:
+            self._app.logger.warning(f'Lock compartilhado indisponível ({operacao} {chave}): {erro}')
+
+    def stats(self):
+        with self._lock:
+            em_andamento = len(self._chamadas)
+        return {
+            'em_andamento': em_andamento,
+            'chamadas_compartilhadas': self.compartilhadas,
+            'entre_workers': self.backend is not None,
+            'falhas_backend': self.falhas_backend
+        }
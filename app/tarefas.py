@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, insert
+
+from .extensions import db, cep_cache
+from .limitador import LimiteExcedido
+from .models import CepConsulta, Endereco
+from .utils import (
+    _buscar_local, _buscar_provedores, consultar_ceps, dados_endereco, salvar_endereco,
+    salvar_enderecos
+)
+
+# Colunas das consultas salvas atualizadas na revalidação (o complemento é editável pelo usuário)
+COLUNAS_CONSULTA = [coluna for coluna in dados_endereco({}) if coluna not in ('cep', 'complemento')]
+
+
+def renovar_cep(cep_formatado):
+    """
+    Busca novamente o endereço do CEP na origem configurada e atualiza o cache.
+    Usada pela fila de renovação do stale-while-revalidate.
+    """
+    if current_app.config['CEP_RESOLVER_MODO'] == 'local':
+        cep_cache.set(cep_formatado, _buscar_local(cep_formatado))
+        return True
+
+    endereco, cacheavel = _buscar_provedores(cep_formatado)
+    if cacheavel:
+        cep_cache.set(cep_formatado, endereco)
+    return cacheavel
+
+
+def gravar_consultas(consultas):
+    """
+    Grava um lote de consultas de CEP (pares endereço, horário da consulta)
+    em uma única transação: um INSERT multi-linha com upsert dos endereços
+    canônicos e outro com os registros de cep_consultas.
+    Usada pelo registro assíncrono de POST /cep/<cep>.
+    """
+    # O upsert não pode atualizar a mesma linha duas vezes: vale a última consulta do CEP
+    ultimas = {dados_endereco(endereco)['cep']: endereco for endereco, _ in consultas}
+    salvar_enderecos(list(ultimas.values()))
+    db.session.execute(insert(CepConsulta).values([
+        {**dados_endereco(endereco), 'created_at': horario} for endereco, horario in consultas
+    ]))
+    db.session.commit()
+
+
+def revalidar_cep(cep_formatado):
+    """
+    Revalida um endereço salvo nos provedores remotos de CEP_PROVEDORES (o
+    provedor local responderia com o próprio endereço salvo): atualiza o
+    endereço canônico, as consultas salvas desse CEP e o cache. Retorna False
+    se nenhum provedor respondeu.
+    """
+    endereco, cacheavel = _buscar_provedores(cep_formatado, somente_remotos=True)
+    if not cacheavel:
+        return False
+
+    cep_cache.set(cep_formatado, endereco)
+    if endereco:
+        salvar_endereco(endereco)
+        dados = dados_endereco(endereco)
+        CepConsulta.query.filter_by(cep=cep_formatado).update(
+            {coluna: dados[coluna] for coluna in COLUNAS_CONSULTA}, synchronize_session=False
+        )
+    else:
+        # O CEP deixou de existir nos provedores: os dados salvos são mantidos e
+        # a próxima revalidação fica para depois da idade máxima
+        current_app.logger.warning(f'CEP {cep_formatado} não encontrado nos provedores durante a revalidação')
+        Endereco.query.filter_by(cep=cep_formatado).update(
+            {'updated_at': datetime.utcnow()}, synchronize_session=False
+        )
+    db.session.commit()
+    return True
+
+
+def ceps_desatualizados(idade_maxima, limite):
+    """
+    Retorna os CEPs salvos há mais de idade_maxima segundos, dos mais antigos para os mais novos
+    """
+    corte = datetime.utcnow() - timedelta(seconds=idade_maxima)
+    consulta = (
+        db.session.query(Endereco.cep)
+        .filter(Endereco.updated_at < corte)
+        .order_by(Endereco.updated_at)
+        .limit(limite)
+    )
+    return [cep for (cep,) in consulta]
+
+
+def ceps_mais_consultados(top):
+    """
+    Retorna os top CEPs com mais consultas salvas
+    """
+    total = func.count(CepConsulta.id)
+    consulta = (
+        db.session.query(CepConsulta.cep)
+        .group_by(CepConsulta.cep)
+        .order_by(total.desc())
+        .limit(top)
+    )
+    return [cep for (cep,) in consulta]
+
+
+def aquecer_cache(top):
+    """
+    Carrega no cache os endereços dos CEPs mais consultados.
+    Retorna a quantidade de CEPs encontrados.
+    """
+    enderecos = consultar_ceps(ceps_mais_consultados(top))
+    return sum(1 for endereco in enderecos.values() if endereco and not isinstance(endereco, LimiteExcedido))
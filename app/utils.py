@@ -1,6 +1,14 @@
 import requests
-import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert
 from flask import current_app
+from .cache import AUSENTE
+from .extensions import db, cep_cache, coalescedor, indice_cep, resolvedor, viacep
+from .limitador import LimiteExcedido
+from .models import Endereco
+from .validacao import formatar_cep, validar_cpf, validar_email
+from .viacep import CircuitoAberto
 
 # Mapeamento de UF para região e estado completo
 UF_MAPEAMENTO = {
@@ -34,95 +42,221 @@ UF_MAPEAMENTO = {
 }
 
 
-def formatar_cep(cep):
+def consultar_viacep(cep, verificar_cache=True, consultar_local=None):
     """
-    Remove caracteres não numéricos do CEP e garante que tenha 8 dígitos
+    Consulta o endereço de um CEP passando pelo cache antes da API externa do ViaCEP.
+    Com verificar_cache=False a leitura do cache é pulada (o chamador já a fez),
+    mas o resultado continua sendo armazenado. consultar_local indica se os
+    endereços salvos no banco são consultados antes do ViaCEP; quando None,
+    segue o modo configurado em CEP_RESOLVER_MODO.
     """
-    cep_limpo = re.sub(r'\D', '', cep)
-    if len(cep_limpo) != 8:
+    cep_formatado = formatar_cep(cep)
+    if not cep_formatado:
         return None
-    return cep_limpo
+    
+    if verificar_cache:
+        endereco = cep_cache.get(cep_formatado)
+        if endereco is not AUSENTE:
+            return endereco
+    
+    modo = current_app.config['CEP_RESOLVER_MODO']
+    if consultar_local is None:
+        consultar_local = modo != 'viacep'
+    
+    # Chamadas concorrentes para o mesmo CEP compartilham uma única busca
+    return coalescedor.do(
+        cep_formatado,
+        lambda: _resolver_cep(cep_formatado, modo, consultar_local),
+        lambda: cep_cache.get(cep_formatado, contabilizar=False)
+    )
 
 
-def consultar_viacep(cep):
+def consultar_ceps(ceps):
     """
-    Consulta a API externa do ViaCEP para obter dados de endereço
+    Consulta um lote de CEPs: verifica o cache, resolve os restantes com uma
+    única consulta ao banco e busca apenas os que faltarem no ViaCEP, em paralelo.
+    Retorna um dicionário {cep_formatado: endereco ou None}; os resultados
+    ficam no cache para consultas individuais posteriores. Um CEP recusado
+    pelo limite de consultas ao ViaCEP tem como valor o LimiteExcedido, sem
+    descartar os demais resultados do lote.
     """
-    cep_formatado = formatar_cep(cep)
-    if not cep_formatado:
+    resultados = {}
+    pendentes = []
+    for cep_formatado in dict.fromkeys(ceps):
+        endereco = cep_cache.get(cep_formatado)
+        if endereco is AUSENTE:
+            pendentes.append(cep_formatado)
+        else:
+            resultados[cep_formatado] = endereco
+    
+    if pendentes:
+        for cep_formatado in pendentes:
+            endereco = indice_cep.get(cep_formatado)
+            if endereco:
+                resultados[cep_formatado] = endereco
+                cep_cache.set(cep_formatado, endereco)
+        pendentes = [cep for cep in pendentes if cep not in resultados]
+    
+    if pendentes:
+        for endereco in Endereco.query.filter(Endereco.cep.in_(pendentes)):
+            resultados[endereco.cep] = endereco.to_dict()
+            cep_cache.set(endereco.cep, resultados[endereco.cep])
+        pendentes = [cep for cep in pendentes if cep not in resultados]
+    
+    if pendentes:
+        app = current_app._get_current_object()
+        
+        def consultar(cep_formatado):
+            with app.app_context():
+                try:
+                    return consultar_viacep(cep_formatado, verificar_cache=False, consultar_local=False)
+                except LimiteExcedido as e:
+                    return e
+        
+        paralelismo = min(app.config['CEP_LOTE_PARALELISMO'], len(pendentes))
+        with ThreadPoolExecutor(max_workers=paralelismo) as executor:
+            for cep_formatado, endereco in zip(pendentes, executor.map(consultar, pendentes)):
+                resultados[cep_formatado] = endereco
+    
+    return resultados
+
+
+def _resolver_cep(cep_formatado, modo, consultar_local):
+    """
+    Busca o CEP nos dados locais e/ou no ViaCEP, conforme o modo do resolvedor,
+    e armazena o resultado no cache
+    """
+    # Outra busca pode ter concluído entre a verificação do cache e o início desta
+    endereco = cep_cache.get(cep_formatado, contabilizar=False)
+    if endereco is not AUSENTE:
+        return endereco
+    
+    if consultar_local:
+        endereco = _buscar_local(cep_formatado)
+        if endereco:
+            cep_cache.set(cep_formatado, endereco)
+            return endereco
+    
+    if modo == 'local':
+        # Somente dados locais: o CEP não existe na base importada
+        cep_cache.set(cep_formatado, None)
         return None
     
+    endereco, cacheavel = _buscar_provedores(cep_formatado)
+    if cacheavel:
+        cep_cache.set(cep_formatado, endereco)
+    elif endereco is None and not consultar_local:
+        # Provedores indisponíveis: usa os dados locais, se houver
+        endereco = _buscar_local(cep_formatado)
+    return endereco
+
+
+def _buscar_local(cep_formatado):
+    """
+    Busca o endereço nos dados locais: primeiro no índice mapeado em memória
+    (sem I/O de rede) e depois na tabela de endereços
+    """
+    return indice_cep.get(cep_formatado) or _buscar_banco(cep_formatado)
+
+
+def _buscar_banco(cep_formatado):
+    """
+    Busca o endereço canônico do CEP salvo no banco de dados
+    """
+    endereco = db.session.get(Endereco, cep_formatado)
+    return endereco.to_dict() if endereco else None
+
+
+def dados_endereco(endereco):
+    """
+    Converte um endereço retornado pelo ViaCEP nas colunas das tabelas de endereço
+    """
+    return {
+        'cep': endereco.get('cep', '').replace('-', ''),
+        'logradouro': endereco.get('logradouro', ''),
+        'complemento': endereco.get('complemento', ''),
+        'bairro': endereco.get('bairro', ''),
+        'localidade': endereco.get('localidade', ''),
+        'uf': endereco.get('uf', ''),
+        'estado': endereco.get('estado', ''),
+        'regiao': endereco.get('regiao', ''),
+        'ibge': endereco.get('ibge', ''),
+        'gia': endereco.get('gia', ''),
+        'ddd': endereco.get('ddd', ''),
+        'siafi': endereco.get('siafi', '')
+    }
+
+
+def salvar_endereco(endereco):
+    """
+    Insere ou atualiza (ON CONFLICT) o endereço canônico do CEP na sessão atual
+    """
+    salvar_enderecos([endereco])
+
+
+def salvar_enderecos(enderecos, agora=None):
+    """
+    Insere ou atualiza os endereços canônicos na sessão atual com um único
+    INSERT multi-linha (ON CONFLICT). Cada CEP deve aparecer uma vez na lista.
+    """
+    agora = agora or datetime.utcnow()
+    registros = [{**dados_endereco(endereco), 'created_at': agora, 'updated_at': agora}
+                 for endereco in enderecos]
+    stmt = insert(Endereco).values(registros)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Endereco.cep],
+        set_={coluna: stmt.excluded[coluna] for coluna in registros[0]
+              if coluna not in ('cep', 'created_at')}
+    )
+    db.session.execute(stmt)
+
+
+def enriquecer_endereco(endereco):
+    """
+    Adiciona o estado e a região a partir da UF do endereço
+    """
+    uf = endereco.get('uf')
+    if uf and uf in UF_MAPEAMENTO:
+        endereco['estado'] = UF_MAPEAMENTO[uf]['estado']
+        endereco['regiao'] = UF_MAPEAMENTO[uf]['regiao']
+    return endereco
+
+
+def _buscar_provedores(cep_formatado, somente_remotos=False):
+    """
+    Consulta os provedores de CEP configurados (ViaCEP por padrão), com hedge
+    entre eles. Retorna o endereço (ou None) e se a resposta pode ser armazenada em cache.
+    """
+    return resolvedor.resolver(cep_formatado, somente_remotos)
+
+
+def _buscar_viacep(cep_formatado):
+    """
+    Consulta a API externa do ViaCEP para obter dados de endereço.
+    Retorna o endereço (ou None) e se a resposta pode ser armazenada em cache.
+    """
     try:
-        api_url = f"{current_app.config['VIACEP_EXTERNAL_API']}/{cep_formatado}/json/"
-        response = requests.get(api_url)
+        response = viacep.get(cep_formatado)
+        
+        # CEP rejeitado pelo ViaCEP: resposta negativa, pode ir para o cache
+        if response.status_code == 400:
+            return None, True
+        
         response.raise_for_status()
         
         data = response.json()
         
         # Verifica se o CEP existe
         if "erro" in data:
-            return None
-        
-        # Adiciona informações extras
-        uf = data.get('uf')
-        if uf and uf in UF_MAPEAMENTO:
-            data['estado'] = UF_MAPEAMENTO[uf]['estado']
-            data['regiao'] = UF_MAPEAMENTO[uf]['regiao']
+            return None, True
         
-        return data
+        return enriquecer_endereco(data), True
+    except CircuitoAberto:
+        current_app.logger.warning(f"Circuito do ViaCEP aberto, consulta ao CEP {cep_formatado} recusada")
+        return None, False
     except requests.exceptions.RequestException as e:
         current_app.logger.error(f"Erro ao consultar ViaCEP: {str(e)}")
-        return None
+        return None, False
     except ValueError as e:
         current_app.logger.error(f"Erro ao processar resposta do ViaCEP: {str(e)}")
-        return None
-
-
-def validar_email(email):
-    """
-    Valida se o email está em um formato correto
-    """
-    # Implementação básica, pode ser expandida
-    pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-    return re.match(pattern, email) is not None
-
-
-def validar_cpf(cpf):
-    """
-    Valida se o CPF é válido
-    """
-    # Remove caracteres não numéricos
-    cpf = re.sub(r'\D', '', cpf)
-    
-    # Verifica se tem 11 dígitos
-    if len(cpf) != 11:
-        return False
-    
-    # Verifica se todos os dígitos são iguais
-    if cpf == cpf[0] * 11:
-        return False
-    
-    # Validação do primeiro dígito verificador
-    soma = 0
-    peso = 10
-    for i in range(9):
-        soma += int(cpf[i]) * peso
-        peso -= 1
-    
-    resto = soma % 11
-    digito1 = 0 if resto < 2 else 11 - resto
-    
-    if int(cpf[9]) != digito1:
-        return False
-    
-    # Validação do segundo dígito verificador
-    soma = 0
-    peso = 11
-    for i in range(10):
-        soma += int(cpf[i]) * peso
-        peso -= 1
-    
-    resto = soma % 11
-    digito2 = 0 if resto < 2 else 11 - resto
-    
-    return int(cpf[10]) == digito2
\ No newline at end of file
+        return None, False
@@ -0,0 +1,120 @@
+import re
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy é opcional
+    np = None
+
+# Padrões compilados uma única vez
+NAO_DIGITOS = re.compile(r'\D')
+EMAIL = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+
+# Acentos removidos na normalização de textos de endereço. A mesma tabela é
+# usada pelo translate() das colunas normalizadas no banco (ver models.py)
+ACENTOS = 'ÁÀÂÃÄÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇÑáàâãäéèêëíìîïóòôõöúùûüçñ'
+SEM_ACENTOS = 'AAAAAEEEEIIIIOOOOOUUUUCNaaaaaeeeeiiiiooooouuuucn'
+TABELA_ACENTOS = str.maketrans(ACENTOS, SEM_ACENTOS)
+
+PESOS_CPF_1 = (10, 9, 8, 7, 6, 5, 4, 3, 2)
+PESOS_CPF_2 = (11, 10, 9, 8, 7, 6, 5, 4, 3, 2)
+
+
+def formatar_cep(cep):
+    """
+    Remove caracteres não numéricos do CEP e garante que tenha 8 dígitos
+    """
+    cep_limpo = NAO_DIGITOS.sub('', cep)
+    if len(cep_limpo) != 8:
+        return None
+    return cep_limpo
+
+
+def normalizar_texto(texto):
+    """
+    Remove acentos e converte para minúsculas, como as colunas *_normalizado(a)
+    """
+    return texto.strip().translate(TABELA_ACENTOS).lower()
+
+
+def validar_email(email):
+    """
+    Valida se o email está em um formato correto
+    """
+    return EMAIL.match(email) is not None
+
+
+def _digito(soma):
+    resto = soma % 11
+    return 0 if resto < 2 else 11 - resto
+
+
+def validar_cpf(cpf):
+    """
+    Valida se o CPF é válido
+    """
+    cpf = NAO_DIGITOS.sub('', cpf)
+    if len(cpf) != 11 or cpf == cpf[0] * 11:
+        return False
+
+    # Os bytes ASCII dos dígitos menos 48 são os próprios valores
+    d = [c - 48 for c in cpf.encode()] if cpf.isascii() else [int(c) for c in cpf]
+    if d[9] != _digito(sum(map(int.__mul__, d, PESOS_CPF_1))):
+        return False
+    return d[10] == _digito(sum(map(int.__mul__, d, PESOS_CPF_2)))
+
+
+def formatar_ceps(ceps):
+    """
+    Versão em lote de formatar_cep
+    """
+    sub = NAO_DIGITOS.sub
+    resultado = []
+    for cep in ceps:
+        cep_limpo = sub('', cep)
+        resultado.append(cep_limpo if len(cep_limpo) == 8 else None)
+    return resultado
+
+
+def validar_emails(emails):
+    """
+    Versão em lote de validar_email
+    """
+    match = EMAIL.match
+    return [match(email) is not None for email in emails]
+
+
+def validar_cpfs(cpfs):
+    """
+    Versão em lote de validar_cpf. Com NumPy, os dígitos verificadores de
+    todos os CPFs são calculados de uma vez sobre uma matriz n x 11.
+    """
+    sub = NAO_DIGITOS.sub
+    limpos = [sub('', cpf) for cpf in cpfs]
+    if np is None:
+        return [validar_cpf(cpf) for cpf in limpos]
+
+    resultado = np.zeros(len(limpos), dtype=bool)
+    indices = []
+    for i, cpf in enumerate(limpos):
+        if len(cpf) == 11:
+            if cpf.isascii():
+                indices.append(i)
+            else:
+                # Dígitos não ASCII (ex.: outros alfabetos) seguem o caminho escalar
+                resultado[i] = validar_cpf(cpf)
+    indices = np.array(indices, dtype=np.intp)
+    if not len(indices):
+        return resultado.tolist()
+
+    buffer = ''.join(limpos[i] for i in indices).encode()
+    d = (np.frombuffer(buffer, dtype=np.uint8).reshape(-1, 11) - 48).astype(np.int32)
+
+    def digito(somas):
+        resto = somas % 11
+        return np.where(resto < 2, 0, 11 - resto)
+
+    dv1 = digito(d[:, :9] @ np.array(PESOS_CPF_1, dtype=np.int32))
+    dv2 = digito(d[:, :10] @ np.array(PESOS_CPF_2, dtype=np.int32))
+    repetidos = (d == d[:, :1]).all(axis=1)
+    resultado[indices] = (d[:, 9] == dv1) & (d[:, 10] == dv2) & ~repetidos
+    return resultado.tolist()
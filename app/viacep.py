@@ -0,0 +1,260 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .limitador import LimiteExcedido
+from .metrics import ETAPA_VIACEP, VIACEP_LATENCIA, observar_etapa
+
+# Status HTTP que indicam falha transitória do ViaCEP
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+
+class CircuitoAberto(Exception):
+    """
+    Disparada quando o circuit breaker está aberto e a chamada é recusada
+    """
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker baseado na taxa de erros de uma janela deslizante de tempo
+    """
+
+    FECHADO = 'fechado'
+    ABERTO = 'aberto'
+    MEIO_ABERTO = 'meio_aberto'
+
+    def __init__(self, limiar_erro=0.5, minimo_requisicoes=10, janela=60, tempo_aberto=30,
+                 relogio=time.monotonic):
+        self.limiar_erro = limiar_erro
+        self.minimo_requisicoes = minimo_requisicoes
+        self.janela = janela
+        self.tempo_aberto = tempo_aberto
+        self.relogio = relogio
+        self._estado = self.FECHADO
+        self._aberto_em = 0.0
+        self._teste_em_andamento = False
+        self._resultados = deque()
+        self._lock = threading.Lock()
+        self.rejeicoes = 0
+
+    @property
+    def estado(self):
+        with self._lock:
+            return self._atualizar_estado()
+
+    def _atualizar_estado(self):
+        if self._estado == self.ABERTO and self.relogio() - self._aberto_em >= self.tempo_aberto:
+            self._estado = self.MEIO_ABERTO
+            self._teste_em_andamento = False
+        return self._estado
+
+    def _descartar_antigos(self, agora):
+        while self._resultados and self._resultados[0][0] < agora - self.janela:
+            self._resultados.popleft()
+
+    def permitir(self):
+        """
+        Indica se uma chamada pode ser feita. No estado meio aberto apenas
+        uma chamada de teste é liberada por vez.
+        """
+        with self._lock:
+            estado = self._atualizar_estado()
+            if estado == self.FECHADO:
+                return True
+            if estado == self.MEIO_ABERTO and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                return True
+            self.rejeicoes += 1
+            return False
+
+    def registrar_sucesso(self):
+        with self._lock:
+            agora = self.relogio()
+            if self._estado == self.MEIO_ABERTO:
+                self._estado = self.FECHADO
+                self._resultados.clear()
+            self._resultados.append((agora, True))
+            self._descartar_antigos(agora)
+
+    def registrar_falha(self):
+        with self._lock:
+            agora = self.relogio()
+            if self._estado == self.MEIO_ABERTO:
+                self._abrir(agora)
+                return
+            self._resultados.append((agora, False))
+            self._descartar_antigos(agora)
+            total = len(self._resultados)
+            if total >= self.minimo_requisicoes:
+                falhas = sum(1 for _, sucesso in self._resultados if not sucesso)
+                if falhas / total >= self.limiar_erro:
+                    self._abrir(agora)
+
+    def _abrir(self, agora):
+        self._estado = self.ABERTO
+        self._aberto_em = agora
+        self._teste_em_andamento = False
+        self._resultados.clear()
+
+    def stats(self):
+        with self._lock:
+            estado = self._atualizar_estado()
+            total = len(self._resultados)
+            falhas = sum(1 for _, sucesso in self._resultados if not sucesso)
+            return {
+                'estado': estado,
+                'requisicoes_janela': total,
+                'falhas_janela': falhas,
+                'rejeicoes': self.rejeicoes
+            }
+
+
+class ViaCEPClient:
+    """
+    Cliente HTTP do ViaCEP com sessão keep-alive compartilhada, timeouts,
+    novas tentativas com backoff exponencial (jitter), circuit breaker e
+    orçamento global de chamadas
+    """
+
+    def __init__(self, app=None, dormir=time.sleep):
+        self.base_url = 'https://viacep.com.br/ws'
+        self.timeout = (3.05, 5.0)
+        self.tentativas = 2
+        self.backoff = 0.2
+        self.backoff_maximo = 2.0
+        self.pool_conexoes = 10
+        self.breaker = CircuitBreaker()
+        self.orcamento = None
+        self.dormir = dormir
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, orcamento=None):
+        self.base_url = app.config['VIACEP_EXTERNAL_API'].rstrip('/')
+        self.timeout = (
+            app.config['VIACEP_TIMEOUT_CONEXAO'],
+            app.config['VIACEP_TIMEOUT_LEITURA']
+        )
+        self.tentativas = app.config['VIACEP_TENTATIVAS']
+        self.backoff = app.config['VIACEP_BACKOFF']
+        self.backoff_maximo = app.config['VIACEP_BACKOFF_MAXIMO']
+        self.pool_conexoes = app.config['VIACEP_POOL_CONEXOES']
+        self.breaker = CircuitBreaker(
+            limiar_erro=app.config['VIACEP_CIRCUITO_LIMIAR_ERRO'],
+            minimo_requisicoes=app.config['VIACEP_CIRCUITO_MINIMO_REQUISICOES'],
+            janela=app.config['VIACEP_CIRCUITO_JANELA'],
+            tempo_aberto=app.config['VIACEP_CIRCUITO_TEMPO_ABERTO']
+        )
+        self.orcamento = orcamento
+        self._session = None
+        app.extensions['viacep'] = self
+
+    @property
+    def session(self):
+        """
+        Sessão HTTP com pool de conexões, recriada após um fork do processo
+        para que workers não compartilhem sockets
+        """
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=1,
+                        pool_maxsize=self.pool_conexoes,
+                        max_retries=0
+                    )
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    session.headers['Accept'] = 'application/json'
+                    self._session = session
+                    self._pid = os.getpid()
+        return self._session
+
+    def _esperar(self, tentativa):
+        # Backoff exponencial com "full jitter"
+        limite = min(self.backoff_maximo, self.backoff * (2 ** tentativa))
+        self.dormir(random.uniform(0, limite))
+
+    def get(self, cep_formatado):
+        """
+        Faz o GET do CEP no ViaCEP, tentando novamente em falhas transitórias.
+        Dispara LimiteExcedido se o orçamento de chamadas estiver esgotado,
+        CircuitoAberto se o circuito estiver aberto e
+        requests.exceptions.RequestException se todas as tentativas falharem.
+        """
+        # O orçamento é consumido antes do circuit breaker para não prender
+        # a chamada de teste do estado meio aberto
+        if self.orcamento is not None:
+            self.orcamento.adquirir()
+        if not self.breaker.permitir():
+            raise CircuitoAberto('Circuito do ViaCEP aberto')
+
+        url = f"{self.base_url}/{cep_formatado}/json/"
+        tentativa = 0
+        while True:
+            inicio = time.perf_counter()
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                self._observar(inicio, response.status_code)
+                if response.status_code in STATUS_RETENTAVEIS:
+                    response.raise_for_status()
+                self.breaker.registrar_sucesso()
+                return response
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout,
+                    requests.exceptions.HTTPError) as e:
+                if not isinstance(e, requests.exceptions.HTTPError):
+                    self._observar(inicio, type(e).__name__)
+                if tentativa >= self.tentativas or not self._orcamento_disponivel():
+                    self.breaker.registrar_falha()
+                    raise
+                self._esperar(tentativa)
+                tentativa += 1
+            except requests.exceptions.RequestException as e:
+                self._observar(inicio, type(e).__name__)
+                self.breaker.registrar_falha()
+                raise
+
+    def _orcamento_disponivel(self):
+        # Novas tentativas também contam no orçamento; sem ele, a falha é definitiva
+        if self.orcamento is None:
+            return True
+        try:
+            self.orcamento.adquirir()
+            return True
+        except LimiteExcedido:
+            return False
+
+    def _observar(self, inicio, status):
+        duracao = time.perf_counter() - inicio
+        VIACEP_LATENCIA.labels(status).observe(duracao)
+        observar_etapa(ETAPA_VIACEP, 'viacep', duracao)
+
+    def stats(self):
+        pools = []
+        if self._session is not None:
+            for adapter in set(self._session.adapters.values()):
+                gerenciador = adapter.poolmanager
+                for chave in gerenciador.pools.keys():
+                    pool = gerenciador.pools[chave]
+                    pools.append({
+                        'host': pool.host,
+                        'conexoes_criadas': pool.num_connections,
+                        'requisicoes': pool.num_requests,
+                        'conexoes_ociosas': pool.pool.qsize() if pool.pool else 0,
+                        'tamanho_maximo': self.pool_conexoes
+                    })
+        return {
+            'circuito': self.breaker.stats(),
+            'pools': pools
+        }
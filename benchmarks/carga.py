@@ -0,0 +1,211 @@
+"""
+Gerador de carga para /cep e /usuarios com concorrência fixa. Reporta
+p50/p95/p99 e vazão por cenário e grava o resultado em JSON.
+
+    python -m benchmarks.carga --url http://localhost:5001 --concorrencia 32 \\
+        --duracao 30 --cenario cep_get=8 --cenario usuarios_post=1 --saida carga.json
+
+Com --alvo nome=url (repetível), executa os mesmos cenários contra cada
+servidor, um após o outro, e compara vazão e p99 com o primeiro alvo. Para
+comparar os workers síncronos com os do gevent (I/O do ViaCEP e do banco não
+bloqueantes) com ViaCEP lento e alta concorrência:
+
+    python -m benchmarks.fake_viacep --porta 8099 --latencia-ms 300 &
+    export VIACEP_EXTERNAL_API=http://127.0.0.1:8099/ws RATE_LIMIT_HABILITADO=False VIACEP_ORCAMENTO_TAXA=0
+    GUNICORN_WORKER_CLASS=sync GUNICORN_BIND=0.0.0.0:5001 gunicorn -c gunicorn.conf.py run:app &
+    GUNICORN_WORKER_CLASS=gevent GUNICORN_BIND=0.0.0.0:5002 gunicorn -c gunicorn.conf.py run:app &
+    python -m benchmarks.carga --alvo sync=http://localhost:5001 --alvo gevent=http://localhost:5002 \\
+        --concorrencia 256 --cenario cep_get=1 --ceps-distintos 100000 --saida carga_workers.json
+"""
+import argparse
+import itertools
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+from .comum import comparar, resumir_latencias, salvar_resultado
+
+_sequencia = itertools.count()
+
+
+def gerar_cpf(rng):
+    """
+    Gera um CPF válido (com dígitos verificadores corretos)
+    """
+    digitos = [rng.randint(0, 9) for _ in range(9)]
+    for tamanho in (9, 10):
+        soma = sum(d * p for d, p in zip(digitos, range(tamanho + 1, 1, -1)))
+        resto = soma % 11
+        digitos.append(0 if resto < 2 else 11 - resto)
+    return ''.join(map(str, digitos))
+
+
+def criar_cenarios(args, url):
+    ceps = [f'{random.Random(i).randint(1000000, 99999999):08d}' for i in range(args.ceps_distintos)]
+    execucao = int(time.time())
+
+    def cep_get(sessao, rng):
+        return sessao.get(f'{url}/cep/{rng.choice(ceps)}')
+
+    def cep_post(sessao, rng):
+        return sessao.post(f'{url}/cep/{rng.choice(ceps)}')
+
+    def cep_lista(sessao, rng):
+        return sessao.get(f'{url}/cep/', params={'limit': args.limite_listagem})
+
+    def usuarios_lista(sessao, rng):
+        return sessao.get(f'{url}/usuarios/', params={'limit': args.limite_listagem})
+
+    def usuarios_post(sessao, rng):
+        n = next(_sequencia)
+        return sessao.post(f'{url}/usuarios/', params={
+            'nome_completo': f'Usuário Carga {n}',
+            'email': f'carga.{execucao}.{n}@example.com',
+            'senha': 'senha123',
+            'cpf': gerar_cpf(rng),
+            'cep': rng.choice(ceps)
+        })
+
+    return {
+        'cep_get': cep_get,
+        'cep_post': cep_post,
+        'cep_lista': cep_lista,
+        'usuarios_lista': usuarios_lista,
+        'usuarios_post': usuarios_post
+    }
+
+
+def _pesos(especificacoes, disponiveis):
+    pesos = {}
+    for especificacao in especificacoes or ['cep_get=1']:
+        nome, _, peso = especificacao.partition('=')
+        if nome not in disponiveis:
+            raise SystemExit(f'Cenário desconhecido: {nome} (opções: {", ".join(disponiveis)})')
+        pesos[nome] = float(peso or 1)
+    return pesos
+
+
+def executar(args, url):
+    cenarios = criar_cenarios(args, url)
+    pesos = _pesos(args.cenario, cenarios)
+    nomes = list(pesos)
+    valores_pesos = [pesos[nome] for nome in nomes]
+
+    latencias = defaultdict(list)
+    status = defaultdict(lambda: defaultdict(int))
+    lock = threading.Lock()
+    inicio_medicao = time.perf_counter() + args.aquecimento
+    fim = inicio_medicao + args.duracao
+
+    def trabalhador(indice):
+        rng = random.Random(args.semente + indice)
+        sessao = requests.Session()
+        locais = []
+        while True:
+            agora = time.perf_counter()
+            if agora >= fim:
+                break
+            nome = rng.choices(nomes, valores_pesos)[0]
+            try:
+                codigo = cenarios[nome](sessao, rng).status_code
+            except requests.exceptions.RequestException as e:
+                codigo = type(e).__name__
+            decorrido = time.perf_counter() - agora
+            if agora >= inicio_medicao:
+                locais.append((nome, decorrido, codigo))
+        with lock:
+            for nome, decorrido, codigo in locais:
+                latencias[nome].append(decorrido)
+                status[nome][str(codigo)] += 1
+
+    threads = [threading.Thread(target=trabalhador, args=(i,)) for i in range(args.concorrencia)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    resultados = {}
+    todas = []
+    for nome in nomes:
+        todas.extend(latencias[nome])
+        resultados[nome] = {
+            **resumir_latencias(latencias[nome]),
+            'req_por_s': round(len(latencias[nome]) / args.duracao, 2),
+            'status': dict(status[nome])
+        }
+    resultados['total'] = {
+        **resumir_latencias(todas),
+        'req_por_s': round(len(todas) / args.duracao, 2)
+    }
+    return resultados
+
+
+def _alvos(args):
+    if not args.alvo:
+        return {'padrao': args.url}
+    alvos = {}
+    for especificacao in args.alvo:
+        nome, separador, url = especificacao.partition('=')
+        if not separador or not url:
+            raise SystemExit(f'Alvo inválido: {especificacao} (use nome=url)')
+        alvos[nome] = url.rstrip('/')
+    return alvos
+
+
+def _comparar_alvos(alvos, resultados):
+    """
+    Imprime a vazão e o p99 de cada alvo em relação ao primeiro
+    """
+    base = alvos[0]
+    print(f'\nComparação com {base}:')
+    for alvo in alvos[1:]:
+        for chave, valores in resultados.items():
+            if not chave.startswith(f'{base}:'):
+                continue
+            nome = chave.partition(':')[2]
+            outro = resultados.get(f'{alvo}:{nome}')
+            if not outro or not valores['req_por_s'] or not valores['p99_ms'] or outro['p99_ms'] is None:
+                continue
+            print(f"  {alvo:<10} {nome:<16} vazão {outro['req_por_s'] / valores['req_por_s']:>6.2f}x  "
+                  f"p99 {valores['p99_ms']:.1f} -> {outro['p99_ms']:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5001')
+    parser.add_argument('--alvo', action='append',
+                        help='nome=url de um servidor a comparar (repetível; substitui --url)')
+    parser.add_argument('--concorrencia', type=int, default=16)
+    parser.add_argument('--duracao', type=float, default=30, help='Duração da medição (s)')
+    parser.add_argument('--aquecimento', type=float, default=3, help='Tempo (s) descartado no início')
+    parser.add_argument('--cenario', action='append',
+                        help='nome=peso (cep_get, cep_post, cep_lista, usuarios_lista, usuarios_post)')
+    parser.add_argument('--ceps-distintos', type=int, default=2000, help='Tamanho do conjunto de CEPs consultados')
+    parser.add_argument('--limite-listagem', type=int, default=100)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default='carga.json')
+    parser.add_argument('--comparar', help='Resultado anterior para comparação')
+    args = parser.parse_args()
+
+    alvos = _alvos(args)
+    resultados = {}
+    for alvo, url in alvos.items():
+        if len(alvos) > 1:
+            print(f'\n{alvo} ({url})')
+        for nome, valores in executar(args, url).items():
+            print(f"{nome:<16} {valores['req_por_s']:>10.1f} req/s  p50={valores['p50_ms']} ms  "
+                  f"p95={valores['p95_ms']} ms  p99={valores['p99_ms']} ms")
+            resultados[f'{alvo}:{nome}' if len(alvos) > 1 else nome] = valores
+    if len(alvos) > 1:
+        _comparar_alvos(list(alvos), resultados)
+
+    dados = salvar_resultado(args.saida, 'carga', vars(args), resultados)
+    if args.comparar:
+        comparar(args.comparar, dados, 'p99_ms')
+
+
+if __name__ == '__main__':
+    main()
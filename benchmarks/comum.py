@@ -0,0 +1,79 @@
+"""
+Funções compartilhadas pelos benchmarks: estatísticas e gravação dos
+resultados em JSON, para comparação entre commits.
+"""
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+
+def percentil(valores_ordenados, p):
+    """
+    Percentil por interpolação linear de uma lista já ordenada
+    """
+    if not valores_ordenados:
+        return None
+    posicao = (len(valores_ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(valores_ordenados) - 1)
+    fracao = posicao - inferior
+    return valores_ordenados[inferior] + (valores_ordenados[superior] - valores_ordenados[inferior]) * fracao
+
+
+def resumir_latencias(latencias):
+    """
+    Resume latências (em segundos) em milissegundos
+    """
+    ordenadas = sorted(latencias)
+    return {
+        'amostras': len(ordenadas),
+        'p50_ms': round(percentil(ordenadas, 50) * 1000, 3) if ordenadas else None,
+        'p95_ms': round(percentil(ordenadas, 95) * 1000, 3) if ordenadas else None,
+        'p99_ms': round(percentil(ordenadas, 99) * 1000, 3) if ordenadas else None,
+        'max_ms': round(ordenadas[-1] * 1000, 3) if ordenadas else None
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def salvar_resultado(arquivo, tipo, parametros, resultados):
+    """
+    Grava o resultado em JSON com o commit e o ambiente da execução
+    """
+    dados = {
+        'tipo': tipo,
+        'commit': _commit_atual(),
+        'data': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'parametros': parametros,
+        'resultados': resultados
+    }
+    with open(arquivo, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+    return dados
+
+
+def comparar(arquivo_base, atual, chave):
+    """
+    Imprime a variação de cada métrica `chave` em relação a um resultado anterior
+    """
+    with open(arquivo_base, encoding='utf-8') as f:
+        base = json.load(f)
+
+    print(f"\nComparação com {base.get('commit')} ({arquivo_base}):")
+    for nome, valores in atual['resultados'].items():
+        anterior = base['resultados'].get(nome, {}).get(chave)
+        valor = valores.get(chave)
+        if anterior and valor is not None:
+            variacao = (valor - anterior) / anterior * 100
+            print(f'  {nome:<30} {anterior:>12.3f} -> {valor:>12.3f} ({variacao:+.1f}%)')
@@ -0,0 +1,196 @@
+"""
+Latência da consulta de um CEP com a tabela grande (1M+ linhas), antes e
+depois da tabela canônica de endereços:
+
+- antes: log de consultas sem índice em cep e com CEPs repetidos, lido com
+  filter_by(cep=...).first() (varredura sequencial)
+- depois: tabela de endereços com o CEP como chave primária, lida com
+  session.get(Endereco, cep) (busca no índice)
+
+As tabelas são criadas com o prefixo bench_ no banco de DATABASE_URL (ou
+--url), populadas e removidas ao final (--manter as preserva para novas
+execuções, que então pulam a carga):
+
+    python -m benchmarks.consulta_cep --linhas 1000000 --consultas 500 --saida consulta_cep.json
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, create_engine, func, insert, select
+from sqlalchemy.orm import DeclarativeBase, Session
+
+from .comum import comparar, resumir_latencias, salvar_resultado
+
+BLOCO_CARGA = 10000
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class _ColunasEndereco:
+    logradouro = Column(String(100))
+    complemento = Column(String(100))
+    bairro = Column(String(50))
+    localidade = Column(String(50))
+    uf = Column(String(2))
+    estado = Column(String(50))
+    regiao = Column(String(50))
+    ibge = Column(String(10))
+    gia = Column(String(10))
+    ddd = Column(String(2))
+    siafi = Column(String(10))
+
+
+class ConsultaSemIndice(_ColunasEndereco, Base):
+    """
+    Layout anterior de cep_consultas: uma linha por consulta, sem índice em cep
+    """
+    __tablename__ = 'bench_cep_consultas'
+
+    id = Column(Integer, primary_key=True)
+    cep = Column(String(9), nullable=False)
+    created_at = Column(DateTime)
+
+
+class EnderecoCanonico(_ColunasEndereco, Base):
+    """
+    Layout atual de enderecos: um registro por CEP, chave primária cep
+    """
+    __tablename__ = 'bench_enderecos'
+
+    cep = Column(String(9), primary_key=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+
+def _linha(cep, rng):
+    uf = rng.choice(('SP', 'RJ', 'MG', 'RS', 'PR', 'BA'))
+    return {
+        'cep': cep,
+        'logradouro': f'Rua Teste {rng.randint(1, 9999)}',
+        'complemento': '',
+        'bairro': f'Bairro {rng.randint(1, 500)}',
+        'localidade': f'Cidade {uf}',
+        'uf': uf,
+        'estado': '',
+        'regiao': '',
+        'ibge': str(rng.randint(1000000, 9999999)),
+        'gia': '',
+        'ddd': str(rng.randint(11, 99)),
+        'siafi': str(rng.randint(1000, 9999))
+    }
+
+
+def popular(engine, linhas, repeticoes, semente):
+    """
+    Carrega linhas consultas no log (cada CEP repetido `repeticoes` vezes,
+    em ordem embaralhada) e os CEPs distintos na tabela de endereços.
+    Retorna a lista de CEPs.
+    """
+    rng = random.Random(semente)
+    distintos = max(1, linhas // repeticoes)
+    ceps = [f'{cep:08d}' for cep in rng.sample(range(1000000, 99999999), distintos)]
+    agora = datetime.utcnow()
+
+    with engine.begin() as conexao:
+        for inicio in range(0, distintos, BLOCO_CARGA):
+            conexao.execute(insert(EnderecoCanonico), [
+                {**_linha(cep, rng), 'created_at': agora, 'updated_at': agora}
+                for cep in ceps[inicio:inicio + BLOCO_CARGA]
+            ])
+
+        # Todos os CEPs aparecem no log, espalhados pela tabela
+        log = ceps * repeticoes
+        log += [rng.choice(ceps) for _ in range(linhas - len(log))]
+        rng.shuffle(log)
+        for inicio in range(0, linhas, BLOCO_CARGA):
+            conexao.execute(insert(ConsultaSemIndice), [
+                {**_linha(cep, rng), 'created_at': agora} for cep in log[inicio:inicio + BLOCO_CARGA]
+            ])
+            print(f'\r  {min(inicio + BLOCO_CARGA, linhas)}/{linhas} linhas', end='', flush=True)
+    print()
+
+    if engine.dialect.name == 'postgresql':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conexao:
+            conexao.exec_driver_sql(f'VACUUM ANALYZE {ConsultaSemIndice.__tablename__}')
+            conexao.exec_driver_sql(f'VACUUM ANALYZE {EnderecoCanonico.__tablename__}')
+    return ceps
+
+
+def medir(engine, consultar, ceps, consultas, semente):
+    rng = random.Random(semente)
+    latencias = []
+    with Session(engine) as sessao:
+        for _ in range(consultas):
+            cep = rng.choice(ceps)
+            # Sem o identity map da sessão, como em requisições diferentes
+            sessao.expunge_all()
+            inicio = time.perf_counter()
+            encontrado = consultar(sessao, cep)
+            latencias.append(time.perf_counter() - inicio)
+            assert encontrado is not None
+    return latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='URL do banco (padrão: DATABASE_URL da aplicação)')
+    parser.add_argument('--linhas', type=int, default=1000000, help='Linhas do log de consultas')
+    parser.add_argument('--repeticoes', type=int, default=3, help='Consultas por CEP no log (duplicatas)')
+    parser.add_argument('--consultas', type=int, default=500)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--manter', action='store_true', help='Não remove as tabelas ao final')
+    parser.add_argument('--saida', default='consulta_cep.json')
+    parser.add_argument('--comparar', help='Resultado anterior para comparação')
+    args = parser.parse_args()
+
+    if args.url is None:
+        from app.config import Config
+        args.url = os.environ.get('DATABASE_URL', Config.SQLALCHEMY_DATABASE_URI)
+    engine = create_engine(args.url)
+
+    Base.metadata.create_all(engine)
+    try:
+        with Session(engine) as sessao:
+            existentes = sessao.scalar(select(func.count()).select_from(ConsultaSemIndice))
+            if existentes >= args.linhas:
+                print(f'Reutilizando {existentes} linhas já carregadas')
+                ceps = list(sessao.scalars(select(EnderecoCanonico.cep)))
+            else:
+                print(f'Carregando {args.linhas} linhas...')
+                sessao.close()
+                Base.metadata.drop_all(engine)
+                Base.metadata.create_all(engine)
+                ceps = popular(engine, args.linhas, args.repeticoes, args.semente)
+
+        cenarios = {
+            'antes_filter_by_sem_indice': lambda sessao, cep: (
+                sessao.query(ConsultaSemIndice).filter_by(cep=cep).first()
+            ),
+            'depois_get_chave_primaria': lambda sessao, cep: sessao.get(EnderecoCanonico, cep)
+        }
+        resultados = {}
+        for nome, consultar in cenarios.items():
+            # Aquecimento do cache do banco e das conexões
+            medir(engine, consultar, ceps, min(10, args.consultas), args.semente + 1)
+            resultados[nome] = resumir_latencias(medir(engine, consultar, ceps, args.consultas, args.semente))
+            r = resultados[nome]
+            print(f"{nome:<28} p50={r['p50_ms']:>10.3f} ms  p95={r['p95_ms']:>10.3f} ms  "
+                  f"p99={r['p99_ms']:>10.3f} ms")
+    finally:
+        if not args.manter:
+            Base.metadata.drop_all(engine)
+
+    # A URL é gravada sem a senha
+    parametros = {**vars(args), 'url': engine.url.render_as_string()}
+    dados = salvar_resultado(args.saida, 'consulta_cep', parametros, resultados)
+    if args.comparar:
+        comparar(args.comparar, dados, 'p50_ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Servidor local que imita a API do ViaCEP, com latência e taxa de erros
+configuráveis. Aponte VIACEP_EXTERNAL_API para http://<host>:<porta>/ws.
+
+    python -m benchmarks.fake_viacep --porta 8099 --latencia-ms 80 --taxa-erro 0.01
+
+Também imita os outros provedores de CEP (--formato opencep ou brasilapi,
+em http://<host>:<porta>/v1 e http://<host>:<porta>/api/cep/v1). Com
+--taxa-lenta, uma fração das respostas demora --latencia-lenta-ms a mais,
+simulando a cauda de latência que o hedge do resolvedor ataca:
+
+    python -m benchmarks.fake_viacep --porta 8098 --formato brasilapi --taxa-lenta 0.05
+"""
+import argparse
+import json
+import random
+import re
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+UFS = ['SP', 'RJ', 'MG', 'RS', 'PR', 'BA', 'PE', 'CE', 'SC', 'GO', 'DF', 'AM']
+ROTAS = {
+    'viacep': re.compile(r'^/ws/(\d{8})/json/?$'),
+    'opencep': re.compile(r'^/v1/(\d{8})/?$'),
+    'brasilapi': re.compile(r'^/api/cep/v1/(\d{8})/?$')
+}
+
+
+def endereco_ficticio(cep):
+    """
+    Gera um endereço determinístico para o CEP, no formato do ViaCEP
+    """
+    semente = zlib.crc32(cep.encode())
+    uf = UFS[semente % len(UFS)]
+    return {
+        'cep': f'{cep[:5]}-{cep[5:]}',
+        'logradouro': f'Rua Teste {semente % 1000}',
+        'complemento': '',
+        'unidade': '',
+        'bairro': f'Bairro {semente % 50}',
+        'localidade': f'Cidade {uf}',
+        'uf': uf,
+        'ibge': str(1000000 + semente % 9000000),
+        'gia': '',
+        'ddd': str(11 + semente % 88),
+        'siafi': str(1000 + semente % 9000)
+    }
+
+
+def no_formato(endereco, formato):
+    """
+    Converte o endereço do formato do ViaCEP para o do provedor imitado
+    """
+    if formato != 'brasilapi':
+        return endereco
+    return {
+        'cep': endereco['cep'].replace('-', ''),
+        'state': endereco['uf'],
+        'city': endereco['localidade'],
+        'neighborhood': endereco['bairro'],
+        'street': endereco['logradouro'],
+        'service': 'fake'
+    }
+
+
+def criar_handler(args):
+    rota = ROTAS[args.formato]
+
+    class ViaCEPFalso(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _responder(self, status, corpo):
+            dados = json.dumps(corpo, ensure_ascii=False).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_GET(self):
+            atraso = args.latencia_ms + random.uniform(0, args.jitter_ms)
+            if random.random() < args.taxa_lenta:
+                atraso += args.latencia_lenta_ms
+            time.sleep(atraso / 1000)
+
+            correspondencia = rota.match(self.path)
+            if not correspondencia:
+                self._responder(400, {'erro': 'Requisição inválida'})
+            elif random.random() < args.taxa_erro:
+                self._responder(503, {'erro': 'Serviço indisponível'})
+            elif random.random() < args.taxa_inexistente:
+                # Só o ViaCEP responde 200 com {"erro": true}
+                if args.formato == 'viacep':
+                    self._responder(200, {'erro': True})
+                else:
+                    self._responder(404, {'erro': 'CEP não encontrado'})
+            else:
+                self._responder(200, no_formato(endereco_ficticio(correspondencia.group(1)), args.formato))
+
+        def log_message(self, formato, *valores):
+            if args.verboso:
+                super().log_message(formato, *valores)
+
+    return ViaCEPFalso
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8099)
+    parser.add_argument('--latencia-ms', type=float, default=50, help='Latência fixa de cada resposta')
+    parser.add_argument('--jitter-ms', type=float, default=20, help='Latência extra aleatória (0 a N ms)')
+    parser.add_argument('--taxa-erro', type=float, default=0.0, help='Fração de respostas 503')
+    parser.add_argument('--taxa-inexistente', type=float, default=0.0, help='Fração de CEPs inexistentes')
+    parser.add_argument('--taxa-lenta', type=float, default=0.0, help='Fração de respostas com latência extra')
+    parser.add_argument('--latencia-lenta-ms', type=float, default=1000, help='Latência extra das respostas lentas')
+    parser.add_argument('--formato', choices=sorted(ROTAS), default='viacep', help='Provedor imitado')
+    parser.add_argument('--verboso', action='store_true')
+    args = parser.parse_args()
+
+    servidor = ThreadingHTTPServer((args.host, args.porta), criar_handler(args))
+    servidor.daemon_threads = True
+    print(f'Provedor falso ({args.formato}) em http://{args.host}:{args.porta}')
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Micro-benchmarks das funções do caminho crítico (validações, to_dict,
+marshalling e serialização das respostas), sem banco de dados nem rede.
+Os casos *_resposta_marshal medem o caminho antigo das listagens (to_dict,
+marshal e json) e os *_resposta o atual (codificador de linhas e serializar).
+
+    python -m benchmarks.micro --saida micro.json [--comparar micro_base.json]
+"""
+import argparse
+import json
+import random
+import timeit
+from datetime import datetime
+
+from flask import Flask
+from flask_restx import marshal
+
+from app.models import CepConsulta, Usuario
+from app.routes import cep_model, codificador_cep, codificador_usuario, usuario_model
+from app.serializacao import serializar
+from app.utils import formatar_cep, validar_cpf, validar_email
+from app.validacao import formatar_ceps, validar_cpfs
+
+from .carga import gerar_cpf
+from .comum import comparar, salvar_resultado
+
+
+def _consulta():
+    return CepConsulta(
+        id=1, cep='01001000', logradouro='Praça da Sé', complemento='lado ímpar',
+        bairro='Sé', localidade='São Paulo', uf='SP', estado='São Paulo',
+        regiao='Sudeste', ibge='3550308', gia='1004', ddd='11', siafi='7107'
+    )
+
+
+def _usuario():
+    agora = datetime.utcnow()
+    return Usuario(
+        id=1, nome_completo='Maria da Silva', email='maria@example.com', senha='x',
+        cpf='529.982.247-25', cep='01001000', logradouro='Praça da Sé', complemento='',
+        bairro='Sé', localidade='São Paulo', estado='São Paulo',
+        created_at=agora, updated_at=agora
+    )
+
+
+def _linha(registro, codificador):
+    # Tupla equivalente à linha lida com with_entities
+    return tuple(getattr(registro, coluna.key) for coluna in codificador.colunas)
+
+
+def casos(tamanho_lote):
+    consulta = _consulta()
+    usuario = _usuario()
+    consultas = [_consulta() for _ in range(100)]
+    usuarios = [_usuario() for _ in range(100)]
+    linhas_cep = [_linha(c, codificador_cep) for c in consultas]
+    linhas_usuario = [_linha(u, codificador_usuario) for u in usuarios]
+    rng = random.Random(0)
+    cpfs = [gerar_cpf(rng) for _ in range(tamanho_lote)]
+    ceps = [f'{rng.randint(1000000, 99999999):08d}' for _ in range(tamanho_lote)]
+    return {
+        'formatar_cep': lambda: formatar_cep('01001-000'),
+        'validar_cpf': lambda: validar_cpf('529.982.247-25'),
+        'validar_email': lambda: validar_email('maria.silva@example.com.br'),
+        'cep_to_dict': consulta.to_dict,
+        'usuario_to_dict': usuario.to_dict,
+        'cep_marshal': lambda: marshal(consulta.to_dict(), cep_model),
+        'usuario_marshal': lambda: marshal(usuario.to_dict(), usuario_model),
+        'cep_listagem_100': lambda: marshal([c.to_dict() for c in consultas], cep_model),
+        'cep_listagem_100_resposta_marshal': lambda: json.dumps(
+            marshal([c.to_dict() for c in consultas], cep_model)
+        ),
+        'cep_listagem_100_resposta': lambda: serializar([codificador_cep(l) for l in linhas_cep]),
+        'usuario_listagem_100_resposta_marshal': lambda: json.dumps(
+            marshal([u.to_dict() for u in usuarios], usuario_model)
+        ),
+        'usuario_listagem_100_resposta': lambda: serializar(
+            [codificador_usuario(l) for l in linhas_usuario]
+        ),
+        'validar_cpfs_1': lambda: validar_cpfs(cpfs[:1]),
+        'validar_cpf_lote': lambda: [validar_cpf(cpf) for cpf in cpfs],
+        'validar_cpfs_lote': lambda: validar_cpfs(cpfs),
+        'formatar_cep_lote': lambda: [formatar_cep(cep) for cep in ceps],
+        'formatar_ceps_lote': lambda: formatar_ceps(ceps)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticoes', type=int, default=5, help='Rodadas de medição por caso')
+    parser.add_argument('--tempo-minimo', type=float, default=0.2, help='Duração mínima (s) de cada rodada')
+    parser.add_argument('--tamanho-lote', type=int, default=100000,
+                        help='Entradas dos casos *_lote (ex.: 1000000)')
+    parser.add_argument('--serializador', default='orjson', choices=['orjson', 'json'],
+                        help='Serializador usado nos casos *_resposta')
+    parser.add_argument('--filtro', help='Executa apenas os casos que contêm este texto')
+    parser.add_argument('--saida', default='micro.json')
+    parser.add_argument('--comparar', help='Resultado anterior para comparação')
+    args = parser.parse_args()
+
+    # serializar lê a configuração da aplicação
+    app = Flask(__name__)
+    app.config['JSON_SERIALIZADOR'] = args.serializador
+    app.app_context().push()
+
+    resultados = {}
+    for nome, funcao in casos(args.tamanho_lote).items():
+        if args.filtro and args.filtro not in nome:
+            continue
+        temporizador = timeit.Timer(funcao)
+        numero, _ = temporizador.autorange()
+        numero = max(numero, int(numero * args.tempo_minimo / 0.2))
+        tempos = temporizador.repeat(repeat=args.repeticoes, number=numero)
+        melhor = min(tempos) / numero
+        resultados[nome] = {'ns_por_chamada': round(melhor * 1e9, 1), 'chamadas': numero}
+        print(f'{nome:<40} {melhor * 1e9:>12.1f} ns/chamada')
+
+    dados = salvar_resultado(args.saida, 'micro', vars(args), resultados)
+    if args.comparar:
+        comparar(args.comparar, dados, 'ns_por_chamada')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Mede a latência do resolvedor de CEPs com vários provedores, sem e com
+hedge, consultando diretamente os provedores (sem cache). Use provedores
+falsos com cauda de latência para reproduzir o efeito no p99:
+
+    python -m benchmarks.fake_viacep --porta 8099 --taxa-lenta 0.05 &
+    python -m benchmarks.fake_viacep --porta 8098 --formato brasilapi --taxa-lenta 0.05 &
+    python -m benchmarks.resolvedor --provedores viacep,brasilapi \\
+        --viacep-url http://127.0.0.1:8099/ws --brasilapi-url http://127.0.0.1:8098/api/cep/v1 \\
+        --consultas 1000 --concorrencia 8 --saida resolvedor.json
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .comum import comparar, resumir_latencias, salvar_resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--provedores', default='viacep,brasilapi')
+    parser.add_argument('--viacep-url', default='http://127.0.0.1:8099/ws')
+    parser.add_argument('--opencep-url', default='http://127.0.0.1:8097/v1')
+    parser.add_argument('--brasilapi-url', default='http://127.0.0.1:8098/api/cep/v1')
+    parser.add_argument('--consultas', type=int, default=1000)
+    parser.add_argument('--aquecimento', type=int, default=100,
+                        help='Consultas iniciais (não medidas) para estimar as latências dos provedores')
+    parser.add_argument('--concorrencia', type=int, default=8)
+    parser.add_argument('--saida', default='resolvedor.json')
+    parser.add_argument('--comparar', help='Resultado anterior para comparação')
+    args = parser.parse_args()
+
+    os.environ.update({
+        'CEP_PROVEDORES': args.provedores,
+        'VIACEP_EXTERNAL_API': args.viacep_url,
+        'CEP_PROVEDOR_OPENCEP_URL': args.opencep_url,
+        'CEP_PROVEDOR_BRASILAPI_URL': args.brasilapi_url,
+        # O benchmark mede os provedores, não os limites da API
+        'VIACEP_ORCAMENTO_TAXA': '0',
+        'VIACEP_TENTATIVAS': '0'
+    })
+    from app import create_app
+    from app.extensions import resolvedor
+    from app.provedores import criar_provedores
+
+    app = create_app('production')
+    rng = random.Random(42)
+    ceps = [f'{rng.randint(1000000, 99999999):08d}' for _ in range(args.aquecimento + args.consultas)]
+
+    def consultar(cep):
+        with app.app_context():
+            inicio = time.perf_counter()
+            resolvedor.resolver(cep)
+            return time.perf_counter() - inicio
+
+    resultados = {}
+    for cenario, hedge in (('sem_hedge', False), ('com_hedge', True)):
+        app.config['CEP_HEDGE_HABILITADO'] = hedge
+        resolvedor.init_app(app, provedores=criar_provedores(app))
+        with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+            list(executor.map(consultar, ceps[:args.aquecimento]))
+            latencias = list(executor.map(consultar, ceps[args.aquecimento:]))
+
+        resultados[cenario] = {**resumir_latencias(latencias), 'hedges': resolvedor.hedges}
+        r = resultados[cenario]
+        print(f"{cenario:<10} p50={r['p50_ms']:>8.2f} ms  p95={r['p95_ms']:>8.2f} ms  "
+              f"p99={r['p99_ms']:>8.2f} ms  max={r['max_ms']:>8.2f} ms  hedges={r['hedges']}")
+        print(f"           ordem={resolvedor.stats()['ordem']}")
+
+    dados = salvar_resultado(args.saida, 'resolvedor', vars(args), resultados)
+    if args.comparar:
+        comparar(args.comparar, dados, 'p99_ms')
+
+
+if __name__ == '__main__':
+    main()
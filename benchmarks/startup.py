@@ -0,0 +1,71 @@
+"""
+Mede o tempo de partida da aplicação em processos novos: import do pacote,
+create_app e primeira requisição (/status e /swagger.json), sem banco de dados.
+
+    python -m benchmarks.startup --execucoes 10 --saida startup.json [--comparar startup_base.json]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from .comum import comparar, salvar_resultado
+
+SCRIPT = '''
+import json, time
+inicio = time.perf_counter()
+from app import create_app
+importado = time.perf_counter()
+app = create_app({config!r})
+criado = time.perf_counter()
+cliente = app.test_client()
+cliente.get('/status')
+primeira = time.perf_counter()
+cliente.get('/swagger.json')
+swagger = time.perf_counter()
+print(json.dumps({{
+    'import': importado - inicio,
+    'create_app': criado - importado,
+    'primeira_requisicao': primeira - criado,
+    'swagger': swagger - primeira,
+    'total': primeira - inicio
+}}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--execucoes', type=int, default=10)
+    parser.add_argument('--config', default='production')
+    parser.add_argument('--saida', default='startup.json')
+    parser.add_argument('--comparar', help='Resultado anterior para comparação')
+    args = parser.parse_args()
+
+    medicoes = []
+    for _ in range(args.execucoes):
+        saida = subprocess.run(
+            [sys.executable, '-c', SCRIPT.format(config=args.config)],
+            capture_output=True, text=True
+        )
+        if saida.returncode != 0:
+            raise SystemExit(saida.stderr)
+        medicoes.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+    resultados = {}
+    for etapa in medicoes[0]:
+        valores = [medicao[etapa] * 1000 for medicao in medicoes]
+        resultados[etapa] = {
+            'mediana_ms': round(statistics.median(valores), 2),
+            'max_ms': round(max(valores), 2)
+        }
+        print(f"{etapa:<22} mediana={resultados[etapa]['mediana_ms']:>9.2f} ms  "
+              f"max={resultados[etapa]['max_ms']:>9.2f} ms")
+
+    dados = salvar_resultado(args.saida, 'startup', vars(args), resultados)
+    if args.comparar:
+        comparar(args.comparar, dados, 'mediana_ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Configuração do gunicorn para produção:
+
+    gunicorn -c gunicorn.conf.py run:app
+
+Todos os valores podem ser ajustados por variáveis de ambiente GUNICORN_*.
+"""
+import math
+import os
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+# Com gevent, o patch precisa acontecer antes de a aplicação ser carregada (preload)
+if worker_class == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+
+def cpus_disponiveis():
+    """
+    CPUs que o processo pode usar: as da afinidade, limitadas pela cota do
+    cgroup (v2 ou v1). Em um contêiner com 2 CPUs em um host de 64 núcleos,
+    multiprocessing.cpu_count() retornaria 64.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    cota = None
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            limite, periodo = f.read().split()
+        if limite != 'max':
+            cota = int(limite) / int(periodo)
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                limite = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                periodo = int(f.read())
+            if limite > 0:
+                cota = limite / periodo
+        except (OSError, ValueError):
+            pass
+    if cota is not None:
+        cpus = min(cpus, max(1, math.ceil(cota)))
+    return cpus
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5001')
+
+# Conexões ao banco somadas de todos os workers (deve ficar abaixo do
+# max_connections do PostgreSQL, que é 100 por padrão)
+conexoes_total = int(os.environ.get('DB_MAX_CONEXOES_TOTAL', 80))
+workers = int(os.environ.get('GUNICORN_WORKERS', min(
+    cpus_disponiveis() * 2 + 1,
+    int(os.environ.get('GUNICORN_WORKERS_MAXIMO', 16)),
+    conexoes_total
+)))
+threads = int(os.environ.get('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# create_app é executado uma vez no processo mestre e herdado pelos workers
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True').lower() == 'true'
+
+# Reciclagem gradual dos workers e encerramento gracioso
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+# Caminho sem a query string: POST/PUT /usuarios recebem a senha nela
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+
+# Lidos por ProductionConfig para dimensionar o pool de conexões do banco
+os.environ.setdefault('FLASK_ENV', 'production')
+os.environ['GUNICORN_WORKER_CLASS'] = worker_class
+os.environ['GUNICORN_WORKERS'] = str(workers)
+os.environ['DB_MAX_CONEXOES_TOTAL'] = str(conexoes_total)
+os.environ['GUNICORN_THREADS'] = str(threads)
+os.environ['GUNICORN_WORKER_CONNECTIONS'] = str(worker_connections)
+
+
+def on_starting(server):
+    por_worker = conexoes_total // workers
+    if por_worker < (threads if worker_class != 'gevent' else min(worker_connections, 20)):
+        server.log.warning(
+            f'{workers} workers com DB_MAX_CONEXOES_TOTAL={conexoes_total}: {por_worker} conexões '
+            'ao banco por worker, menos que a concorrência de cada um; requisições podem esperar pelo pool'
+        )
+
+
+def post_fork(server, worker):
+    # Conexões abertas pelo mestre durante o preload não podem ser
+    # compartilhadas entre processos: cada worker abre as suas
+    from app.extensions import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    # Grava as consultas ainda na fila do registro assíncrono
+    from app.extensions import registro_consultas
+
+    pendentes = registro_consultas.descarregar()
+    if pendentes:
+        server.log.warning(f'{pendentes} consultas de CEP não gravadas ao encerrar o worker')
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
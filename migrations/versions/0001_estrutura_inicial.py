@@ -0,0 +1,59 @@
+"""estrutura inicial
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cep_consultas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cep', sa.String(length=9), nullable=False),
+    sa.Column('logradouro', sa.String(length=100), nullable=True),
+    sa.Column('complemento', sa.String(length=100), nullable=True),
+    sa.Column('bairro', sa.String(length=50), nullable=True),
+    sa.Column('localidade', sa.String(length=50), nullable=True),
+    sa.Column('uf', sa.String(length=2), nullable=True),
+    sa.Column('estado', sa.String(length=50), nullable=True),
+    sa.Column('regiao', sa.String(length=50), nullable=True),
+    sa.Column('ibge', sa.String(length=10), nullable=True),
+    sa.Column('gia', sa.String(length=10), nullable=True),
+    sa.Column('ddd', sa.String(length=2), nullable=True),
+    sa.Column('siafi', sa.String(length=10), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('usuarios',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nome_completo', sa.String(length=100), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('senha', sa.String(length=255), nullable=False),
+    sa.Column('cpf', sa.String(length=14), nullable=False),
+    sa.Column('cep', sa.String(length=9), nullable=False),
+    sa.Column('logradouro', sa.String(length=100), nullable=False),
+    sa.Column('complemento', sa.String(length=100), nullable=True),
+    sa.Column('bairro', sa.String(length=50), nullable=False),
+    sa.Column('localidade', sa.String(length=50), nullable=False),
+    sa.Column('estado', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('cpf'),
+    sa.UniqueConstraint('email')
+    )
+
+
+def downgrade():
+    op.drop_table('usuarios')
+    op.drop_table('cep_consultas')
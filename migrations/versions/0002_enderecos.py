@@ -0,0 +1,53 @@
+"""tabela canônica de endereços e índice nas consultas
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('enderecos',
+    sa.Column('cep', sa.String(length=9), nullable=False),
+    sa.Column('logradouro', sa.String(length=100), nullable=True),
+    sa.Column('complemento', sa.String(length=100), nullable=True),
+    sa.Column('bairro', sa.String(length=50), nullable=True),
+    sa.Column('localidade', sa.String(length=50), nullable=True),
+    sa.Column('uf', sa.String(length=2), nullable=True),
+    sa.Column('estado', sa.String(length=50), nullable=True),
+    sa.Column('regiao', sa.String(length=50), nullable=True),
+    sa.Column('ibge', sa.String(length=10), nullable=True),
+    sa.Column('gia', sa.String(length=10), nullable=True),
+    sa.Column('ddd', sa.String(length=2), nullable=True),
+    sa.Column('siafi', sa.String(length=10), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('cep')
+    )
+    op.create_index('ix_cep_consultas_cep', 'cep_consultas', ['cep'], unique=False)
+
+    # Preenche os endereços com a consulta mais recente de cada CEP já salvo
+    op.execute("""
+        INSERT INTO enderecos (cep, logradouro, complemento, bairro, localidade, uf,
+                               estado, regiao, ibge, gia, ddd, siafi, created_at, updated_at)
+        SELECT DISTINCT ON (cep) cep, logradouro, complemento, bairro, localidade, uf,
+               estado, regiao, ibge, gia, ddd, siafi, created_at, created_at
+        FROM cep_consultas
+        ORDER BY cep, id DESC
+        ON CONFLICT (cep) DO NOTHING
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_cep_consultas_cep', table_name='cep_consultas')
+    op.drop_table('enderecos')
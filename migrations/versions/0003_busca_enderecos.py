@@ -0,0 +1,59 @@
+"""colunas normalizadas e índices de busca de endereços
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# Mesma tabela de app/validacao.py, copiada para que a migração não dependa do código da aplicação
+ACENTOS = 'ÁÀÂÃÄÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇÑáàâãäéèêëíìîïóòôõöúùûüçñ'
+SEM_ACENTOS = 'AAAAAEEEEIIIIOOOOOUUUUCNaaaaaeeeeiiiiooooouuuucn'
+
+
+def _normalizada(coluna):
+    return sa.Computed(f"lower(translate({coluna}, '{ACENTOS}', '{SEM_ACENTOS}'))", persisted=True)
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # Colunas geradas: preenchidas pelo próprio banco, inclusive nas linhas existentes
+    op.add_column('enderecos', sa.Column('logradouro_normalizado', sa.String(length=100),
+                                         _normalizada('logradouro'), nullable=True))
+    op.add_column('enderecos', sa.Column('localidade_normalizada', sa.String(length=50),
+                                         _normalizada('localidade'), nullable=True))
+    op.add_column('enderecos', sa.Column('bairro_normalizado', sa.String(length=50),
+                                         _normalizada('bairro'), nullable=True))
+
+    op.create_index('ix_enderecos_uf_localidade', 'enderecos', ['uf', 'localidade_normalizada'])
+    op.create_index('ix_enderecos_localidade_bairro', 'enderecos',
+                    ['localidade_normalizada', 'bairro_normalizado'])
+    op.create_index('ix_enderecos_ddd', 'enderecos', ['ddd'])
+    op.create_index('ix_enderecos_ibge', 'enderecos', ['ibge'])
+    op.create_index('ix_enderecos_logradouro_prefixo', 'enderecos', ['logradouro_normalizado'],
+                    postgresql_ops={'logradouro_normalizado': 'varchar_pattern_ops'})
+    op.create_index('ix_enderecos_logradouro_trgm', 'enderecos', ['logradouro_normalizado'],
+                    postgresql_using='gin',
+                    postgresql_ops={'logradouro_normalizado': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_enderecos_logradouro_trgm', table_name='enderecos')
+    op.drop_index('ix_enderecos_logradouro_prefixo', table_name='enderecos')
+    op.drop_index('ix_enderecos_ibge', table_name='enderecos')
+    op.drop_index('ix_enderecos_ddd', table_name='enderecos')
+    op.drop_index('ix_enderecos_localidade_bairro', table_name='enderecos')
+    op.drop_index('ix_enderecos_uf_localidade', table_name='enderecos')
+    op.drop_column('enderecos', 'bairro_normalizado')
+    op.drop_column('enderecos', 'localidade_normalizada')
+    op.drop_column('enderecos', 'logradouro_normalizado')
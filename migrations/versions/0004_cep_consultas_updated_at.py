@@ -0,0 +1,25 @@
+"""updated_at nas consultas de CEP (versão das páginas da listagem)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('cep_consultas', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE cep_consultas SET updated_at = created_at')
+
+
+def downgrade():
+    op.drop_column('cep_consultas', 'updated_at')
@@ -0,0 +1,52 @@
+import os
+import sqlite3
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Os testes não dependem do PostgreSQL nem de serviços externos
+os.environ.setdefault('TEST_DATABASE_URL', 'sqlite://')
+os.environ.setdefault('RATE_LIMIT_HABILITADO', 'False')
+os.environ.setdefault('VIACEP_ORCAMENTO_TAXA', '0')
+
+from app import create_app  # noqa: E402
+from app.extensions import cep_cache, db  # noqa: E402
+
+
+@event.listens_for(Engine, 'connect')
+def _funcoes_sqlite(conexao, registro):
+    # translate() do PostgreSQL, usada pelas colunas normalizadas de enderecos
+    if isinstance(conexao, sqlite3.Connection):
+        conexao.create_function(
+            'translate', 3,
+            lambda texto, de, para: texto.translate(str.maketrans(de, para)) if texto is not None else None,
+            deterministic=True
+        )
+
+
+@pytest.fixture(scope='session')
+def app():
+    return create_app('testing')
+
+
+@pytest.fixture(autouse=True)
+def cache_limpo(app):
+    cep_cache.clear()
+    cep_cache.compartilhado.flushdb()
+    yield
+    cep_cache.clear()
+    cep_cache.compartilhado.flushdb()
+
+
+@pytest.fixture
+def banco(app):
+    """
+    Tabelas criadas no SQLite em memória para o teste
+    """
+    with app.app_context():
+        db.create_all()
+    yield db
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
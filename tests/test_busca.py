@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from app.models import Endereco
+
+ENDERECOS = [
+    {'cep': '01001000', 'logradouro': 'Praça da Sé', 'bairro': 'Sé', 'localidade': 'São Paulo',
+     'uf': 'SP', 'estado': 'São Paulo', 'ibge': '3550308', 'ddd': '11'},
+    {'cep': '01001001', 'logradouro': 'Praça da Sé', 'bairro': 'Sé', 'localidade': 'São Paulo',
+     'uf': 'SP', 'estado': 'São Paulo', 'ibge': '3550308', 'ddd': '11'},
+    {'cep': '01310100', 'logradouro': 'Avenida Paulista', 'bairro': 'Bela Vista', 'localidade': 'São Paulo',
+     'uf': 'SP', 'estado': 'São Paulo', 'ibge': '3550308', 'ddd': '11'},
+    {'cep': '09010000', 'logradouro': 'Rua Senador Fláquer', 'bairro': 'Centro', 'localidade': 'Santo André',
+     'uf': 'SP', 'estado': 'São Paulo', 'ibge': '3547809', 'ddd': '11'},
+    {'cep': '20040002', 'logradouro': 'Rua da Assembléia', 'bairro': 'Centro', 'localidade': 'Rio de Janeiro',
+     'uf': 'RJ', 'estado': 'Rio de Janeiro', 'ibge': '3304557', 'ddd': '21'},
+]
+
+
+@pytest.fixture
+def enderecos(app, banco):
+    with app.app_context():
+        banco.session.add_all(Endereco(**endereco) for endereco in ENDERECOS)
+        banco.session.commit()
+
+
+def buscar(app, consulta):
+    resposta = app.test_client().get(f'/cep/busca?{consulta}')
+    return resposta, resposta.get_json()
+
+
+@pytest.mark.parametrize('consulta, ceps', [
+    ('localidade=SAO PAULO', ['01001000', '01001001', '01310100']),
+    ('localidade=são paulo&bairro=se', ['01001000', '01001001']),
+    ('uf=rj', ['20040002']),
+    ('ddd=11&bairro=centro', ['09010000']),
+    ('ibge=3547809', ['09010000']),
+    ('logradouro=praca da', ['01001000', '01001001']),
+    ('logradouro=FLAQUER&logradouro_modo=contem', ['09010000']),
+    ('logradouro=assembleia&logradouro_modo=contem', ['20040002']),
+    ('logradouro=paulista', []),
+])
+def test_busca_sem_diferenciar_acentos_e_maiusculas(app, enderecos, consulta, ceps):
+    resposta, resultados = buscar(app, consulta)
+
+    assert resposta.status_code == 200
+    assert [endereco['cep'] for endereco in resultados] == ceps
+
+
+@pytest.mark.parametrize('consulta, mensagem', [
+    ('', 'Informe ao menos um filtro'),
+    ('uf=S', 'O parâmetro uf deve ser a sigla da UF'),
+    ('uf=S1', 'O parâmetro uf deve ser a sigla da UF'),
+    ('ddd=1a', 'O parâmetro ddd deve conter apenas dígitos'),
+    ('ibge=35-50308', 'O parâmetro ibge deve conter apenas dígitos'),
+    ('logradouro=se&logradouro_modo=contem', 'No modo contem o logradouro deve ter ao menos 3 caracteres'),
+    ('logradouro=se&logradouro_modo=sufixo', 'O parâmetro logradouro_modo deve ser prefixo ou contem'),
+    ('uf=SP&cursor=abc', 'Parâmetros limit e cursor devem ser números inteiros'),
+])
+def test_busca_com_parametros_invalidos(app, banco, consulta, mensagem):
+    resposta, corpo = buscar(app, consulta)
+
+    assert resposta.status_code == 400
+    assert corpo['message'].startswith(mensagem)
+
+
+def test_busca_paginada_pelo_cep_com_zeros_a_esquerda(app, enderecos):
+    resposta, pagina = buscar(app, 'uf=SP&limit=2')
+    assert [endereco['cep'] for endereco in pagina] == ['01001000', '01001001']
+    # O cursor é o último CEP da página, com os zeros à esquerda
+    assert resposta.headers['X-Next-Cursor'] == '01001001'
+
+    resposta, pagina = buscar(app, f"uf=SP&limit=2&cursor={resposta.headers['X-Next-Cursor']}")
+    assert [endereco['cep'] for endereco in pagina] == ['01310100', '09010000']
+    assert 'X-Next-Cursor' not in resposta.headers
+
+    # Cursor numérico sem os zeros à esquerda equivale ao CEP
+    resposta, pagina = buscar(app, 'uf=SP&limit=2&cursor=1310100')
+    assert [endereco['cep'] for endereco in pagina] == ['09010000']
+
+
+def test_busca_em_stream_a_partir_do_cursor(app, enderecos):
+    resposta = app.test_client().get('/cep/busca?uf=SP&stream=true&cursor=1001000')
+
+    assert resposta.mimetype == 'application/x-ndjson'
+    assert [json.loads(linha)['cep'] for linha in resposta.get_data(as_text=True).splitlines()] == [
+        '01001001', '01310100', '09010000'
+    ]
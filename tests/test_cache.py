@@ -0,0 +1,57 @@
+from app.cache import AUSENTE
+from app.extensions import cep_cache
+from app.models import Endereco
+from app.utils import enriquecer_endereco
+
+ENDERECO = {'cep': '01001-000', 'logradouro': 'Praça da Sé', 'uf': 'SP'}
+
+
+def test_alterar_o_endereco_retornado_nao_altera_o_cache(app):
+    original = dict(ENDERECO)
+    cep_cache.set('01001000', original)
+    original['logradouro'] = 'alterado após o set'
+
+    endereco = cep_cache.get('01001000')
+    enriquecer_endereco(endereco)
+    endereco['cep'] = 'alterado'
+
+    assert cep_cache.get('01001000') == ENDERECO
+    assert cep_cache.get('01001000') is not cep_cache.get('01001000')
+
+
+def test_copia_tambem_no_hit_do_cache_compartilhado(app):
+    cep_cache.set('01001000', ENDERECO)
+    cep_cache.local.clear()
+
+    cep_cache.get('01001000')['uf'] = 'RJ'
+
+    assert cep_cache.get('01001000') == ENDERECO
+    assert cep_cache.get('99999999') is AUSENTE
+
+
+def test_entrada_corrompida_no_cache_compartilhado_vale_como_miss(app):
+    chave = cep_cache.prefixo + '01001000'
+    cep_cache.compartilhado.set(chave, '{"cep": "01001-0')
+    falhas = cep_cache.falhas_compartilhado
+
+    assert cep_cache.get('01001000') is AUSENTE
+    assert cep_cache.falhas_compartilhado == falhas + 1
+    # A entrada é removida para que a próxima consulta grave uma nova
+    assert cep_cache.compartilhado.get(chave) is None
+
+    cep_cache.set('01001000', ENDERECO)
+    cep_cache.local.clear()
+    assert cep_cache.get('01001000') == ENDERECO
+
+
+def test_cep_com_entrada_corrompida_e_resolvido_pelo_banco(app, banco):
+    with app.app_context():
+        banco.session.add(Endereco(cep='01001000', logradouro='Praça da Sé', bairro='Sé',
+                                   localidade='São Paulo', uf='SP', estado='São Paulo'))
+        banco.session.commit()
+    cep_cache.compartilhado.set(cep_cache.prefixo + '01001000', b'\xff\xfe')
+
+    resposta = app.test_client().get('/cep/01001000')
+
+    assert resposta.status_code == 200
+    assert resposta.get_json()['logradouro'] == 'Praça da Sé'
@@ -0,0 +1,139 @@
+import os
+
+import pytest
+
+from app.extensions import cep_cache, indice_cep, viacep
+from app.indice_cep import construir_indice
+from app.models import Endereco
+
+
+def endereco(cep, localidade='São Paulo'):
+    return {'cep': cep, 'logradouro': 'Rua A', 'bairro': 'Centro', 'localidade': localidade,
+            'uf': 'SP', 'estado': 'São Paulo', 'regiao': 'Sudeste'}
+
+
+class Resposta:
+    status_code = 200
+
+    def __init__(self, dados):
+        self.dados = dados
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.dados
+
+
+class SessaoViaCEP:
+    """
+    ViaCEP falso: registra os CEPs consultados e responde {"erro": true}
+    para os que não conhece
+    """
+
+    def __init__(self, *conhecidos):
+        self.conhecidos = set(conhecidos)
+        self.consultados = []
+
+    def get(self, url, timeout=None):
+        cep = url.split('/')[-3]
+        self.consultados.append(cep)
+        if cep not in self.conhecidos:
+            return Resposta({'erro': True})
+        return Resposta({'cep': f'{cep[:5]}-{cep[5:]}', 'logradouro': 'Rua do ViaCEP', 'bairro': 'Centro',
+                         'localidade': 'Rio de Janeiro', 'uf': 'RJ'})
+
+
+@pytest.fixture
+def sessao(monkeypatch):
+    sessao = SessaoViaCEP()
+    monkeypatch.setattr(viacep, '_session', sessao)
+    monkeypatch.setattr(viacep, '_pid', os.getpid())
+    return sessao
+
+
+def consultar_lote(app, ceps):
+    resposta = app.test_client().post('/cep/batch', json={'ceps': ceps})
+    return resposta.status_code, resposta.get_json()
+
+
+def test_lote_remove_ceps_repetidos_mantendo_a_ordem(app, banco, sessao):
+    cep_cache.set('01001000', endereco('01001000'))
+    cep_cache.set('20040002', endereco('20040002', 'Rio de Janeiro'))
+
+    codigo, resultados = consultar_lote(app, ['20040002', '01001000', '20040002', '01001000'])
+
+    assert codigo == 200
+    assert [item['cep'] for item in resultados] == ['20040002', '01001000']
+    assert [item['endereco']['localidade'] for item in resultados] == ['Rio de Janeiro', 'São Paulo']
+
+
+def test_lote_acima_do_limite(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'CEP_LOTE_LIMITE', 2)
+
+    codigo, resposta = consultar_lote(app, ['01001000', '20040002', '30130010'])
+
+    assert codigo == 400
+    assert resposta['message'] == 'Máximo de 2 CEPs por lote'
+
+
+def test_lote_no_limite_depois_de_remover_os_repetidos(app, banco, sessao, monkeypatch):
+    monkeypatch.setitem(app.config, 'CEP_LOTE_LIMITE', 2)
+    cep_cache.set('01001000', endereco('01001000'))
+    cep_cache.set('20040002', endereco('20040002'))
+
+    codigo, resultados = consultar_lote(app, ['01001000', '20040002', '01001000'])
+
+    assert codigo == 200
+    assert len(resultados) == 2
+
+
+@pytest.mark.parametrize('corpo', [{}, {'ceps': '01001000'}, {'ceps': [1001000]}])
+def test_lote_com_corpo_invalido(app, corpo):
+    assert app.test_client().post('/cep/batch', json=corpo).status_code == 400
+
+
+def test_lote_informa_o_erro_de_cada_cep(app, banco, sessao):
+    cep_cache.set('01001000', endereco('01001000'))
+    cep_cache.set('99999999', None)
+
+    codigo, resultados = consultar_lote(app, ['01001000', 'abc', '123', '99999999', '88888888'])
+
+    assert codigo == 200
+    assert [(item['cep'], item['erro']) for item in resultados] == [
+        ('01001000', None),
+        ('abc', 'CEP inválido'),
+        ('123', 'CEP inválido'),
+        ('99999999', 'CEP não encontrado'),
+        ('88888888', 'CEP não encontrado')
+    ]
+    assert all(item['endereco'] is None for item in resultados[1:])
+    # CEPs inválidos e a resposta negativa em cache não chegam ao ViaCEP
+    assert sessao.consultados == ['88888888']
+
+
+def test_lote_consulta_o_viacep_apenas_sem_cache_indice_ou_banco(app, banco, sessao, monkeypatch, tmp_path):
+    caminho = str(tmp_path / 'ceps.idx')
+    construir_indice([endereco('20040002', 'Rio de Janeiro')], caminho)
+    monkeypatch.setattr(indice_cep, 'caminho', caminho)
+    monkeypatch.setattr(indice_cep, 'intervalo_verificacao', 0)
+    for atributo in ('_estado', '_mtime', '_verificado_em'):
+        monkeypatch.setattr(indice_cep, atributo, None)
+
+    cep_cache.set('01001000', endereco('01001000'))
+    with app.app_context():
+        banco.session.add(Endereco(**endereco('30130010', 'Belo Horizonte')))
+        banco.session.commit()
+    sessao.conhecidos.add('40010000')
+
+    codigo, resultados = consultar_lote(app, ['01001000', '20040002', '30130010', '40010000'])
+
+    assert codigo == 200
+    assert [item['endereco']['localidade'] for item in resultados] == [
+        'São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Rio de Janeiro'
+    ]
+    assert resultados[3]['endereco']['logradouro'] == 'Rua do ViaCEP'
+    assert sessao.consultados == ['40010000']
+    # Os resultados do banco e do ViaCEP ficam no cache para as próximas consultas
+    assert cep_cache.get('30130010')['localidade'] == 'Belo Horizonte'
+    assert cep_cache.get('40010000')['logradouro'] == 'Rua do ViaCEP'
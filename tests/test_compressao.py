@@ -0,0 +1,34 @@
+import gzip
+import json
+
+from app import routes
+from app.extensions import cep_cache, compressao
+
+ENDERECO = {
+    'cep': '01001-000', 'logradouro': 'Praça da Sé', 'complemento': 'de 1 a 999 - lado ímpar, exceto o trecho da praça em obras', 'bairro': 'Sé',
+    'localidade': 'São Paulo', 'uf': 'SP', 'estado': 'São Paulo', 'regiao': 'Sudeste',
+    'ibge': '3550308', 'gia': '1004', 'ddd': '11', 'siafi': '7107'
+}
+
+
+def test_cep_em_cache_e_serializado_e_comprimido_uma_unica_vez(app, monkeypatch):
+    cep_cache.set('01001000', ENDERECO)
+    cliente = app.test_client()
+
+    primeira = cliente.get('/cep/01001000', headers={'Accept-Encoding': 'gzip'})
+    assert primeira.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(primeira.data)) == ENDERECO
+
+    # Nas próximas respostas nada é serializado nem comprimido de novo
+    def falhar(*args, **kwargs):
+        raise AssertionError('corpo recalculado')
+
+    monkeypatch.setattr(routes, 'serializar', falhar)
+    monkeypatch.setattr(compressao.algoritmos['gzip'], 'comprimir', falhar)
+    segunda = cliente.get('/cep/01001000', headers={'Accept-Encoding': 'gzip'})
+
+    assert segunda.status_code == 200
+    assert segunda.data == primeira.data
+    assert segunda.headers['ETag'] == primeira.headers['ETag']
+    sem_compressao = cliente.get('/cep/01001000')
+    assert json.loads(sem_compressao.data) == ENDERECO
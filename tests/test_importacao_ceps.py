@@ -0,0 +1,28 @@
+import json
+
+from app import cli
+
+
+def test_importar_ignora_linhas_invalidas_sem_interromper(app, monkeypatch, tmp_path):
+    lotes = []
+    monkeypatch.setattr(cli, '_inserir_lote', lambda registros, sobrescrever: lotes.append(registros) or [])
+    arquivo = tmp_path / 'ceps.jsonl'
+    arquivo.write_text('\n'.join([
+        json.dumps({'cep': '01001-000', 'uf': 'SP', 'ddd': 11}),
+        '{"cep": "01002000",',
+        '["01003000"]',
+        json.dumps({'cep': '01004000', 'bairro': 'B' * 51}),
+        json.dumps({'cep': '01005000', 'uf': ['SP']}),
+        json.dumps({'cep': 1006000}),
+        json.dumps({'cep': '01007000', 'localidade': 'São Paulo'})
+    ]), encoding='utf-8')
+
+    resultado = app.test_cli_runner().invoke(args=['cep', 'importar', str(arquivo), '--lote', '2'])
+
+    assert resultado.exit_code == 0, resultado.output
+    assert 'Importação concluída: 2 registros, 5 ignorados' in resultado.stdout
+    assert 'Registro 2 ignorado: JSON inválido' in resultado.stderr
+    assert 'Registro 4 ignorado: Campo bairro excede 50 caracteres' in resultado.stderr
+    importados = [registro for lote in lotes for registro in lote]
+    assert [registro['cep'] for registro in importados] == ['01001000', '01007000']
+    assert importados[0]['ddd'] == '11' and importados[0]['estado'] == 'São Paulo'
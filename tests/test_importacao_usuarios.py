@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from app.extensions import cep_cache
+from app.importacao import ImportacaoUsuarios
+from app.models import Usuario
+from app.validacao import PESOS_CPF_1, PESOS_CPF_2, _digito
+
+ENDERECO = {'cep': '01001-000', 'logradouro': 'Praça da Sé', 'bairro': 'Sé', 'localidade': 'São Paulo',
+            'uf': 'SP', 'estado': 'São Paulo'}
+
+
+def gerar_cpf(numero):
+    """
+    CPF válido a partir dos 9 primeiros dígitos
+    """
+    d = [int(c) for c in f'{numero:09d}']
+    d.append(_digito(sum(map(int.__mul__, d, PESOS_CPF_1))))
+    d.append(_digito(sum(map(int.__mul__, d, PESOS_CPF_2))))
+    return ''.join(map(str, d))
+
+
+def usuario(numero, cep='01001000', **campos):
+    return {'nome_completo': f'Usuário {numero}', 'email': f'u{numero}@example.com', 'senha': 'segredo',
+            'cpf': gerar_cpf(numero), 'cep': cep, **campos}
+
+
+@pytest.fixture
+def ceps_conhecidos():
+    # CEPs resolvidos pelo cache: nenhuma consulta externa
+    cep_cache.set('01001000', ENDERECO)
+    cep_cache.set('99999999', None)
+
+
+@pytest.mark.parametrize('tamanho_bloco', [1, 100])
+def test_linha_recusada_nao_conta_como_repetida(app, banco, ceps_conhecidos, tamanho_bloco):
+    registros = [usuario(1, cep='99999999'), usuario(1), usuario(1), usuario(2)]
+
+    with app.app_context():
+        importacao = ImportacaoUsuarios(tamanho_bloco)
+        resultados = list(importacao.executar(registros))
+
+    assert [r['message'] for r in resultados] == [
+        'CEP inválido ou não encontrado', None, 'Email ou CPF repetido no arquivo', None
+    ]
+    assert importacao.resumo()['criados'] == 2
+
+
+def importar(client, registros, ndjson=False):
+    if ndjson:
+        corpo = '\n'.join(json.dumps(r) for r in registros)
+        resposta = client.post('/usuarios/bulk', data=corpo, content_type='application/x-ndjson')
+    else:
+        resposta = client.post('/usuarios/bulk', json=registros)
+    assert resposta.status_code == 200
+    assert resposta.mimetype == 'application/x-ndjson'
+    *resultados, resumo = [json.loads(linha) for linha in resposta.get_data(as_text=True).splitlines()]
+    return resultados, resumo['resumo']
+
+
+@pytest.mark.parametrize('ndjson', [False, True])
+def test_bulk_linhas_validas_e_invalidas(app, banco, ceps_conhecidos, ndjson):
+    registros = [
+        usuario(1),
+        usuario(2, email='sem-arroba'),
+        usuario(3, cpf='12345678900'),
+        usuario(4, cep='123'),
+        usuario(5, cep='99999999'),
+        {'nome_completo': 'Sem email'},
+        usuario(6, complemento='Apto 1')
+    ]
+
+    resultados, resumo = importar(app.test_client(), registros, ndjson)
+
+    assert [(r['linha'], r['status'], r['message']) for r in resultados] == [
+        (1, 'criado', None),
+        (2, 'erro', 'Email inválido'),
+        (3, 'erro', 'CPF inválido'),
+        (4, 'erro', 'CEP inválido'),
+        (5, 'erro', 'CEP inválido ou não encontrado'),
+        (6, 'erro', 'Campo obrigatório ausente: email'),
+        (7, 'criado', None)
+    ]
+    assert all(r['id'] for r in resultados if r['status'] == 'criado')
+    assert (resumo['total'], resumo['criados'], resumo['erros']) == (7, 2, 5)
+    with app.app_context():
+        assert Usuario.query.count() == 2
+        assert Usuario.query.filter_by(email='u6@example.com').one().complemento == 'Apto 1'
+
+
+def test_bulk_repetidos_no_banco_e_no_arquivo(app, banco, ceps_conhecidos):
+    client = app.test_client()
+    importar(client, [usuario(1)])
+
+    resultados, resumo = importar(client, [
+        usuario(1),                              # mesmo email e CPF já cadastrados
+        usuario(2, email='u1@example.com'),      # só o email já cadastrado
+        usuario(3),
+        usuario(3),                              # repetido no arquivo
+        usuario(4, cpf=gerar_cpf(3)),            # CPF repetido no arquivo
+    ])
+
+    assert [r['message'] for r in resultados] == [
+        'Email ou CPF já cadastrado',
+        'Email ou CPF já cadastrado',
+        None,
+        'Email ou CPF repetido no arquivo',
+        'Email ou CPF repetido no arquivo'
+    ]
+    assert resumo['criados'] == 1
+
+
+def test_bulk_corpo_invalido(app):
+    resposta = app.test_client().post('/usuarios/bulk', json={'email': 'u1@example.com'})
+    assert resposta.status_code == 400
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from app.extensions import indice_cep
+from app.indice_cep import construir_indice
+from app.models import Endereco
+
+ENDERECO = {'cep': '01001000', 'logradouro': 'Praça da Sé', 'bairro': 'Sé', 'localidade': 'São Paulo',
+            'uf': 'SP', 'estado': 'São Paulo', 'regiao': 'Sudeste'}
+
+
+@pytest.fixture
+def indice(monkeypatch, tmp_path):
+    """
+    Aponta o índice global para um arquivo do teste, sem estado carregado
+    """
+    caminho = str(tmp_path / 'ceps.idx')
+    monkeypatch.setattr(indice_cep, 'caminho', caminho)
+    monkeypatch.setattr(indice_cep, 'intervalo_verificacao', 0)
+    for atributo in ('_estado', '_mtime', '_verificado_em'):
+        monkeypatch.setattr(indice_cep, atributo, None)
+    return caminho
+
+
+def salvar_no_banco(app, banco):
+    with app.app_context():
+        banco.session.add(Endereco(**ENDERECO))
+        banco.session.commit()
+
+
+@pytest.mark.parametrize('conteudo', [b'', b'XXXXXXXX', b'NAOINDICE' * 4])
+def test_indice_invalido_nao_impede_a_consulta_no_banco(app, banco, indice, conteudo):
+    salvar_no_banco(app, banco)
+    with open(indice, 'wb') as f:
+        f.write(conteudo)
+
+    cliente = app.test_client()
+    resposta = cliente.get('/cep/01001000')
+
+    assert resposta.status_code == 200
+    assert resposta.get_json()['logradouro'] == 'Praça da Sé'
+    assert indice_cep.erros >= 1
+    # O arquivo inválido não é remapeado a cada consulta
+    erros = indice_cep.erros
+    assert indice_cep.get('01001000') is None
+    assert indice_cep.erros == erros
+
+
+def test_indice_truncado_mantem_o_indice_anterior(app, indice):
+    construir_indice([ENDERECO], indice)
+    assert indice_cep.get('01001000')['logradouro'] == 'Praça da Sé'
+
+    with open(indice, 'rb') as f:
+        conteudo = f.read()
+    # Substituído como em construir_indice: o mapeamento anterior continua válido
+    with open(indice + '.tmp', 'wb') as f:
+        f.write(conteudo[:-10])
+    os.utime(indice + '.tmp', ns=(1, 1))
+    os.replace(indice + '.tmp', indice)
+
+    assert indice_cep.get('01001000')['logradouro'] == 'Praça da Sé'
+    assert indice_cep.erros >= 1
@@ -0,0 +1,232 @@
+import os
+
+import pytest
+from flask import Flask
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.config import TestingConfig
+from app.extensions import limitador, viacep
+from app.limitador import BaldesCompartilhados, BaldesLocais, LimiteExcedido, LimitadorTaxa, Orcamento
+from app.models import Endereco
+
+
+class Relogio:
+    """
+    Relógio controlado pelo teste (substitui time.monotonic)
+    """
+
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+    def avancar(self, segundos):
+        self.agora += segundos
+
+
+class RedisIndisponivel:
+    """
+    Redis cujos scripts falham como em uma queda do servidor
+    """
+
+    def register_script(self, script):
+        def executar(keys, args):
+            raise RedisConnectionError('Connection refused')
+        return executar
+
+
+def test_redis_indisponivel_reserva_nos_baldes_do_processo():
+    baldes = BaldesCompartilhados(RedisIndisponivel())
+
+    assert baldes.reservar('limite:cliente:ip:1', 2, 1) == 0
+    assert baldes.reservar('limite:cliente:ip:1', 2, 1) == 0
+    # O limite continua valendo no processo enquanto o Redis está fora
+    assert baldes.reservar('limite:cliente:ip:1', 2, 1) < 0
+    assert baldes.falhas == 3
+
+
+def test_orcamento_com_redis_indisponivel_nao_falha():
+    orcamento = Orcamento(BaldesCompartilhados(RedisIndisponivel()), 'limite:orcamento:viacep', 10, 5, 0)
+
+    orcamento.adquirir()
+
+    assert orcamento.rejeicoes == 0
+
+
+def test_requisicoes_seguem_atendidas_com_redis_indisponivel(app, monkeypatch):
+    monkeypatch.setattr(limitador, 'habilitado', True)
+    monkeypatch.setattr(limitador, 'baldes', BaldesCompartilhados(RedisIndisponivel(), app))
+
+    resposta = app.test_client().get('/cep/abc')
+
+    assert resposta.status_code == 400
+    assert limitador.baldes.falhas == 1
+
+
+def criar_limitador(**config):
+    app = Flask(__name__)
+    app.config.from_object(TestingConfig)
+    app.config.update(VIACEP_ORCAMENTO_TAXA=20, VIACEP_ORCAMENTO_RAJADA=20, **config)
+    return LimitadorTaxa(app)
+
+
+def test_orcamento_dividido_entre_workers_sem_armazenamento_compartilhado():
+    orcamento = criar_limitador(VIACEP_ORCAMENTO_WORKERS=8).orcamento_viacep
+
+    assert orcamento.taxa * 8 == 20
+    assert orcamento.capacidade == 2
+
+
+def test_orcamento_inteiro_com_armazenamento_compartilhado(monkeypatch):
+    monkeypatch.setattr('redis.Redis.from_url', lambda url: RedisIndisponivel())
+
+    orcamento = criar_limitador(
+        VIACEP_ORCAMENTO_WORKERS=8, RATE_LIMIT_ARMAZENAMENTO_URL='redis://localhost:6379/0'
+    ).orcamento_viacep
+
+    assert orcamento.taxa == 20
+    assert orcamento.capacidade == 20
+
+
+def test_orcamento_com_redis_indisponivel_usa_a_parte_do_worker(monkeypatch):
+    monkeypatch.setattr('redis.Redis.from_url', lambda url: RedisIndisponivel())
+    orcamento = criar_limitador(
+        VIACEP_ORCAMENTO_WORKERS=8, RATE_LIMIT_ARMAZENAMENTO_URL='redis://localhost:6379/0',
+        VIACEP_ORCAMENTO_ESPERA_MAXIMA=0
+    ).orcamento_viacep
+    orcamento.baldes.local = BaldesLocais(relogio=Relogio())
+
+    # Rajada de 20 dividida entre 8 workers: 2 chamadas antes de recusar
+    orcamento.adquirir()
+    orcamento.adquirir()
+    with pytest.raises(LimiteExcedido) as erro:
+        orcamento.adquirir()
+
+    # A 20/8 chamadas por segundo, o próximo token chega em 0,4 s
+    assert erro.value.retry_after == pytest.approx(0.4)
+    assert orcamento.baldes.falhas == 3
+
+
+def test_balde_permite_rajada_e_depois_recusa():
+    baldes = BaldesLocais(relogio=Relogio())
+
+    assert [baldes.reservar('c', 3, 1) for _ in range(3)] == [0, 0, 0]
+    # Sem espera permitida, retorna (negativo) o tempo até haver um token
+    assert baldes.reservar('c', 3, 1) == pytest.approx(-1)
+
+
+def test_balde_recarrega_com_o_tempo_sem_passar_da_capacidade():
+    relogio = Relogio()
+    baldes = BaldesLocais(relogio=relogio)
+    for _ in range(2):
+        baldes.reservar('c', 2, 4)
+
+    relogio.avancar(0.25)
+    assert baldes.reservar('c', 2, 4) == 0
+    assert baldes.reservar('c', 2, 4) == pytest.approx(-0.25)
+
+    relogio.avancar(60)
+    assert [baldes.reservar('c', 2, 4) for _ in range(2)] == [0, 0]
+    assert baldes.reservar('c', 2, 4) < 0
+
+
+def test_balde_reserva_com_espera_ate_o_maximo():
+    baldes = BaldesLocais(relogio=Relogio())
+    baldes.reservar('c', 1, 2, espera_maxima=1)
+
+    # Cada reserva na fila espera meio segundo a mais que a anterior
+    assert baldes.reservar('c', 1, 2, espera_maxima=1) == pytest.approx(0.5)
+    assert baldes.reservar('c', 1, 2, espera_maxima=1) == pytest.approx(1)
+    # Além de espera_maxima nada é reservado
+    assert baldes.reservar('c', 1, 2, espera_maxima=1) == pytest.approx(-1.5)
+    assert baldes.reservar('c', 1, 2, espera_maxima=1) == pytest.approx(-1.5)
+
+
+def test_baldes_cheios_sao_descartados():
+    relogio = Relogio()
+    baldes = BaldesLocais(maximo=10, relogio=relogio)
+    for i in range(20):
+        baldes.reservar(f'antigo:{i}', 2, 1)
+
+    # A limpeza roda a cada 256 reservas acima do máximo de baldes
+    relogio.avancar(5)
+    for i in range(236):
+        baldes.reservar(f'novo:{i}', 2, 1)
+
+    assert len(baldes._baldes) == 236
+    assert 'antigo:0' not in baldes._baldes
+    # Um balde descartado equivale a um balde cheio
+    assert baldes.reservar('antigo:0', 2, 1) == 0
+
+
+def test_orcamento_aguarda_ou_recusa():
+    esperas = []
+    orcamento = Orcamento(BaldesLocais(relogio=Relogio()), 'orcamento', 2, 1, 0.5, dormir=esperas.append)
+
+    orcamento.adquirir()
+    orcamento.adquirir()
+    with pytest.raises(LimiteExcedido) as erro:
+        orcamento.adquirir()
+
+    assert esperas == [pytest.approx(0.5)]
+    assert erro.value.retry_after == pytest.approx(1)
+    assert (orcamento.esperas, orcamento.rejeicoes) == (1, 1)
+
+
+def test_limite_por_cliente_responde_429_com_retry_after(app, monkeypatch):
+    monkeypatch.setattr(limitador, 'habilitado', True)
+    monkeypatch.setattr(limitador, 'baldes', BaldesLocais(relogio=Relogio()))
+    monkeypatch.setattr(limitador, 'capacidade', 1)
+    monkeypatch.setattr(limitador, 'taxa', 0.4)
+    cliente = app.test_client()
+
+    assert cliente.get('/cep/abc').status_code == 400
+    resposta = cliente.get('/cep/abc')
+
+    assert resposta.status_code == 429
+    assert resposta.headers['Retry-After'] == '3'
+    # Outro cliente tem o seu próprio balde
+    assert cliente.get('/cep/abc', environ_base={'REMOTE_ADDR': '10.0.0.2'}).status_code == 400
+
+
+class RespostaViaCEP:
+    status_code = 200
+
+    def __init__(self, cep):
+        self.cep = cep
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {'cep': f'{self.cep[:5]}-{self.cep[5:]}', 'logradouro': 'Rua A', 'bairro': 'Centro',
+                'localidade': 'São Paulo', 'uf': 'SP'}
+
+
+class SessaoViaCEP:
+    def get(self, url, timeout=None):
+        return RespostaViaCEP(url.split('/')[-3])
+
+
+class SemEnderecos:
+    def filter(self, *criterios):
+        return []
+
+
+def test_lote_informa_os_ceps_recusados_pelo_orcamento(app, monkeypatch):
+    monkeypatch.setattr(viacep, '_session', SessaoViaCEP())
+    monkeypatch.setattr(viacep, '_pid', os.getpid())
+    monkeypatch.setattr(viacep, 'orcamento', Orcamento(BaldesLocais(relogio=Relogio()), 'orcamento', 0.5, 1, 0))
+    monkeypatch.setattr(Endereco, 'query', SemEnderecos())
+
+    resposta = app.test_client().post('/cep/batch', json={'ceps': ['01001000', '20040002', 'abc']})
+
+    assert resposta.status_code == 200
+    assert resposta.headers['Retry-After'] == '2'
+    resultados = {item['cep']: item for item in resposta.get_json()}
+    assert resultados['abc']['erro'] == 'CEP inválido'
+    ok = [item for cep, item in resultados.items() if cep != 'abc' and item['endereco']]
+    recusados = [item for cep, item in resultados.items() if cep != 'abc' and not item['endereco']]
+    assert len(ok) == 1 and ok[0]['endereco']['estado'] == 'São Paulo'
+    assert len(recusados) == 1 and recusados[0]['erro'].startswith('Limite de consultas ao ViaCEP excedido')
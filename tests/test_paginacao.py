@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, update
+
+from app import paginacao
+from app.extensions import db
+from app.models import Usuario
+
+
+@pytest.fixture
+def usuarios(app):
+    with app.app_context():
+        Usuario.__table__.create(db.engine)
+        db.session.execute(insert(Usuario), [
+            {'nome_completo': f'Usuário {i}', 'email': f'u{i}@example.com', 'senha': 'x', 'cpf': f'{i:011d}',
+             'cep': '01001000', 'logradouro': 'Praça da Sé', 'bairro': 'Sé', 'localidade': 'São Paulo',
+             'estado': 'São Paulo'}
+            for i in range(1, 4)
+        ])
+        db.session.commit()
+    yield
+    with app.app_context():
+        db.session.remove()
+        Usuario.__table__.drop(db.engine)
+
+
+def test_pagina_nao_modificada_responde_304_sem_serializar(app, usuarios, monkeypatch):
+    cliente = app.test_client()
+    pagina = cliente.get('/usuarios/?limit=2')
+    assert pagina.status_code == 200
+    assert pagina.headers['X-Next-Cursor'] == '2'
+    etag = pagina.headers['ETag']
+
+    def falhar(*args, **kwargs):
+        raise AssertionError('página serializada')
+
+    monkeypatch.setattr(paginacao, 'serializar', falhar)
+    resposta = cliente.get('/usuarios/?limit=2', headers={'If-None-Match': etag})
+
+    assert resposta.status_code == 304
+    assert resposta.headers['ETag'] == etag
+
+
+def test_etag_da_pagina_muda_com_atualizacao_e_mascara(app, usuarios):
+    cliente = app.test_client()
+    etag = cliente.get('/usuarios/?limit=2').headers['ETag']
+
+    assert cliente.get('/usuarios/?limit=2', headers={'X-Fields': '{id,email}'}).headers['ETag'] != etag
+
+    with app.app_context():
+        db.session.execute(update(Usuario).where(Usuario.id == 2).values(
+            updated_at=datetime.utcnow() + timedelta(seconds=1)
+        ))
+        db.session.commit()
+
+    resposta = cliente.get('/usuarios/?limit=2', headers={'If-None-Match': etag})
+    assert resposta.status_code == 200
+    assert resposta.headers['ETag'] != etag
+    assert [usuario['id'] for usuario in resposta.get_json()] == [1, 2]
@@ -0,0 +1,139 @@
+import threading
+
+import pytest
+from flask import Flask
+
+from app.config import TestingConfig
+from app.registro import FilaCheia, RegistroConsultas
+
+
+def criar_registro(funcao, dormir=lambda segundos: None, **config):
+    app = Flask(__name__)
+    app.config.from_object(TestingConfig)
+    app.config.update({'CEP_REGISTRO_ASSINCRONO': True, 'CEP_REGISTRO_INTERVALO_MS': 10,
+                       'CEP_REGISTRO_ESPERA_MAXIMA_MS': 10, **config})
+    registro = RegistroConsultas(dormir=dormir)
+    registro.init_app(app, funcao=funcao)
+    return registro
+
+
+class GravacaoBloqueada:
+    """
+    Função de gravação que segura o primeiro lote até ser liberada, para
+    manter a fila cheia
+    """
+
+    def __init__(self):
+        self.iniciou = threading.Event()
+        self.liberar = threading.Event()
+        self.gravadas = []
+
+    def __call__(self, lote):
+        self.iniciou.set()
+        self.liberar.wait(5)
+        self.gravadas.extend(endereco for endereco, _ in lote)
+
+
+def encher_fila(registro, gravacao):
+    # A thread segura a primeira consulta e a segunda ocupa a única vaga da fila
+    assert registro.registrar({'cep': '1'})
+    assert gravacao.iniciou.wait(5)
+    assert registro.registrar({'cep': '2'})
+
+
+@pytest.fixture
+def gravacao():
+    gravacao = GravacaoBloqueada()
+    yield gravacao
+    gravacao.liberar.set()
+
+
+def test_fila_cheia_sincrono(gravacao):
+    registro = criar_registro(gravacao, CEP_REGISTRO_FILA=1, CEP_REGISTRO_LOTE=1, CEP_REGISTRO_FILA_CHEIA='sincrono')
+    encher_fila(registro, gravacao)
+
+    # Quem chamou grava a consulta na própria requisição
+    assert registro.registrar({'cep': '3'}) is False
+    assert registro.sincronas == 1
+
+    gravacao.liberar.set()
+    assert registro.descarregar() == 0
+    assert gravacao.gravadas == [{'cep': '1'}, {'cep': '2'}]
+
+
+def test_fila_cheia_descartar(gravacao):
+    registro = criar_registro(gravacao, CEP_REGISTRO_FILA=1, CEP_REGISTRO_LOTE=1, CEP_REGISTRO_FILA_CHEIA='descartar')
+    encher_fila(registro, gravacao)
+
+    assert registro.registrar({'cep': '3'}) is True
+    assert registro.descartadas == 1
+
+    gravacao.liberar.set()
+    registro.descarregar()
+    assert gravacao.gravadas == [{'cep': '1'}, {'cep': '2'}]
+
+
+def test_fila_cheia_rejeitar(gravacao):
+    registro = criar_registro(gravacao, CEP_REGISTRO_FILA=1, CEP_REGISTRO_LOTE=1, CEP_REGISTRO_FILA_CHEIA='rejeitar')
+    encher_fila(registro, gravacao)
+
+    with pytest.raises(FilaCheia) as erro:
+        registro.registrar({'cep': '3'})
+    assert erro.value.retry_after == registro.intervalo
+    assert registro.rejeitadas == 1
+
+
+def test_politica_invalida():
+    with pytest.raises(ValueError):
+        criar_registro(lambda lote: None, CEP_REGISTRO_FILA_CHEIA='bloquear')
+
+
+def test_descarregar_grava_as_pendentes_ao_encerrar():
+    gravadas = []
+    registro = criar_registro(lambda lote: gravadas.extend(endereco for endereco, _ in lote),
+                              CEP_REGISTRO_LOTE=2, CEP_REGISTRO_INTERVALO_MS=200)
+    for cep in range(5):
+        registro.registrar({'cep': str(cep)})
+
+    assert registro.descarregar() == 0
+    assert [endereco['cep'] for endereco in gravadas] == ['0', '1', '2', '3', '4']
+    assert registro.stats()['gravadas'] == 5
+    assert not registro._thread.is_alive()
+
+
+def test_descarregar_sem_thread_iniciada():
+    assert criar_registro(lambda lote: None).descarregar() == 0
+
+
+def test_lote_com_falha_e_gravado_de_novo_com_backoff():
+    esperas = []
+    tentativas = []
+
+    def gravar(lote):
+        tentativas.append(len(lote))
+        if len(tentativas) < 3:
+            raise ConnectionError('banco indisponível')
+
+    registro = criar_registro(gravar, dormir=esperas.append, CEP_REGISTRO_TENTATIVAS=3, CEP_REGISTRO_BACKOFF_MS=100)
+    registro.registrar({'cep': '1'})
+    registro.descarregar()
+
+    assert tentativas == [1, 1, 1]
+    assert esperas == [0.1, 0.2]
+    assert (registro.gravadas, registro.falhas, registro.retentativas) == (1, 0, 2)
+
+
+def test_lote_conta_como_falha_apos_esgotar_as_tentativas():
+    esperas = []
+
+    def gravar(lote):
+        raise ConnectionError('banco indisponível')
+
+    registro = criar_registro(gravar, dormir=esperas.append, CEP_REGISTRO_TENTATIVAS=2, CEP_REGISTRO_BACKOFF_MS=100,
+                              CEP_REGISTRO_LOTE=2, CEP_REGISTRO_INTERVALO_MS=200)
+    registro.registrar({'cep': '1'})
+    registro.registrar({'cep': '2'})
+    registro.descarregar()
+
+    assert esperas == [0.1]
+    assert (registro.gravadas, registro.falhas, registro.retentativas) == (0, 2, 1)
@@ -0,0 +1,35 @@
+from flask import g
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models import Usuario
+from app.replicas import COOKIE_PRIMARIO, RoteadorReplicas
+
+
+def test_insert_direto_pela_sessao_marca_a_escrita(app):
+    with app.test_request_context('/usuarios/bulk', method='POST'):
+        Usuario.__table__.create(db.engine, checkfirst=True)
+        try:
+            db.session.execute(insert(Usuario).values(
+                nome_completo='Maria', email='maria@example.com', senha='x', cpf='52998224725',
+                cep='01001000', logradouro='Praça da Sé', bairro='Sé', localidade='São Paulo',
+                estado='São Paulo'
+            ))
+
+            assert db.session.info['escreveu']
+            assert g.escreveu_primario
+            # O cliente recebe o cookie que mantém as próximas leituras no primário
+            roteador = RoteadorReplicas()
+            resposta = roteador._marcar_cliente(app.response_class())
+            assert COOKIE_PRIMARIO in resposta.headers['Set-Cookie']
+        finally:
+            db.session.rollback()
+            Usuario.__table__.drop(db.engine)
+
+
+def test_select_nao_marca_a_escrita(app):
+    with app.test_request_context('/usuarios/1'):
+        db.session.execute(db.select(db.literal(1)))
+
+        assert not db.session.info.get('escreveu')
+        assert not g.get('escreveu_primario')
@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from app.config import TestingConfig
+from app.resolvedor import AMOSTRAS_MINIMAS, ResolvedorCep
+
+ENDERECO = {'cep': '01001-000', 'uf': 'SP'}
+
+
+class ProvedorFalso:
+    """
+    Provedor em processo com latência injetada
+    """
+
+    remoto = True
+
+    def __init__(self, nome, atraso, resposta=(ENDERECO, True)):
+        self.nome = nome
+        self.atraso = atraso
+        self.resposta = resposta
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    def buscar(self, cep_formatado):
+        with self._lock:
+            self.chamadas += 1
+        time.sleep(self.atraso)
+        endereco, definitivo = self.resposta
+        return (dict(endereco, provedor=self.nome) if endereco else None), definitivo
+
+
+@pytest.fixture
+def criar_resolvedor():
+    criados = []
+
+    def criar(provedores, **config):
+        app = Flask(__name__)
+        app.config.from_object(TestingConfig)
+        app.config.update({'CEP_HEDGE_FRACAO_MAXIMA': 1, 'CEP_PROVEDORES_ADAPTATIVO': False, **config})
+        resolvedor = ResolvedorCep(app, provedores)
+        criados.append(resolvedor)
+        return resolvedor
+
+    yield criar
+    for resolvedor in criados:
+        if resolvedor._executor is not None:
+            resolvedor._executor.shutdown(wait=True)
+
+
+def test_hedge_disparado_apos_o_atraso_padrao_e_o_mais_rapido_vence(criar_resolvedor):
+    lento, rapido = ProvedorFalso('lento', 0.5), ProvedorFalso('rapido', 0.01)
+    resolvedor = criar_resolvedor([lento, rapido], CEP_HEDGE_ATRASO_PADRAO_MS=50)
+
+    inicio = time.perf_counter()
+    endereco, cacheavel = resolvedor.resolver('01001000')
+    duracao = time.perf_counter() - inicio
+
+    assert endereco['provedor'] == 'rapido' and cacheavel
+    assert 0.05 <= duracao < 0.4
+    assert resolvedor.hedges == 1
+    assert resolvedor.latencias['rapido'].vitorias == 1
+
+
+def test_atraso_do_hedge_usa_o_percentil_medido(criar_resolvedor):
+    provedor = ProvedorFalso('medido', 0)
+    resolvedor = criar_resolvedor([provedor, ProvedorFalso('outro', 0)],
+                                  CEP_HEDGE_ATRASO_PADRAO_MS=300, CEP_HEDGE_ATRASO_MINIMO_MS=1)
+    assert resolvedor.atraso_hedge(provedor) == pytest.approx(0.3)
+
+    for i in range(AMOSTRAS_MINIMAS):
+        resolvedor.latencias['medido'].registrar(0.01 if i < AMOSTRAS_MINIMAS - 1 else 0.04, True)
+
+    assert resolvedor.atraso_hedge(provedor) == pytest.approx(0.04)
+
+
+def test_cep_inexistente_no_primeiro_provedor_nao_dispara_hedge(criar_resolvedor):
+    primeiro = ProvedorFalso('primeiro', 0.01, resposta=(None, True))
+    segundo = ProvedorFalso('segundo', 0)
+    resolvedor = criar_resolvedor([primeiro, segundo], CEP_HEDGE_ATRASO_PADRAO_MS=200)
+
+    assert resolvedor.resolver('99999999') == (None, True)
+    assert segundo.chamadas == 0
+    assert resolvedor.hedges == 0
+
+
+def test_falha_passa_ao_proximo_provedor_sem_esperar_o_hedge(criar_resolvedor):
+    instavel = ProvedorFalso('instavel', 0, resposta=(None, False))
+    reserva = ProvedorFalso('reserva', 0)
+    resolvedor = criar_resolvedor([instavel, reserva], CEP_HEDGE_ATRASO_PADRAO_MS=500)
+
+    inicio = time.perf_counter()
+    endereco, _ = resolvedor.resolver('01001000')
+
+    assert endereco['provedor'] == 'reserva'
+    assert time.perf_counter() - inicio < 0.3
+    assert resolvedor.hedges == 0
+
+
+def test_ordem_adaptativa_evita_o_provedor_que_falha(criar_resolvedor):
+    instavel = ProvedorFalso('instavel', 0, resposta=(None, False))
+    estavel = ProvedorFalso('estavel', 0.02)
+    resolvedor = criar_resolvedor([instavel, estavel], CEP_PROVEDORES_ADAPTATIVO=True,
+                                  CEP_HEDGE_ATRASO_PADRAO_MS=50)
+    assert [p.nome for p in resolvedor.ordem()] == ['instavel', 'estavel']
+
+    for _ in range(3):
+        resolvedor.resolver('01001000')
+
+    assert [p.nome for p in resolvedor.ordem()] == ['estavel', 'instavel']
+    chamadas = instavel.chamadas
+    resolvedor.resolver('01001000')
+    assert instavel.chamadas == chamadas
+
+
+def test_ordem_adaptativa_evita_o_provedor_lento(criar_resolvedor):
+    lento, rapido = ProvedorFalso('lento', 0.15), ProvedorFalso('rapido', 0.005)
+    resolvedor = criar_resolvedor([lento, rapido], CEP_PROVEDORES_ADAPTATIVO=True,
+                                  CEP_HEDGE_ATRASO_PADRAO_MS=30, CEP_HEDGE_ATRASO_MINIMO_MS=1)
+
+    endereco, _ = resolvedor.resolver('01001000')
+    # A consulta ao provedor lento termina em segundo plano e também é medida
+    resolvedor._executor.shutdown(wait=True)
+
+    assert endereco['provedor'] == 'rapido'
+    assert resolvedor.latencias['lento'].media > resolvedor.latencias['rapido'].media
+    assert [p.nome for p in resolvedor.ordem()] == ['rapido', 'lento']
+
+
+def test_hedges_limitados_a_fracao_maxima_das_consultas(criar_resolvedor):
+    lento, rapido = ProvedorFalso('lento', 0.03), ProvedorFalso('rapido', 0)
+    resolvedor = criar_resolvedor([lento, rapido], CEP_HEDGE_FRACAO_MAXIMA=0.2,
+                                  CEP_HEDGE_ATRASO_PADRAO_MS=5, CEP_HEDGE_ATRASO_MINIMO_MS=1)
+
+    vencedores = [resolvedor.resolver('01001000')[0]['provedor'] for _ in range(10)]
+
+    assert resolvedor.consultas == 10
+    assert resolvedor.hedges == 2
+    assert vencedores.count('rapido') == 2
+    assert rapido.chamadas == 2
@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+
+from app.cache import AUSENTE, MemoryBackend
+from app.extensions import viacep
+from app.singleflight import SingleFlight
+from app.utils import consultar_viacep
+
+REQUISICOES = 20
+
+
+class RespostaFalsa:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {'cep': '01001-000', 'logradouro': 'Praça da Sé', 'localidade': 'São Paulo', 'uf': 'SP'}
+
+
+def executar_em_paralelo(funcao, quantidade):
+    """
+    Executa funcao() em quantidade threads liberadas ao mesmo tempo e
+    retorna os resultados
+    """
+    barreira = threading.Barrier(quantidade)
+    resultados = [None] * quantidade
+
+    def executar(indice):
+        barreira.wait()
+        resultados[indice] = funcao()
+
+    threads = [threading.Thread(target=executar, args=(i,)) for i in range(quantidade)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return resultados
+
+
+def test_consultas_concorrentes_fazem_uma_busca_no_viacep(app, monkeypatch):
+    chamadas = []
+
+    def get_lento(cep_formatado):
+        chamadas.append(cep_formatado)
+        time.sleep(0.2)
+        return RespostaFalsa()
+
+    monkeypatch.setattr(viacep, 'get', get_lento)
+
+    def consultar():
+        with app.app_context():
+            return consultar_viacep('01001-000')
+
+    resultados = executar_em_paralelo(consultar, REQUISICOES)
+
+    assert chamadas == ['01001000']
+    assert all(resultado is not None and resultado['uf'] == 'SP' for resultado in resultados)
+    assert resultados.count(resultados[0]) == REQUISICOES
+
+
+def test_workers_compartilham_a_busca_pelo_lock_no_backend(app):
+    # Cada SingleFlight simula um worker: só o backend memory:// é comum a eles
+    backend = MemoryBackend()
+    app.config['CEP_COALESCER_ENTRE_WORKERS'] = True
+    try:
+        workers = [SingleFlight(), SingleFlight()]
+        for worker in workers:
+            worker.init_app(app, backend=backend)
+    finally:
+        app.config['CEP_COALESCER_ENTRE_WORKERS'] = False
+
+    chamadas = []
+
+    def buscar():
+        chamadas.append(threading.get_ident())
+        time.sleep(0.2)
+        resultado = {'cep': '01001-000'}
+        backend.set('resultado', json.dumps(resultado))
+        return resultado
+
+    def consultar_resultado():
+        bruto = backend.get('resultado')
+        return AUSENTE if bruto is None else json.loads(bruto)
+
+    contador = iter(range(REQUISICOES))
+
+    def consultar():
+        worker = workers[next(contador) % len(workers)]
+        return worker.do('01001000', buscar, consultar_resultado)
+
+    resultados = executar_em_paralelo(consultar, REQUISICOES)
+
+    assert len(chamadas) == 1
+    assert resultados == [{'cep': '01001-000'}] * REQUISICOES
+    assert backend.get('singleflight:01001000') is None
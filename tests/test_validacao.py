@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from app import validacao
+from app.validacao import PESOS_CPF_1, PESOS_CPF_2, _digito, validar_cpf, validar_cpfs, validar_email, validar_emails
+
+
+def gerar_cpf(numero):
+    d = [int(c) for c in f'{numero:09d}']
+    d.append(_digito(sum(map(int.__mul__, d, PESOS_CPF_1))))
+    d.append(_digito(sum(map(int.__mul__, d, PESOS_CPF_2))))
+    return ''.join(map(str, d))
+
+
+def cpfs_de_teste():
+    aleatorio = random.Random(42)
+    validos = [gerar_cpf(aleatorio.randrange(10 ** 9)) for _ in range(200)]
+    return [
+        *validos,
+        # Dígito verificador errado
+        *[cpf[:10] + str((int(cpf[10]) + 1) % 10) for cpf in validos[:50]],
+        *[cpf[:9] + str((int(cpf[9]) + 1) % 10) + cpf[10] for cpf in validos[50:100]],
+        # Formatados
+        *[f'{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}' for cpf in validos[100:150]],
+        # Todos os dígitos iguais passam no cálculo dos verificadores, mas são inválidos
+        *[str(d) * 11 for d in range(10)],
+        '529.982.247-25', '52998224725', '5299822472', '529982247250', '', 'abcdefghijk',
+        '٥٢٩٩٨٢٢٤٧٢٥',  # dígitos arábicos, fora do ASCII
+        gerar_cpf(0), gerar_cpf(1),
+    ]
+
+
+@pytest.mark.parametrize('com_numpy', [True, False])
+def test_validar_cpfs_concorda_com_validar_cpf(monkeypatch, com_numpy):
+    if com_numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(validacao, 'np', None)
+    cpfs = cpfs_de_teste()
+
+    assert validar_cpfs(cpfs) == [validar_cpf(cpf) for cpf in cpfs]
+
+
+def test_cpfs_com_digitos_iguais_sao_invalidos():
+    assert validar_cpfs([str(d) * 11 for d in range(10)]) == [False] * 10
+
+
+def test_validar_cpfs_sem_cpfs():
+    assert validar_cpfs([]) == []
+    assert validar_cpfs(['123']) == [False]
+
+
+def test_validar_emails_concorda_com_validar_email():
+    emails = ['u1@example.com', 'nome.sobrenome+tag@sub.dominio.com.br', 'sem-arroba', 'a@b', 'a@b.c',
+              '@example.com', 'u1@example..com', 'U1@EXAMPLE.COM', 'espaço @example.com', '']
+
+    assert validar_emails(emails) == [validar_email(email) for email in emails]
@@ -0,0 +1,218 @@
+import os
+
+import pytest
+import requests
+
+from app.limitador import BaldesLocais, LimiteExcedido, Orcamento
+from app.viacep import CircuitBreaker, CircuitoAberto, ViaCEPClient
+
+
+class Relogio:
+    """
+    Relógio controlado pelo teste (substitui time.monotonic)
+    """
+
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+    def avancar(self, segundos):
+        self.agora += segundos
+
+
+class Resposta:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f'{self.status_code}', response=self)
+
+
+class Sessao:
+    """
+    Sessão HTTP falsa: cada GET devolve (ou dispara) o próximo item da lista
+    """
+
+    def __init__(self, *respostas):
+        self.respostas = list(respostas)
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        resposta = self.respostas.pop(0)
+        if isinstance(resposta, Exception):
+            raise resposta
+        return Resposta(resposta)
+
+
+def criar_breaker(relogio, **parametros):
+    return CircuitBreaker(**{'limiar_erro': 0.5, 'minimo_requisicoes': 4, 'janela': 60, 'tempo_aberto': 30,
+                             'relogio': relogio, **parametros})
+
+
+def test_circuito_abre_ao_passar_do_limiar_de_erros():
+    breaker = criar_breaker(Relogio())
+    breaker.registrar_sucesso()
+    breaker.registrar_falha()
+    breaker.registrar_sucesso()
+    assert breaker.estado == CircuitBreaker.FECHADO
+
+    # 2 falhas em 4 chamadas: atinge o limiar de 50%
+    breaker.registrar_falha()
+
+    assert breaker.estado == CircuitBreaker.ABERTO
+    assert not breaker.permitir()
+    assert breaker.rejeicoes == 1
+
+
+def test_circuito_nao_abre_abaixo_do_minimo_de_requisicoes():
+    breaker = criar_breaker(Relogio())
+    for _ in range(3):
+        breaker.registrar_falha()
+
+    assert breaker.estado == CircuitBreaker.FECHADO
+
+
+def test_falhas_fora_da_janela_nao_contam():
+    relogio = Relogio()
+    breaker = criar_breaker(relogio)
+    for _ in range(3):
+        breaker.registrar_falha()
+
+    relogio.avancar(61)
+    breaker.registrar_falha()
+
+    assert breaker.estado == CircuitBreaker.FECHADO
+    assert breaker.stats()['requisicoes_janela'] == 1
+
+
+def abrir(breaker):
+    for _ in range(breaker.minimo_requisicoes):
+        breaker.registrar_falha()
+    assert breaker.estado == CircuitBreaker.ABERTO
+
+
+def test_meio_aberto_libera_uma_chamada_de_teste_e_fecha_com_sucesso():
+    relogio = Relogio()
+    breaker = criar_breaker(relogio)
+    abrir(breaker)
+
+    relogio.avancar(29)
+    assert not breaker.permitir()
+    relogio.avancar(1)
+    assert breaker.estado == CircuitBreaker.MEIO_ABERTO
+
+    assert breaker.permitir()
+    # Só uma chamada de teste por vez
+    assert not breaker.permitir()
+
+    breaker.registrar_sucesso()
+    assert breaker.estado == CircuitBreaker.FECHADO
+    assert breaker.permitir()
+
+
+def test_meio_aberto_reabre_com_falha():
+    relogio = Relogio()
+    breaker = criar_breaker(relogio)
+    abrir(breaker)
+    relogio.avancar(30)
+    assert breaker.permitir()
+
+    breaker.registrar_falha()
+
+    assert breaker.estado == CircuitBreaker.ABERTO
+    # O tempo aberto recomeça a partir da nova falha
+    relogio.avancar(29)
+    assert not breaker.permitir()
+    relogio.avancar(1)
+    assert breaker.permitir()
+
+
+def criar_cliente(sessao, esperas, **atributos):
+    cliente = ViaCEPClient(dormir=esperas.append)
+    cliente.breaker = criar_breaker(Relogio())
+    cliente._session = sessao
+    cliente._pid = os.getpid()
+    for nome, valor in atributos.items():
+        setattr(cliente, nome, valor)
+    return cliente
+
+
+@pytest.fixture
+def jitter_maximo(monkeypatch):
+    # O jitter sorteia a espera entre 0 e o limite; o teste usa sempre o limite
+    sorteios = []
+
+    def uniform(inicio, fim):
+        sorteios.append((inicio, fim))
+        return fim
+
+    monkeypatch.setattr('random.uniform', uniform)
+    return sorteios
+
+
+def test_falhas_transitorias_sao_repetidas_com_backoff_exponencial(jitter_maximo):
+    esperas = []
+    sessao = Sessao(requests.exceptions.ConnectionError('recusada'), 503, 502, 200)
+    cliente = criar_cliente(sessao, esperas, tentativas=3, backoff=0.2, backoff_maximo=0.5)
+
+    assert cliente.get('01001000').status_code == 200
+
+    assert sessao.urls == ['https://viacep.com.br/ws/01001000/json/'] * 4
+    # 0,2 * 2^n limitado a backoff_maximo
+    assert jitter_maximo == [(0, 0.2), (0, 0.4), (0, 0.5)]
+    assert esperas == [0.2, 0.4, 0.5]
+    assert cliente.breaker.stats()['falhas_janela'] == 0
+
+
+def test_tentativas_esgotadas_registram_uma_falha(jitter_maximo):
+    esperas = []
+    cliente = criar_cliente(Sessao(503, 503, 503), esperas, tentativas=2)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        cliente.get('01001000')
+
+    assert len(esperas) == 2
+    assert cliente.breaker.stats()['falhas_janela'] == 1
+
+
+def test_status_nao_retentavel_nao_e_repetido():
+    esperas = []
+    sessao = Sessao(404)
+    cliente = criar_cliente(sessao, esperas, tentativas=3)
+
+    assert cliente.get('01001000').status_code == 404
+    assert len(sessao.urls) == 1
+    assert esperas == []
+
+
+def test_circuito_aberto_recusa_sem_chamar_o_viacep():
+    sessao = Sessao()
+    cliente = criar_cliente(sessao, [])
+    abrir(cliente.breaker)
+
+    with pytest.raises(CircuitoAberto):
+        cliente.get('01001000')
+    assert sessao.urls == []
+
+
+def test_novas_tentativas_consomem_o_orcamento(jitter_maximo):
+    esperas = []
+    relogio = Relogio()
+    # Rajada de 2 chamadas sem recarga durante o teste
+    orcamento = Orcamento(BaldesLocais(relogio=relogio), 'orcamento', 0.01, 2, 0)
+    sessao = Sessao(503, 503, 200)
+    cliente = criar_cliente(sessao, esperas, tentativas=3, orcamento=orcamento)
+
+    # A primeira chamada e uma nova tentativa esgotam o orçamento: a falha é definitiva
+    with pytest.raises(requests.exceptions.HTTPError):
+        cliente.get('01001000')
+    assert len(sessao.urls) == 2
+    assert orcamento.rejeicoes == 1
+
+    with pytest.raises(LimiteExcedido):
+        cliente.get('01001000')
+    assert len(sessao.urls) == 2